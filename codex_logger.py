@@ -1,6 +1,187 @@
+"""
+Codex task logging.
+
+Task records are queued in a TaskLogSink and written to the `tasks` table
+with one bulk insert once CODEX_LOG_BATCH_SIZE records are waiting,
+CODEX_LOG_FLUSH_INTERVAL seconds have passed, or the process exits. Records
+that cannot be written (Supabase unreachable, bad credentials) are appended
+to a local NDJSON spool (CODEX_LOG_SPOOL) and inserted ahead of new records
+on the next successful flush. Logging never raises into the caller.
+"""
+
 from datetime import datetime
+from functools import lru_cache
 import os
-from supabase import create_client, Client
+import sys
+import json
+import atexit
+import logging
+import threading
+
+# lizi_db lives in src/, which start.sh puts on PYTHONPATH for Lizi; add it when run from elsewhere
+_SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+from lizi_db import get_client
+
+logger = logging.getLogger('codex')
+
+BATCH_SIZE = int(os.getenv("CODEX_LOG_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("CODEX_LOG_FLUSH_INTERVAL", "5"))
+SPOOL_PATH = os.getenv("CODEX_LOG_SPOOL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "codex_tasks.spool.ndjson"))
+COST_PER_TOKEN = 0.000006  # o4-mini Flex estimate
+
+
+def _tasks_client():
+    url = os.getenv("SUPABASE_URL") or f"http://{os.getenv('DB_HOST', 'localhost')}:54321"
+    return get_client(url, os.getenv("SERVICE_ROLE_KEY"))
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """The tiktoken encoding for a model, or None when tiktoken is not installed."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # The encoding files are downloaded on first use
+        logger.warning(f"tiktoken encoding for {model} unavailable, estimating tokens: {e}")
+        return None
+
+
+@lru_cache(maxsize=1024)
+def count_tokens(text: str, model: str = "o4-mini") -> int:
+    """
+    Count the tokens of `text` for `model`.
+
+    Uses the model's tiktoken encoding when tiktoken is installed, otherwise
+    estimates about 4 characters per token. Results are cached, so repeated
+    prompts are only tokenized once.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(len(text.split()), (len(text) + 3) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class TaskLogSink:
+    """
+    Buffered writer for `tasks` rows.
+
+    Args:
+        client_factory (callable): Returns the Supabase client, built on the
+            first flush
+        batch_size (int): Records per insert; a full batch is flushed at once
+        flush_interval (float): Longest time a record waits in the buffer
+        spool_path (str): NDJSON file for records that could not be written
+    """
+
+    def __init__(self, client_factory=_tasks_client, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, spool_path=SPOOL_PATH):
+        self.client_factory = client_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, record: dict):
+        """Queue a record, starting the flush thread on first use."""
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='codex-task-log', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _insert(self, records):
+        client = self.client_factory()
+        for start in range(0, len(records), self.batch_size):
+            client.table("tasks").insert(records[start:start + self.batch_size], returning="minimal").execute()
+
+    def _spool(self, records):
+        try:
+            with open(self.spool_path, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Dropped {len(records)} task records, spool {self.spool_path} not writable: {e}")
+
+    def _take_spool(self):
+        """Claim the spooled records (renaming the file first, so concurrent processes don't replay them twice)."""
+        claimed = f"{self.spool_path}.{os.getpid()}"
+        try:
+            os.replace(self.spool_path, claimed)
+        except OSError:
+            return []
+        records = []
+        with open(claimed) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn last line from a crashed writer
+        os.remove(claimed)
+        return records
+
+    def flush(self) -> int:
+        """
+        Insert the buffered records, preceded by any spooled ones; on
+        failure they all go (back) to the spool. The spool is replayed even
+        when nothing new is buffered.
+
+        Returns:
+            int: Records inserted
+        """
+        with self._flush_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            try:
+                records = self._take_spool() + records
+            except OSError as e:
+                logger.warning(f"Could not read task log spool {self.spool_path}: {e}")
+            if not records:
+                return 0
+            try:
+                self._insert(records)
+            except Exception as e:
+                logger.warning(f"Task log insert failed, spooled {len(records)} records to {self.spool_path}: {e}")
+                self._spool(records)
+                return 0
+            return len(records)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink() -> TaskLogSink:
+    """The process-wide sink, flushed at exit."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = TaskLogSink()
+            atexit.register(_sink.flush)
+    return _sink
+
 
 def log_codex_task(
     prompt: str,
@@ -11,20 +192,21 @@ def log_codex_task(
     summary: str,
     status: str = "completed"
 ):
-    SUPABASE_URL = os.getenv("SUPABASE_URL") or f"http://{os.getenv('DB_HOST', 'localhost')}:54321"
-    SERVICE_ROLE_KEY = os.getenv("SERVICE_ROLE_KEY")
-
-    supabase: Client = create_client(SUPABASE_URL, SERVICE_ROLE_KEY)
-
-    result = supabase.table("tasks").insert({
-        "prompt": prompt,
-        "command": command,
-        "model_used": model,
-        "file_path": file_path,
-        "token_count": tokens,
-        "cost_estimate": round(tokens * 0.000006, 5),  # o4-mini Flex estimate
-        "response_summary": summary,
-        "task_status": status,
-        "created_at": datetime.utcnow().isoformat()
-    }).execute()
-    return result
+    """Queue a `tasks` row for the next bulk insert and return it (None if it could not be queued)."""
+    try:
+        record = {
+            "prompt": prompt,
+            "command": command,
+            "model_used": model,
+            "file_path": file_path,
+            "token_count": tokens,
+            "cost_estimate": round(tokens * COST_PER_TOKEN, 5),
+            "response_summary": summary,
+            "task_status": status,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        get_sink().add(record)
+        return record
+    except Exception as e:
+        logger.error(f"Could not queue codex task log: {e}")
+        return None
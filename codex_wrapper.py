@@ -2,7 +2,7 @@ import subprocess
 import sys
 import json
 import os
-from codex_logger import log_codex_task
+from codex_logger import log_codex_task, count_tokens
 from datetime import datetime
 
 # Load env manually if not preloaded
@@ -18,12 +18,13 @@ def run_codex(prompt: str, model="o4-mini"):
         return
 
     output = result.stdout.strip()
-    tokens_used = len(prompt.split()) + len(output.split())  # crude estimate
+    tokens_used = count_tokens(prompt, model) + count_tokens(output, model)
 
     # Optional summary compression
     summary = output.splitlines()[0][:150] if output else "No response"
 
-    log_codex_task(
+    # Queued; written to Supabase in bulk (or spooled locally) without blocking the run
+    logged = log_codex_task(
         prompt=prompt,
         command=" ".join(cmd),
         model=model,
@@ -34,7 +35,7 @@ def run_codex(prompt: str, model="o4-mini"):
 
     print("\n--- Codex Output ---\n")
     print(output)
-    print("\n--- Logged to Supabase ---")
+    print("\n--- Queued for Supabase ---" if logged else "\n--- Not logged ---")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
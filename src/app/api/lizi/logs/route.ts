@@ -1,9 +1,12 @@
 import { NextResponse } from 'next/server';
 
-export async function GET() {
+export async function GET(request: Request) {
   try {
     console.log('Attempting to fetch logs from lizi-api...');
-    const response = await fetch('http://10.0.1.217:5001/logs', {
+    // Forward the cursor ('<ts>|<id>' of the last log index entry seen) so only newer entries are returned
+    const cursor = new URL(request.url).searchParams.get('cursor');
+    const url = cursor ? `http://10.0.1.217:5001/logs?cursor=${encodeURIComponent(cursor)}` : 'http://10.0.1.217:5001/logs';
+    const response = await fetch(url, {
       headers: {
         'Accept': 'application/json',
       },
@@ -20,7 +23,8 @@ export async function GET() {
     
     const logs = await response.json();
     console.log(`Successfully fetched ${logs.length} logs`);
-    return NextResponse.json(logs);
+    const nextCursor = response.headers.get('X-Log-Cursor');
+    return NextResponse.json(logs, nextCursor ? { headers: { 'X-Log-Cursor': nextCursor } } : undefined);
   } catch (error) {
     console.error('Error fetching Lizi logs:', error);
     return NextResponse.json({ 
@@ -1,9 +1,11 @@
-from supabase import create_client, Client
+from supabase import Client
 import time
 import uuid
 from datetime import datetime, UTC
 import os
 from dotenv import load_dotenv
+from lizi_db import get_client
+from lizi_rules import default_engine
 
 # Load environment variables
 load_dotenv()
@@ -17,38 +19,15 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Missing required environment variables: SUPABASE_URL and SERVICE_ROLE_KEY")
 
 print(f"🔌 Connecting to Supabase at {SUPABASE_URL}")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = get_client(SUPABASE_URL, SUPABASE_KEY)
 
 def should_alert(review):
-    """Basic placeholder logic — replace with AI later."""
-    label = review['after']['label']
-    zones = review['after'].get('current_zones', [])
-    stationary = review['after'].get('stationary', False)
-    score = review['after'].get('score', 0)
+    """Evaluate a tracked object event against the alert rules (see lizi_rules.py)."""
+    return default_engine().evaluate_one(review)
 
-    # Basic confidence threshold
-    if score < 0.7:
-        return None, 0.0
-
-    # Zone-based alerts
-    if label == "person":
-        if "driveway" in zones and not stationary:
-            return "Person is moving in driveway", score
-        elif "porch" in zones and not stationary:
-            return "Person is moving on porch", score
-    elif label == "car" and not stationary:
-        if "driveway" in zones:
-            return "Car is moving in driveway", score
-        elif "street" in zones:
-            return "Car is moving on street", score
-    elif label == "truck" and not stationary:
-        if "driveway" in zones:
-            return "Truck is moving in driveway", score
-    elif label == "bicycle" and not stationary:
-        if "driveway" in zones or "porch" in zones:
-            return "Bicycle is moving in monitored area", score
-
-    return None, 0.0
+def should_alert_batch(reviews):
+    """Evaluate a batch of tracked object events, returning (reasons, confidences) lists."""
+    return default_engine().evaluate(reviews)
 
 def insert_alert(event_id, camera, label, face_name, plate, zones, score, reason, confidence):
     """Insert AI alert to Supabase if not already sent"""
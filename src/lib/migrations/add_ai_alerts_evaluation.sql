@@ -0,0 +1,37 @@
+-- Evaluation results for ai_alerts (lizi_evaluator.py)
+-- evaluated_at is NULL until the evaluator has decided triggered/reason/confidence
+ALTER TABLE public.ai_alerts
+ADD COLUMN IF NOT EXISTS evaluated_at timestamptz;
+
+COMMENT ON COLUMN ai_alerts.evaluated_at IS 'When the evaluator set triggered/reason/confidence (NULL = not evaluated yet)';
+
+-- Keep the evaluator's "pending alerts, oldest first" sweep cheap
+CREATE INDEX IF NOT EXISTS idx_ai_alerts_pending_evaluation
+    ON ai_alerts(created_at)
+    WHERE evaluated_at IS NULL AND triggered = false;
+
+-- Write back a micro-batch of evaluations in one statement
+-- p_results is a JSON array of {"id": ..., "triggered": ..., "reason": ..., "confidence": ...};
+-- a NULL reason/confidence keeps the value Lizi stored when it created the alert
+CREATE OR REPLACE FUNCTION public.lizi_apply_evaluations(p_results jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE public.ai_alerts AS a
+        SET triggered = e.triggered,
+            reason = COALESCE(e.reason, a.reason),
+            confidence = COALESCE(e.confidence, a.confidence),
+            evaluated_at = now()
+        FROM jsonb_to_recordset(p_results) AS e(id uuid, triggered boolean, reason text, confidence float)
+        WHERE a.id = e.id
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated;
+$$;
+
+COMMENT ON FUNCTION public.lizi_apply_evaluations IS 'Store triggered/reason/confidence for many alerts in one statement';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_apply_evaluations FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_apply_evaluations TO service_role;
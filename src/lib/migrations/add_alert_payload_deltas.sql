@@ -0,0 +1,57 @@
+-- Compact payload storage for ai_alerts (Lizi LIZI_COMPACT_PAYLOADS mode)
+-- full_review_payload is written once when the alert is created; later
+-- update/end reviews only append what changed to payload_deltas.
+ALTER TABLE public.ai_alerts
+ADD COLUMN IF NOT EXISTS payload_deltas jsonb;
+
+COMMENT ON COLUMN ai_alerts.payload_deltas IS 'Changes (objects, zones, severity, end_time) carried by each update/end review';
+
+-- Replace lizi_update_alert() with a version that can append a delta instead of rewriting the payload
+DROP FUNCTION IF EXISTS public.lizi_update_alert(uuid, text, timestamptz, jsonb, jsonb, jsonb);
+
+CREATE OR REPLACE FUNCTION public.lizi_update_alert(
+    p_alert_id uuid,
+    p_review_type text,
+    p_review_timestamp timestamptz,
+    p_objects jsonb DEFAULT NULL,
+    p_zones jsonb DEFAULT NULL,
+    p_payload jsonb DEFAULT NULL,
+    p_delta jsonb DEFAULT NULL
+)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    UPDATE public.ai_alerts
+    SET updated_at = now(),
+        latest_review_type = p_review_type,
+        latest_review_timestamp = p_review_timestamp,
+        update_count = COALESCE(update_count, 0) + 1,
+        ended_at = CASE WHEN p_review_type = 'end' THEN now() ELSE ended_at END,
+        additional_objects = CASE
+            WHEN p_objects IS NULL OR jsonb_array_length(p_objects) = 0 THEN additional_objects
+            ELSE (
+                SELECT jsonb_agg(DISTINCT item)
+                FROM jsonb_array_elements(COALESCE(additional_objects, '[]'::jsonb) || p_objects) AS item
+            )
+        END,
+        additional_zones = CASE
+            WHEN p_zones IS NULL OR jsonb_array_length(p_zones) = 0 THEN additional_zones
+            ELSE (
+                SELECT jsonb_agg(DISTINCT item)
+                FROM jsonb_array_elements(COALESCE(additional_zones, '[]'::jsonb) || p_zones) AS item
+            )
+        END,
+        full_review_payload = COALESCE(p_payload, full_review_payload),
+        payload_deltas = CASE
+            WHEN p_delta IS NULL THEN payload_deltas
+            ELSE COALESCE(payload_deltas, '[]'::jsonb) || jsonb_build_array(p_delta)
+        END
+    WHERE id = p_alert_id
+    RETURNING update_count;
+$$;
+
+COMMENT ON FUNCTION public.lizi_update_alert IS 'Apply a review update to an alert and return the new update_count';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_update_alert FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_update_alert TO service_role;
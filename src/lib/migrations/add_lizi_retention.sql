@@ -0,0 +1,162 @@
+-- Retention support for lizi_retention.py
+--
+-- tracked_objects becomes a table partitioned by month on received_at, so
+-- old months are archived and dropped whole instead of deleted row by row.
+-- The existing table is attached as the DEFAULT partition and keeps every
+-- row received before the monthly partitions start; lizi_retention.py
+-- purges it in batches like the other tables.
+--
+-- reviews and ai_alerts stay as they are: Lizi updates them by review_id /
+-- event_id, and a partitioned table can only have unique indexes that
+-- include the partition key (ai_alerts_event_id_key would be lost).
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'public.tracked_objects'::regclass) = 'p' THEN
+        RETURN;  -- Already partitioned
+    END IF;
+
+    ALTER TABLE public.tracked_objects RENAME TO tracked_objects_legacy;
+    -- Free the index names for the partitioned indexes created below
+    ALTER INDEX IF EXISTS public.tracked_objects_pkey RENAME TO tracked_objects_legacy_pkey;
+    ALTER INDEX IF EXISTS public.idx_tracked_objects_tracked_object_id RENAME TO idx_tracked_objects_legacy_tracked_object_id;
+    ALTER INDEX IF EXISTS public.idx_tracked_objects_camera RENAME TO idx_tracked_objects_legacy_camera;
+    ALTER INDEX IF EXISTS public.idx_tracked_objects_received_at RENAME TO idx_tracked_objects_legacy_received_at;
+
+    CREATE TABLE public.tracked_objects (
+        id bigint NOT NULL DEFAULT nextval('public.tracked_objects_id_seq'),
+        tracked_object_type text,
+        tracked_object_id text,
+        camera text,
+        before_data jsonb,
+        after_data jsonb,
+        received_at timestamptz DEFAULT now(),
+        created_at timestamptz DEFAULT CURRENT_TIMESTAMP
+    ) PARTITION BY RANGE (received_at);
+
+    ALTER TABLE public.tracked_objects ATTACH PARTITION public.tracked_objects_legacy DEFAULT;
+END;
+$$;
+
+-- Indexes on the parent cascade to every partition (matching legacy indexes are attached, not rebuilt)
+CREATE INDEX IF NOT EXISTS idx_tracked_objects_tracked_object_id ON public.tracked_objects(tracked_object_id);
+CREATE INDEX IF NOT EXISTS idx_tracked_objects_camera ON public.tracked_objects(camera);
+CREATE INDEX IF NOT EXISTS idx_tracked_objects_received_at ON public.tracked_objects(received_at);
+CREATE INDEX IF NOT EXISTS idx_tracked_objects_id ON public.tracked_objects(id);
+
+ALTER TABLE public.tracked_objects ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow authenticated users to read tracked objects" ON public.tracked_objects;
+CREATE POLICY "Allow authenticated users to read tracked objects"
+    ON public.tracked_objects
+    FOR SELECT
+    TO authenticated
+    USING (true);
+
+DROP POLICY IF EXISTS "Allow service role to manage tracked objects" ON public.tracked_objects;
+CREATE POLICY "Allow service role to manage tracked objects"
+    ON public.tracked_objects
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
+
+-- Create the monthly partitions for the current month and p_months_ahead more.
+-- A month that already has rows in the default partition is skipped (those
+-- rows would have to move); it stays in the default partition.
+CREATE OR REPLACE FUNCTION public.lizi_ensure_tracked_partitions(p_months_ahead integer DEFAULT 2)
+RETURNS SETOF text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start timestamptz;
+    v_end timestamptz;
+    v_name text;
+BEGIN
+    FOR i IN 0..p_months_ahead LOOP
+        v_start := date_trunc('month', now()) + make_interval(months => i);
+        v_end := v_start + interval '1 month';
+        v_name := 'tracked_objects_' || to_char(v_start, 'YYYY_MM');
+        CONTINUE WHEN to_regclass('public.' || v_name) IS NOT NULL;
+        CONTINUE WHEN EXISTS (
+            SELECT 1 FROM public.tracked_objects_legacy
+            WHERE received_at >= v_start AND received_at < v_end
+        );
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.tracked_objects FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+        RETURN NEXT v_name;
+    END LOOP;
+END;
+$$;
+
+COMMENT ON FUNCTION public.lizi_ensure_tracked_partitions IS 'Create upcoming monthly tracked_objects partitions';
+
+SELECT public.lizi_ensure_tracked_partitions();
+
+-- Monthly partitions of tracked_objects with their bounds (the default partition is not listed)
+CREATE OR REPLACE FUNCTION public.lizi_tracked_partitions()
+RETURNS TABLE (partition_name text, range_start timestamptz, range_end timestamptz, total_bytes bigint)
+LANGUAGE sql
+AS $$
+    SELECT c.relname::text,
+           to_timestamp(substring(c.relname FROM '(\d{4}_\d{2})$'), 'YYYY_MM'),
+           to_timestamp(substring(c.relname FROM '(\d{4}_\d{2})$'), 'YYYY_MM') + interval '1 month',
+           pg_total_relation_size(c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'public.tracked_objects'::regclass
+      AND c.relname ~ '^tracked_objects_\d{4}_\d{2}$'
+    ORDER BY 2;
+$$;
+
+COMMENT ON FUNCTION public.lizi_tracked_partitions IS 'List monthly tracked_objects partitions';
+
+-- Drop one monthly partition (after lizi_retention.py has archived it)
+CREATE OR REPLACE FUNCTION public.lizi_drop_tracked_partition(p_partition text)
+RETURNS bigint
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_bytes bigint;
+BEGIN
+    IF p_partition !~ '^tracked_objects_\d{4}_\d{2}$' OR NOT EXISTS (
+        SELECT 1 FROM pg_inherits
+        WHERE inhparent = 'public.tracked_objects'::regclass
+          AND inhrelid = to_regclass('public.' || p_partition)
+    ) THEN
+        RAISE EXCEPTION 'Not a monthly tracked_objects partition: %', p_partition;
+    END IF;
+    v_bytes := pg_total_relation_size(to_regclass('public.' || p_partition));
+    EXECUTE format('DROP TABLE public.%I', p_partition);
+    RETURN v_bytes;
+END;
+$$;
+
+COMMENT ON FUNCTION public.lizi_drop_tracked_partition IS 'Drop an archived monthly tracked_objects partition, returning the bytes freed';
+
+-- On-disk size of tables, partitions included (for the retention report)
+CREATE OR REPLACE FUNCTION public.lizi_table_sizes(p_tables text[])
+RETURNS TABLE (table_name text, total_bytes bigint)
+LANGUAGE sql
+AS $$
+    SELECT t.name,
+           COALESCE((
+               SELECT sum(pg_total_relation_size(p.relid))
+               FROM pg_partition_tree(to_regclass('public.' || t.name)) AS p
+           ), 0)::bigint
+    FROM unnest(p_tables) AS t(name);
+$$;
+
+COMMENT ON FUNCTION public.lizi_table_sizes IS 'Total size of tables including their partitions, indexes and TOAST';
+
+-- Only the service role (Lizi) may call them
+REVOKE ALL ON FUNCTION public.lizi_ensure_tracked_partitions FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_ensure_tracked_partitions TO service_role;
+REVOKE ALL ON FUNCTION public.lizi_tracked_partitions FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_tracked_partitions TO service_role;
+REVOKE ALL ON FUNCTION public.lizi_drop_tracked_partition FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_drop_tracked_partition TO service_role;
+REVOKE ALL ON FUNCTION public.lizi_table_sizes FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_table_sizes TO service_role;
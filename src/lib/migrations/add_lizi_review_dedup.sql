@@ -0,0 +1,67 @@
+-- Make lizi_update_alert() idempotent per review (Lizi's seen_reviews covers
+-- one process; this covers restarts and other instances).
+-- Reviews of an alert are applied in created_at order, so a review that is
+-- not newer than the alert's latest_review_timestamp has already been
+-- applied: the call changes nothing and returns the current update_count.
+-- Lizi sets latest_review_timestamp when it creates an alert, so a
+-- redelivered creating review is ignored too.
+-- Relies on the unique ai_alerts_event_id_key index (add_lizi_shard_leases.sql)
+-- for alert creation itself.
+DROP FUNCTION IF EXISTS public.lizi_update_alert(uuid, text, timestamptz, jsonb, jsonb, jsonb, jsonb, integer);
+
+CREATE OR REPLACE FUNCTION public.lizi_update_alert(
+    p_alert_id uuid,
+    p_review_type text,
+    p_review_timestamp timestamptz,
+    p_objects jsonb DEFAULT NULL,
+    p_zones jsonb DEFAULT NULL,
+    p_payload jsonb DEFAULT NULL,
+    p_delta jsonb DEFAULT NULL,
+    p_increment integer DEFAULT 1
+)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE public.ai_alerts
+        SET updated_at = now(),
+            latest_review_type = p_review_type,
+            latest_review_timestamp = p_review_timestamp,
+            update_count = COALESCE(update_count, 0) + COALESCE(p_increment, 1),
+            ended_at = CASE WHEN p_review_type = 'end' THEN now() ELSE ended_at END,
+            additional_objects = CASE
+                WHEN p_objects IS NULL OR jsonb_array_length(p_objects) = 0 THEN additional_objects
+                ELSE (
+                    SELECT jsonb_agg(DISTINCT item)
+                    FROM jsonb_array_elements(COALESCE(additional_objects, '[]'::jsonb) || p_objects) AS item
+                )
+            END,
+            additional_zones = CASE
+                WHEN p_zones IS NULL OR jsonb_array_length(p_zones) = 0 THEN additional_zones
+                ELSE (
+                    SELECT jsonb_agg(DISTINCT item)
+                    FROM jsonb_array_elements(COALESCE(additional_zones, '[]'::jsonb) || p_zones) AS item
+                )
+            END,
+            full_review_payload = COALESCE(p_payload, full_review_payload),
+            payload_deltas = CASE
+                WHEN p_delta IS NULL THEN payload_deltas
+                ELSE COALESCE(payload_deltas, '[]'::jsonb) || jsonb_build_array(p_delta)
+            END
+        WHERE id = p_alert_id
+          AND (p_review_timestamp IS NULL
+               OR latest_review_timestamp IS NULL
+               OR p_review_timestamp > latest_review_timestamp)
+        RETURNING update_count
+    )
+    SELECT update_count FROM updated
+    UNION ALL
+    SELECT update_count FROM public.ai_alerts
+    WHERE id = p_alert_id AND NOT EXISTS (SELECT 1 FROM updated);
+$$;
+
+COMMENT ON FUNCTION public.lizi_update_alert IS 'Apply one or more (coalesced) review updates to an alert, ignoring an already applied review, and return the update_count';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_update_alert FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_update_alert TO service_role;
@@ -0,0 +1,86 @@
+-- Recognise repeated review messages by a fingerprint instead of a timestamp.
+--
+-- Lizi stamps reviews it receives over MQTT with their receipt time, while
+-- the reviews rows it catches up on carry the dashboard's created_at, so
+-- neither a repeated MQTT message nor a row for a message already handled
+-- over MQTT had a timestamp that could be recognised, and timestamps from
+-- the two paths cannot be ordered against each other. Lizi now sends
+-- review_key() (lizi_decisions.py), a hash of the review type and Frigate's
+-- `after` state that every delivery of a message shares, and stores it in
+-- latest_review_key; a call with the key of the alert's latest review
+-- changes nothing, and neither does a 'new' review (the alert was created
+-- from it, so it can only be a repeat). Replaces the timestamp check of
+-- add_lizi_review_dedup.sql.
+--
+-- This is the final definition of lizi_update_alert(): it drops every
+-- earlier signature, so exactly one overload remains and calls without
+-- p_review_key resolve to it. It returns (new_update_count, applied), so Lizi
+-- counts rollups only for applied updates. Run it after the migrations that
+-- define earlier versions (see "Database migrations" in README.md).
+ALTER TABLE public.ai_alerts
+ADD COLUMN IF NOT EXISTS latest_review_key text;
+
+COMMENT ON COLUMN ai_alerts.latest_review_key IS 'Fingerprint of the latest review message applied (Lizi review_key())';
+
+DROP FUNCTION IF EXISTS public.lizi_update_alert(uuid, text, timestamptz, jsonb, jsonb, jsonb);
+DROP FUNCTION IF EXISTS public.lizi_update_alert(uuid, text, timestamptz, jsonb, jsonb, jsonb, jsonb);
+DROP FUNCTION IF EXISTS public.lizi_update_alert(uuid, text, timestamptz, jsonb, jsonb, jsonb, jsonb, integer);
+DROP FUNCTION IF EXISTS public.lizi_update_alert(uuid, text, timestamptz, jsonb, jsonb, jsonb, jsonb, integer, text);
+
+CREATE OR REPLACE FUNCTION public.lizi_update_alert(
+    p_alert_id uuid,
+    p_review_type text,
+    p_review_timestamp timestamptz,
+    p_objects jsonb DEFAULT NULL,
+    p_zones jsonb DEFAULT NULL,
+    p_payload jsonb DEFAULT NULL,
+    p_delta jsonb DEFAULT NULL,
+    p_increment integer DEFAULT 1,
+    p_review_key text DEFAULT NULL
+)
+RETURNS TABLE (new_update_count integer, applied boolean)
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE public.ai_alerts
+        SET updated_at = now(),
+            latest_review_type = p_review_type,
+            latest_review_timestamp = p_review_timestamp,
+            latest_review_key = p_review_key,
+            update_count = COALESCE(update_count, 0) + COALESCE(p_increment, 1),
+            ended_at = CASE WHEN p_review_type = 'end' THEN now() ELSE ended_at END,
+            additional_objects = CASE
+                WHEN p_objects IS NULL OR jsonb_array_length(p_objects) = 0 THEN additional_objects
+                ELSE (
+                    SELECT jsonb_agg(DISTINCT item)
+                    FROM jsonb_array_elements(COALESCE(additional_objects, '[]'::jsonb) || p_objects) AS item
+                )
+            END,
+            additional_zones = CASE
+                WHEN p_zones IS NULL OR jsonb_array_length(p_zones) = 0 THEN additional_zones
+                ELSE (
+                    SELECT jsonb_agg(DISTINCT item)
+                    FROM jsonb_array_elements(COALESCE(additional_zones, '[]'::jsonb) || p_zones) AS item
+                )
+            END,
+            full_review_payload = COALESCE(p_payload, full_review_payload),
+            payload_deltas = CASE
+                WHEN p_delta IS NULL THEN payload_deltas
+                ELSE COALESCE(payload_deltas, '[]'::jsonb) || jsonb_build_array(p_delta)
+            END
+        WHERE id = p_alert_id
+          AND (p_review_key IS NULL OR latest_review_key IS DISTINCT FROM p_review_key)
+          AND p_review_type IS DISTINCT FROM 'new'  -- The alert was created from it; this is a repeat
+        RETURNING update_count
+    )
+    SELECT update_count, true FROM updated
+    UNION ALL
+    SELECT update_count, false FROM public.ai_alerts
+    WHERE id = p_alert_id AND NOT EXISTS (SELECT 1 FROM updated);
+$$;
+
+COMMENT ON FUNCTION public.lizi_update_alert IS 'Apply one or more (coalesced) review updates to an alert, ignoring a review message (p_review_key) that was already applied; returns the update_count and whether the update was applied';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_update_alert FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_update_alert TO service_role;
@@ -0,0 +1,32 @@
+-- Only write a review status onto the message it was decided on.
+--
+-- In MQTT mode the dashboard keeps one reviews row per review_id and
+-- overwrites it with every message (status back to 'waiting'), while Lizi
+-- handles the same messages straight from MQTT. A status Lizi writes for one
+-- message could land on a row that already holds the next one, marking it
+-- processed before Lizi ever saw it. Lizi now sends the review_type and
+-- after_data it decided on (status_guard() in lizi.py); rows holding another
+-- message are left alone and stay 'waiting', so the catch-up picks them up.
+-- Entries without after_data update the row unconditionally, as before.
+CREATE OR REPLACE FUNCTION public.lizi_update_review_statuses(p_updates jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE public.reviews AS r
+        SET status = u.status,
+            reasoning = COALESCE(u.reasoning, r.reasoning)
+        FROM jsonb_to_recordset(p_updates) AS u(review_id text, status text, reasoning jsonb, review_type text, after_data jsonb)
+        WHERE r.review_id = u.review_id
+          AND (u.after_data IS NULL
+               OR (r.review_type IS NOT DISTINCT FROM u.review_type AND r.after_data = u.after_data))
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated;
+$$;
+
+COMMENT ON FUNCTION public.lizi_update_review_statuses IS 'Set status/reasoning for many reviews in one statement, only on rows still holding the message decided on';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_update_review_statuses FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_update_review_statuses TO service_role;
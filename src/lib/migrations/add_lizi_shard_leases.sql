@@ -0,0 +1,118 @@
+-- Multi-instance Lizi (LIZI_SHARD_COUNT): shard leases and idempotent alert creation
+
+-- 1. One alert per review. Remove duplicates left by concurrent inserts,
+--    keeping the row with user feedback, then the most updated, then the oldest.
+WITH ranked AS (
+    SELECT id,
+           row_number() OVER (
+               PARTITION BY event_id
+               ORDER BY (user_feedback IS NULL), update_count DESC NULLS LAST, created_at, id
+           ) AS rn
+    FROM public.ai_alerts
+)
+DELETE FROM public.ai_alerts
+WHERE id IN (SELECT id FROM ranked WHERE rn > 1);
+
+-- Lizi upserts on event_id (on_conflict=event_id); this replaces the plain index
+CREATE UNIQUE INDEX IF NOT EXISTS ai_alerts_event_id_key ON public.ai_alerts(event_id);
+DROP INDEX IF EXISTS idx_ai_alerts_event_id;
+
+-- 2. Shard leases: each running Lizi instance owns a share of the shards
+CREATE TABLE IF NOT EXISTS public.lizi_shard_leases (
+    shard integer PRIMARY KEY,
+    owner text,
+    expires_at timestamptz NOT NULL DEFAULT '-infinity',
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE public.lizi_shard_leases IS 'Which Lizi instance (owner) processes the reviews of each camera shard, until expires_at';
+
+-- Only the service role (Lizi) touches leases
+ALTER TABLE public.lizi_shard_leases ENABLE ROW LEVEL SECURITY;
+
+-- Renew p_owner's leases and move it toward a fair share of p_shard_count shards:
+-- free or expired shards are claimed with FOR UPDATE SKIP LOCKED (so concurrent
+-- callers never block on or double-claim a shard), and shards beyond the fair
+-- share are handed back for newly started instances. Returns the owned shards.
+CREATE OR REPLACE FUNCTION public.lizi_claim_shards(
+    p_owner text,
+    p_shard_count integer,
+    p_lease_seconds integer DEFAULT 30
+)
+RETURNS SETOF integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_expires timestamptz := now() + make_interval(secs => p_lease_seconds);
+    v_others integer;
+    v_fair_share integer;
+    v_owned integer;
+BEGIN
+    INSERT INTO public.lizi_shard_leases (shard)
+    SELECT generate_series(0, p_shard_count - 1)
+    ON CONFLICT (shard) DO NOTHING;
+
+    UPDATE public.lizi_shard_leases
+    SET expires_at = v_expires, updated_at = now()
+    WHERE owner = p_owner AND shard < p_shard_count;
+
+    SELECT count(DISTINCT owner) INTO v_others
+    FROM public.lizi_shard_leases
+    WHERE owner <> p_owner AND expires_at > now();
+    v_fair_share := ceil(p_shard_count::numeric / (v_others + 1));
+
+    SELECT count(*) INTO v_owned
+    FROM public.lizi_shard_leases
+    WHERE owner = p_owner AND shard < p_shard_count;
+
+    IF v_owned > v_fair_share THEN
+        UPDATE public.lizi_shard_leases
+        SET owner = NULL, expires_at = '-infinity', updated_at = now()
+        WHERE shard IN (
+            SELECT shard FROM public.lizi_shard_leases
+            WHERE owner = p_owner AND shard < p_shard_count
+            ORDER BY shard DESC
+            LIMIT v_owned - v_fair_share
+        );
+    ELSIF v_owned < v_fair_share THEN
+        UPDATE public.lizi_shard_leases
+        SET owner = p_owner, expires_at = v_expires, updated_at = now()
+        WHERE shard IN (
+            SELECT shard FROM public.lizi_shard_leases
+            WHERE shard < p_shard_count AND (owner IS NULL OR expires_at <= now())
+            ORDER BY shard
+            LIMIT v_fair_share - v_owned
+            FOR UPDATE SKIP LOCKED
+        );
+    END IF;
+
+    RETURN QUERY
+    SELECT shard FROM public.lizi_shard_leases
+    WHERE owner = p_owner AND shard < p_shard_count
+    ORDER BY shard;
+END;
+$$;
+
+COMMENT ON FUNCTION public.lizi_claim_shards IS 'Heartbeat for a Lizi instance: renew, claim and rebalance shard leases';
+
+-- Give up all of p_owner's leases (clean shutdown)
+CREATE OR REPLACE FUNCTION public.lizi_release_shards(p_owner text)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH released AS (
+        UPDATE public.lizi_shard_leases
+        SET owner = NULL, expires_at = '-infinity', updated_at = now()
+        WHERE owner = p_owner
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM released;
+$$;
+
+COMMENT ON FUNCTION public.lizi_release_shards IS 'Release every shard lease held by a Lizi instance';
+
+-- Only the service role (Lizi) may call them
+REVOKE ALL ON FUNCTION public.lizi_claim_shards FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_claim_shards TO service_role;
+REVOKE ALL ON FUNCTION public.lizi_release_shards FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_release_shards TO service_role;
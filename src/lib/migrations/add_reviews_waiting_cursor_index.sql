@@ -0,0 +1,6 @@
+-- Index backing Lizi's cursor-based poll:
+--   WHERE status = 'waiting' AND (created_at, id) > (cursor) ORDER BY created_at, id LIMIT n
+-- Partial, so it only holds the small set of reviews still waiting for Lizi.
+CREATE INDEX IF NOT EXISTS idx_reviews_waiting_cursor
+    ON reviews (created_at, id)
+    WHERE status = 'waiting';
@@ -0,0 +1,146 @@
+-- Hourly per-camera/per-label alert counters for dashboard summaries (lizi_rollups.py)
+-- Lizi adds alerts/detections/updates/ended through lizi_increment_rollups();
+-- triggered and user_feedback counts are kept by the trigger below.
+CREATE TABLE IF NOT EXISTS public.ai_alert_rollups (
+    bucket timestamptz NOT NULL, -- start of the hour
+    camera text NOT NULL,
+    label text NOT NULL DEFAULT '',
+    alerts integer NOT NULL DEFAULT 0, -- frigate_categorization = 'alert'
+    detections integer NOT NULL DEFAULT 0, -- frigate_categorization = 'detection'
+    updates integer NOT NULL DEFAULT 0, -- update/end reviews applied
+    ended integer NOT NULL DEFAULT 0,
+    triggered integer NOT NULL DEFAULT 0,
+    feedback_good integer NOT NULL DEFAULT 0,
+    feedback_false_alert integer NOT NULL DEFAULT 0,
+    feedback_unsure integer NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (bucket, camera, label)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_alert_rollups_camera_bucket ON ai_alert_rollups(camera, bucket);
+
+ALTER TABLE ai_alert_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow authenticated users to read ai_alert_rollups"
+    ON ai_alert_rollups
+    FOR SELECT
+    TO authenticated
+    USING (true);
+
+CREATE POLICY "Allow service role to manage ai_alert_rollups"
+    ON ai_alert_rollups
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
+
+-- Add a batch of counter deltas
+-- p_rows is a JSON array of {"bucket", "camera", "label", "alerts", "detections", "updates", "ended"};
+-- rows for the same cell are summed first, so merged batches cannot hit a cell twice
+CREATE OR REPLACE FUNCTION public.lizi_increment_rollups(p_rows jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO public.ai_alert_rollups AS r (bucket, camera, label, alerts, detections, updates, ended)
+        SELECT date_trunc('hour', d.bucket), d.camera, COALESCE(d.label, ''),
+               sum(COALESCE(d.alerts, 0)), sum(COALESCE(d.detections, 0)),
+               sum(COALESCE(d.updates, 0)), sum(COALESCE(d.ended, 0))
+        FROM jsonb_to_recordset(p_rows) AS d(bucket timestamptz, camera text, label text, alerts integer, detections integer, updates integer, ended integer)
+        GROUP BY 1, 2, 3
+        ON CONFLICT (bucket, camera, label) DO UPDATE
+        SET alerts = r.alerts + EXCLUDED.alerts,
+            detections = r.detections + EXCLUDED.detections,
+            updates = r.updates + EXCLUDED.updates,
+            ended = r.ended + EXCLUDED.ended,
+            updated_at = now()
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM upserted;
+$$;
+
+COMMENT ON FUNCTION public.lizi_increment_rollups IS 'Add Lizi''s buffered alert counts to ai_alert_rollups';
+
+-- Keep triggered/feedback counts in step with ai_alerts
+CREATE OR REPLACE FUNCTION public.ai_alert_rollups_track_decisions()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.ai_alert_rollups AS r (bucket, camera, label, triggered, feedback_good, feedback_false_alert, feedback_unsure)
+    VALUES (
+        date_trunc('hour', NEW.created_at),
+        NEW.camera,
+        COALESCE(NEW.label, ''),
+        COALESCE(NEW.triggered, false)::integer - COALESCE(OLD.triggered, false)::integer,
+        COALESCE(NEW.user_feedback = 'good', false)::integer - COALESCE(OLD.user_feedback = 'good', false)::integer,
+        COALESCE(NEW.user_feedback = 'false_alert', false)::integer - COALESCE(OLD.user_feedback = 'false_alert', false)::integer,
+        COALESCE(NEW.user_feedback = 'unsure', false)::integer - COALESCE(OLD.user_feedback = 'unsure', false)::integer
+    )
+    ON CONFLICT (bucket, camera, label) DO UPDATE
+    SET triggered = r.triggered + EXCLUDED.triggered,
+        feedback_good = r.feedback_good + EXCLUDED.feedback_good,
+        feedback_false_alert = r.feedback_false_alert + EXCLUDED.feedback_false_alert,
+        feedback_unsure = r.feedback_unsure + EXCLUDED.feedback_unsure,
+        updated_at = now();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS ai_alerts_rollup_decisions ON public.ai_alerts;
+CREATE TRIGGER ai_alerts_rollup_decisions
+    AFTER UPDATE OF triggered, user_feedback ON public.ai_alerts
+    FOR EACH ROW
+    WHEN (OLD.triggered IS DISTINCT FROM NEW.triggered OR OLD.user_feedback IS DISTINCT FROM NEW.user_feedback)
+    EXECUTE FUNCTION public.ai_alert_rollups_track_decisions();
+
+-- Rebuild rollups from ai_alerts (python lizi_rollups.py backfill)
+-- Buckets before the oldest alert still in ai_alerts are kept, so purged history survives
+CREATE OR REPLACE FUNCTION public.lizi_rebuild_rollups(p_since timestamptz DEFAULT NULL)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from timestamptz;
+    v_rows integer;
+BEGIN
+    SELECT date_trunc('hour', min(created_at)) INTO v_from
+    FROM public.ai_alerts
+    WHERE p_since IS NULL OR created_at >= date_trunc('hour', p_since);
+    IF v_from IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    -- Hold off increments and triggers until the rebuilt buckets are in place
+    LOCK TABLE public.ai_alert_rollups IN EXCLUSIVE MODE;
+    DELETE FROM public.ai_alert_rollups WHERE bucket >= v_from;
+
+    INSERT INTO public.ai_alert_rollups (bucket, camera, label, alerts, detections, updates, ended,
+                                         triggered, feedback_good, feedback_false_alert, feedback_unsure)
+    SELECT date_trunc('hour', created_at), camera, COALESCE(label, ''),
+           count(*) FILTER (WHERE frigate_categorization = 'alert'),
+           count(*) FILTER (WHERE frigate_categorization IS DISTINCT FROM 'alert'),
+           COALESCE(sum(update_count), 0),
+           count(*) FILTER (WHERE ended_at IS NOT NULL),
+           count(*) FILTER (WHERE triggered),
+           count(*) FILTER (WHERE user_feedback = 'good'),
+           count(*) FILTER (WHERE user_feedback = 'false_alert'),
+           count(*) FILTER (WHERE user_feedback = 'unsure')
+    FROM public.ai_alerts
+    WHERE created_at >= v_from
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+COMMENT ON FUNCTION public.lizi_rebuild_rollups IS 'Recompute ai_alert_rollups buckets from ai_alerts';
+
+-- Only the service role (Lizi) may call them
+REVOKE ALL ON FUNCTION public.lizi_increment_rollups FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_increment_rollups TO service_role;
+REVOKE ALL ON FUNCTION public.lizi_rebuild_rollups FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_rebuild_rollups TO service_role;
@@ -0,0 +1,44 @@
+-- Atomically apply a review update to an ai_alerts row (used by Lizi's update_alert)
+-- Bumps update_count server-side and merges additional_objects/additional_zones
+-- in a single statement, so concurrent Lizi workers never lose an increment.
+CREATE OR REPLACE FUNCTION public.lizi_update_alert(
+    p_alert_id uuid,
+    p_review_type text,
+    p_review_timestamp timestamptz,
+    p_objects jsonb DEFAULT NULL,
+    p_zones jsonb DEFAULT NULL,
+    p_payload jsonb DEFAULT NULL
+)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    UPDATE public.ai_alerts
+    SET updated_at = now(),
+        latest_review_type = p_review_type,
+        latest_review_timestamp = p_review_timestamp,
+        update_count = COALESCE(update_count, 0) + 1,
+        ended_at = CASE WHEN p_review_type = 'end' THEN now() ELSE ended_at END,
+        additional_objects = CASE
+            WHEN p_objects IS NULL OR jsonb_array_length(p_objects) = 0 THEN additional_objects
+            ELSE (
+                SELECT jsonb_agg(DISTINCT item)
+                FROM jsonb_array_elements(COALESCE(additional_objects, '[]'::jsonb) || p_objects) AS item
+            )
+        END,
+        additional_zones = CASE
+            WHEN p_zones IS NULL OR jsonb_array_length(p_zones) = 0 THEN additional_zones
+            ELSE (
+                SELECT jsonb_agg(DISTINCT item)
+                FROM jsonb_array_elements(COALESCE(additional_zones, '[]'::jsonb) || p_zones) AS item
+            )
+        END,
+        full_review_payload = COALESCE(p_payload, full_review_payload)
+    WHERE id = p_alert_id
+    RETURNING update_count;
+$$;
+
+COMMENT ON FUNCTION public.lizi_update_alert IS 'Apply a review update to an alert and return the new update_count';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_update_alert FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_update_alert TO service_role;
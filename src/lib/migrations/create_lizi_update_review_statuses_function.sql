@@ -0,0 +1,25 @@
+-- Bulk-update reviews.status/reasoning after Lizi processes a page of reviews
+-- p_updates is a JSON array of {"review_id": ..., "status": ..., "reasoning": {...}}
+CREATE OR REPLACE FUNCTION public.lizi_update_review_statuses(p_updates jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE public.reviews AS r
+        SET status = u.status,
+            reasoning = COALESCE(u.reasoning, r.reasoning)
+        FROM jsonb_to_recordset(p_updates) AS u(review_id text, status text, reasoning jsonb)
+        WHERE r.review_id = u.review_id
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated;
+$$;
+
+COMMENT ON FUNCTION public.lizi_update_review_statuses IS 'Set status/reasoning for many reviews in one statement';
+
+-- Only the service role (Lizi) may call it
+REVOKE ALL ON FUNCTION public.lizi_update_review_statuses FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.lizi_update_review_statuses TO service_role;
+
+-- Speed up the review_id join used above and by the per-row fallback
+CREATE INDEX IF NOT EXISTS idx_reviews_review_id ON reviews(review_id);
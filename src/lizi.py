@@ -8,101 +8,778 @@ and creating/updating alerts based on detection logic.
 import os
 import json
 import time
+import zlib
+import queue
+import signal
+import socket
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from lizi_db import LazyClient, get_client, is_transient_error, is_missing_function_error, close as close_db
+from lizi_metrics import Counter, Gauge, Histogram, start_metrics_server
+from lizi_logging import configure_logging
+from lizi_decisions import (
+    COMPACT_PAYLOADS, PAYLOAD_SKIP_FIELDS, should_create_alert, storage_payload, review_state,
+    review_delta, merge_reviews, build_alert_data, review_from_mqtt, review_key
+)
 
-# Load environment variables
+# Load environment variables (the settings below are read at import time)
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("/app/logs/lizi.log"),
-        logging.StreamHandler()
-    ]
-)
-
-# Create separate loggers
+# Create separate loggers; handlers are only attached by main(), so importing
+# this module (tests, lizi_bench.py) opens no log files
 logger = logging.getLogger('lizi')
 watcher_logger = logging.getLogger('watchers')
 watched_logger = logging.getLogger('watched')
 
-# Configure httpx logger to use watchers name
-httpx_logger = logging.getLogger('httpx')
-httpx_logger.name = 'watchers'
+# Shared, connection-pooled Supabase client, created on first use
+supabase = LazyClient(get_client)
+
+# Pipeline metrics, served on LIZI_METRICS_PORT (0 disables the endpoint)
+METRICS_PORT = int(os.getenv('LIZI_METRICS_PORT', '9108'))
+REVIEWS_TOTAL = Counter('lizi_reviews_total', 'Reviews processed, by outcome', ['outcome'])
+REVIEW_PROCESSING_SECONDS = Histogram('lizi_review_processing_seconds', 'Time spent in process_review per review')
+REVIEW_LATENCY_SECONDS = Histogram('lizi_review_latency_seconds', 'Time from Lizi receiving a review (MQTT message or poll) to its alert being written')
+REVIEW_WAIT_SECONDS = Histogram('lizi_review_wait_seconds', 'Time from the Frigate event (start for new, end for end reviews) to Lizi finishing it')
+SUPABASE_REQUEST_SECONDS = Histogram('lizi_supabase_request_seconds', 'Supabase request duration', ['operation'])
+SUPABASE_ERRORS_TOTAL = Counter('lizi_supabase_errors_total', 'Failed Supabase requests', ['operation'])
+SUPABASE_CALLS_PER_REVIEW = Histogram('lizi_supabase_calls_per_review', 'Supabase requests needed per review', buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10))
+_call_counter = threading.local()
+
+def _execute(operation, query):
+    """
+    Execute a Supabase query or RPC builder, recording its duration under `operation`.
+    
+    Returns:
+        APIResponse: The query result
+    """
+    _call_counter.count = getattr(_call_counter, 'count', 0) + 1
+    started = time.perf_counter()
+    try:
+        return query.execute()
+    except Exception:
+        SUPABASE_ERRORS_TOTAL.inc(operation=operation)
+        raise
+    finally:
+        SUPABASE_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+def _supabase_calls():
+    """Supabase requests made so far by the current thread."""
+    return getattr(_call_counter, 'count', 0)
+
+def _review_wait_seconds(review):
+    """
+    Seconds since Frigate published the review, from the epoch times in its payload.
+
+    A 'new' review is published at the event's start_time and an 'end' review
+    at its end_time. 'update' reviews carry no publish time, and created_at
+    is no substitute (receipt time for MQTT reviews, Central wall time stored
+    as UTC for dashboard rows), so they are not measured.
+
+    Returns:
+        float: The wait, or None if it cannot be measured
+    """
+    after = review.get('after_data')
+    if not isinstance(after, dict):
+        return None
+    field = {'new': 'start_time', 'end': 'end_time'}.get(review.get('review_type'))
+    published = after.get(field) if field else None
+    if not isinstance(published, (int, float)):
+        return None
+    return time.time() - published
+
+def _record_review(review, outcome, received_at=None, calls=None):
+    """Count a finished review, record its latency metrics and log a structured summary."""
+    REVIEWS_TOTAL.inc(outcome=outcome)
+    latency = None
+    if received_at is not None:
+        latency = time.monotonic() - received_at
+        REVIEW_LATENCY_SECONDS.observe(latency)
+    watched_logger.info(
+        "Processed %s review %s from camera %s: %s",
+        review.get('review_type'), review.get('review_id'), review.get('camera'), outcome,
+        extra={
+            "review_id": review.get('review_id'),
+            "camera": review.get('camera'),
+            "review_type": review.get('review_type'),
+            "outcome": outcome,
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "calls": calls
+        }
+    )
+    wait = _review_wait_seconds(review)
+    if wait is not None and wait >= 0:
+        REVIEW_WAIT_SECONDS.observe(wait)
+    if calls is not None:
+        SUPABASE_CALLS_PER_REVIEW.observe(calls)
+
+# Review ingestion: 'mqtt' subscribes to Frigate directly, 'poll' queries Supabase every 5s
+INGEST_MODE = os.getenv('LIZI_INGEST_MODE', 'mqtt' if os.getenv('MQTT_HOST') else 'poll').lower()
+REVIEW_TOPIC = os.getenv('LIZI_REVIEW_TOPIC', 'frigate/reviews')
+
+# Increment update_count server-side via the lizi_update_alert() RPC
+ATOMIC_UPDATES = os.getenv('LIZI_ATOMIC_UPDATES', 'true').lower() == 'true'
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv('SUPABASE_URL', 'http://10.0.1.217:8000'),
-    os.getenv('SERVICE_ROLE_KEY')
+# Insert alerts with an upsert on event_id (needs the unique index from add_lizi_shard_leases.sql)
+UPSERT_ALERTS = True
+
+# Send review_key() fingerprints to ai_alerts / lizi_update_alert() (add_lizi_review_keys.sql);
+# switched off automatically on databases without them
+REVIEW_KEYS = True
+
+# Seconds to merge consecutive 'update' reviews of one review before writing them (0 writes each one)
+COALESCE_WINDOW = float(os.getenv('LIZI_COALESCE_WINDOW', '0'))
+
+# Reviews per batch when working through a backlog (1 processes them one at a time)
+BATCH_SIZE = int(os.getenv('LIZI_BATCH_SIZE', '100'))
+
+# Parallel review lanes (1 processes everything on the main thread) and per-lane queue bound
+WORKERS = int(os.getenv('LIZI_WORKERS', '1'))
+WORKER_QUEUE_SIZE = int(os.getenv('LIZI_WORKER_QUEUE_SIZE', '100'))
+
+# Multiple Lizi instances: reviews are split into LIZI_SHARD_COUNT camera shards
+# leased through lizi_claim_shards() (0 runs a single instance that handles everything)
+SHARD_COUNT = int(os.getenv('LIZI_SHARD_COUNT', '0'))
+SHARD_LEASE_SECONDS = float(os.getenv('LIZI_SHARD_LEASE_SECONDS', '30'))
+WORKER_ID = os.getenv('LIZI_WORKER_ID', socket.gethostname())
+# Files on the shared lizi-logs volume (log, cursor, outbox) are kept per instance when sharding
+_STATE_SUFFIX = f".{WORKER_ID}" if SHARD_COUNT > 0 else ""
+
+# Poller: seconds between polls, rows per page and where the (created_at, id) high-water mark is kept
+POLL_INTERVAL = float(os.getenv('LIZI_POLL_INTERVAL', '5'))
+POLL_PAGE_SIZE = int(os.getenv('LIZI_POLL_PAGE_SIZE', '500'))
+CURSOR_PATH = os.getenv('LIZI_CURSOR_PATH', f'/app/logs/lizi_cursor{_STATE_SUFFIX}.json')
+# Seconds behind the cursor read again on every poll (rows that committed late or are still
+# 'waiting'), and seconds between full rescans of all waiting reviews (also run at startup; 0 = never)
+POLL_LOOKBACK = float(os.getenv('LIZI_POLL_LOOKBACK', '300'))
+RESCAN_INTERVAL = float(os.getenv('LIZI_RESCAN_INTERVAL', '3600'))
+# Seconds after which reviews whose guarded status write matched no row are re-read, and how
+# often that is retried while the dashboard has not stored the row yet (0 = only rely on rescans)
+STATUS_RECHECK_DELAY = float(os.getenv('LIZI_STATUS_RECHECK_DELAY', '10'))
+STATUS_RECHECK_ATTEMPTS = int(os.getenv('LIZI_STATUS_RECHECK_ATTEMPTS', '6'))
+
+# Only the review columns process_review needs (skips before_data, reasoning, ...)
+REVIEW_COLUMNS = 'id, review_id, review_type, camera, zones, objects, clip_url, snapshot_url, metadata, reason, is_alert, created_at, after_data'
+
+# COMPACT_PAYLOADS / PAYLOAD_SKIP_FIELDS (full_review_payload trimming) live in lizi_decisions
+
+# Prefetch alert snapshots into the local media cache served by lizi_api (on when FRIGATE_API_URL is set)
+MEDIA_PREFETCH = os.getenv('LIZI_MEDIA_PREFETCH', 'true' if os.getenv('FRIGATE_API_URL') else 'false').lower() == 'true'
+MEDIA_WORKERS = int(os.getenv('LIZI_MEDIA_WORKERS', '4'))
+MEDIA_QUEUE_SIZE = int(os.getenv('LIZI_MEDIA_QUEUE_SIZE', '200'))
+
+# Score new alerts in this process (see lizi_evaluator.py for the backend and batching settings)
+EVALUATE = os.getenv('LIZI_EVALUATE', 'false').lower() == 'true'
+
+# Ingest Frigate's per-object stream into tracked_objects (see lizi_tracked.py); leave off
+# while the dashboard's MQTT route still writes the table
+TRACKED_INGEST = os.getenv('LIZI_TRACKED_INGEST', 'false').lower() == 'true'
+
+# Maintain ai_alert_rollups (create_ai_alert_rollups.sql); switched off automatically if it is not deployed
+ROLLUPS = os.getenv('LIZI_ROLLUPS', 'true').lower() == 'true'
+
+# Journal for writes Supabase could not take (empty disables it) and its flush tuning
+OUTBOX_PATH = os.getenv('LIZI_OUTBOX_PATH', f'/app/logs/lizi_outbox{_STATE_SUFFIX}.db')
+OUTBOX_BATCH_SIZE = int(os.getenv('LIZI_OUTBOX_BATCH_SIZE', '200'))
+OUTBOX_MAX_DELAY = float(os.getenv('LIZI_OUTBOX_MAX_DELAY', '60'))
+
+class AlertCache:
+    """
+    Bounded LRU/TTL index of review_id -> (alert id, update_count, alert row).
+
+    Lets process_review() and update_alert() skip the ai_alerts lookups for
+    reviews Lizi has already seen. Entries expire after `ttl` seconds so a
+    stale count never outlives a review lifecycle by much.
+    """
+
+    def __init__(self, max_size=5000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, review_id):
+        """Return {'alert_id', 'update_count', 'state', 'row'} for a review, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(review_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry["stored_at"] > self.ttl:
+                del self._entries[review_id]
+                return None
+            self._entries.move_to_end(review_id)
+            return {"alert_id": entry["alert_id"], "update_count": entry["update_count"], "state": entry["state"], "row": entry["row"]}
+
+    def put(self, review_id, alert_id, update_count, state=None, row=None):
+        """
+        Remember the alert for a review, evicting the least recently used entry if full.
+
+        `state` is the last review_state() written for the alert and `row` its
+        alert_row() (where its rollup counts go); when None the previously
+        cached value is kept.
+        """
+        if self.max_size <= 0 or not review_id or not alert_id:
+            return
+        with self._lock:
+            previous = self._entries.get(review_id)
+            if previous is not None and previous["alert_id"] == alert_id:
+                state = previous["state"] if state is None else state
+                row = previous["row"] if row is None else row
+            self._entries[review_id] = {
+                "alert_id": alert_id,
+                "update_count": update_count,
+                "state": state,
+                "row": row,
+                "stored_at": time.monotonic()
+            }
+            self._entries.move_to_end(review_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+alert_cache = AlertCache(
+    max_size=int(os.getenv('LIZI_ALERT_CACHE_SIZE', '5000')),
+    ttl=float(os.getenv('LIZI_ALERT_CACHE_TTL', '3600'))
 )
 
-logger.info("Environment variables loaded:")
-logger.info(f"SUPABASE_URL: {os.getenv('SUPABASE_URL', 'http://10.0.1.217:8000')}")
-logger.info(f"SERVICE_ROLE_KEY: {'Present' if os.getenv('SERVICE_ROLE_KEY') else 'Missing'}")
+# ai_alerts columns read when looking up the alert of a review
+ALERT_LOOKUP_COLUMNS = 'id, update_count, created_at, camera, label'
+
+def alert_row(alert):
+    """The parts of an ai_alerts row that pick its rollup cell, or None if unknown."""
+    if not alert or not alert.get('created_at'):
+        return None
+    return {"created_at": alert['created_at'], "camera": alert.get('camera'), "label": alert.get('label')}
 
-if not os.getenv('SUPABASE_URL') or not os.getenv('SERVICE_ROLE_KEY'):
-    raise ValueError("Missing SUPABASE_URL or SERVICE_ROLE_KEY")
+def _cached_alert(cached):
+    """An existing-alert dict ({'id', 'update_count', 'created_at', ...}) from an alert cache entry."""
+    return {'id': cached['alert_id'], 'update_count': cached['update_count'], **(cached['row'] or {})}
 
-logger.info(f"🔌 Connecting to Supabase at {os.getenv('SUPABASE_URL', 'http://10.0.1.217:8000')}")
+class SeenReviews:
+    """
+    Bounded LRU of reviews already written, keyed by (review_id, review_type, review_key()).
 
-def should_create_alert(review):
+    A review seen again (an MQTT redelivery, the catch-up reading the row
+    the dashboard stored for a message Lizi already handled, a status write
+    that failed and left it 'waiting', an outbox retry) is recognised here
+    and only gets its recorded status written again instead of another
+    alert write. The key comes from Frigate's payload rather than a receipt
+    time, so it is the same for every delivery of a message.
     """
-    Determine if an alert should be created based on Frigate's categorization.
-    
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(review):
+        fingerprint = review_key(review)
+        if not review.get('review_id') or fingerprint is None:
+            return None
+        return (review['review_id'], review.get('review_type'), fingerprint)
+
+    def get(self, review):
+        """Return the (status, reasoning) recorded for the review, or None if it is new."""
+        key = self.key(review)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def add(self, review, status, reasoning=None):
+        """Remember that the review was written with this status."""
+        key = self.key(review)
+        if self.max_size <= 0 or key is None:
+            return
+        with self._lock:
+            self._entries[key] = (status, reasoning)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+seen_reviews = SeenReviews(int(os.getenv('LIZI_SEEN_REVIEWS_SIZE', '10000')))
+
+class StatusRechecks:
+    """
+    Reviews whose guarded status write matched no row, to be looked at again.
+
+    In MQTT mode Lizi often handles a message before the dashboard has stored
+    its reviews row, or after the row was overwritten by a newer message, so
+    status_guard() leaves the row 'waiting'. Those review_ids are re-read
+    after `delay` seconds (see recheck_statuses()), up to `attempts` times
+    while no row exists yet.
+    """
+
+    def __init__(self, delay, attempts):
+        self.delay = delay
+        self.attempts = attempts
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, review_ids, attempt=1):
+        """Schedule review_ids for a re-check (`attempt` counts earlier tries)."""
+        if self.attempts <= 0:
+            return
+        due_at = time.monotonic() + self.delay
+        with self._lock:
+            for review_id in review_ids:
+                if review_id is not None and attempt <= self.attempts:
+                    self._entries.pop(review_id, None)
+                    self._entries[review_id] = (due_at, attempt)
+
+    def due(self):
+        """
+        Remove and return the re-checks that are due.
+
+        Returns:
+            dict: review_id -> attempt
+        """
+        now = time.monotonic()
+        due = {}
+        with self._lock:
+            while self._entries:
+                review_id, (due_at, attempt) = next(iter(self._entries.items()))
+                if due_at > now:
+                    break  # Entries are in scheduling order
+                del self._entries[review_id]
+                due[review_id] = attempt
+        return due
+
+    def __len__(self):
+        return len(self._entries)
+
+status_rechecks = StatusRechecks(STATUS_RECHECK_DELAY, STATUS_RECHECK_ATTEMPTS)
+
+class ReviewWorkerPool:
+    """
+    Fixed set of worker threads ("lanes") that process reviews in parallel.
+
+    Each review_id hashes to one lane, so the new/update/end reviews of a
+    single review are always applied in order while unrelated reviews run
+    concurrently. Lane queues are bounded: submit() blocks when a lane is
+    full, which pushes back on the MQTT reader or poller.
+    """
+
+    def __init__(self, width, queue_size=100):
+        self.width = width
+        self._lanes = [queue.Queue(maxsize=queue_size) for _ in range(width)]
+        self._threads = []
+        for index, lane in enumerate(self._lanes):
+            thread = threading.Thread(target=self._run, args=(lane,), name=f"lizi-lane-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {width} review worker lanes (queue size {queue_size})")
+
+    def lane_for(self, review_id):
+        """Return the lane index a review_id is pinned to."""
+        return zlib.crc32(str(review_id).encode('utf-8')) % self.width
+
+    def submit(self, review_id, func, *args):
+        """Queue func(*args) on the lane for review_id, blocking while that lane is full."""
+        self._lanes[self.lane_for(review_id)].put((func, args))
+
+    def depth(self):
+        """Number of tasks waiting across all lanes."""
+        return sum(lane.qsize() for lane in self._lanes)
+
+    def join(self):
+        """Block until every queued task has been processed."""
+        for lane in self._lanes:
+            lane.join()
+
+    def shutdown(self):
+        """Let each lane finish its queued work, then stop the worker threads."""
+        logger.info(f"Draining {self.depth()} queued review tasks before shutdown")
+        for lane in self._lanes:
+            lane.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self, lane):
+        while True:
+            item = lane.get()
+            try:
+                if item is None:
+                    return
+                func, args = item
+                func(*args)
+            except Exception as e:
+                logger.error(f"Error in review worker: {e}")
+            finally:
+                lane.task_done()
+
+worker_pool = None
+
+class UpdateCoalescer:
+    """
+    Per-review buffer that merges rapid-fire 'update' reviews.
+
+    Updates for a review arriving within `window` seconds of the first
+    buffered one are merged in memory (objects and zones unioned, latest
+    review kept, updates counted) and written as a single alert update when
+    the window expires or the review's 'end' arrives.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, review, alert_id, update_count, row=None):
+        """Buffer an update review for an existing alert (`row` is its alert_row())."""
+        review_id = review['review_id']
+        with self._lock:
+            entry = self._entries.get(review_id)
+            if entry is None:
+                self._entries[review_id] = {
+                    "alert_id": alert_id,
+                    "row": row,
+                    "review": review,
+                    "count": 1,
+                    "update_count": update_count,
+                    "first_seen": time.monotonic(),
+                    "scheduled": False
+                }
+            else:
+                entry["review"] = merge_reviews(entry["review"], review)
+                entry["count"] += 1
+
+    def pop(self, review_id):
+        """Remove and return the buffered entry for a review, or None."""
+        with self._lock:
+            return self._entries.pop(review_id, None)
+
+    def due(self, flush_all=False):
+        """
+        Review IDs whose window has expired (or all of them), each returned once.
+
+        The entries stay buffered until pop(), so the flush can run on the
+        review's worker lane in order with its other reviews.
+        """
+        now = time.monotonic()
+        ids = []
+        with self._lock:
+            for review_id, entry in self._entries.items():
+                if not flush_all and now - entry["first_seen"] < self.window:
+                    break  # Entries are in first-seen order
+                if not entry["scheduled"]:
+                    entry["scheduled"] = True
+                    ids.append(review_id)
+        return ids
+
+    def __len__(self):
+        return len(self._entries)
+
+coalescer = UpdateCoalescer(COALESCE_WINDOW) if COALESCE_WINDOW > 0 else None
+
+# MQTT messages waiting to be parsed and dispatched (see watch_reviews)
+review_inbox = queue.Queue()
+
+Gauge(
+    'lizi_queue_depth',
+    'Reviews received but not yet picked up by a worker',
+    callback=lambda: review_inbox.qsize() + (worker_pool.depth() if worker_pool is not None else 0)
+)
+
+outbox = None
+_outbox_replay = threading.local()
+
+Gauge(
+    'lizi_outbox_pending',
+    'Writes journaled in the outbox, waiting for Supabase',
+    callback=lambda: outbox.pending() if outbox is not None else 0
+)
+
+class OutboxRetry(Exception):
+    """A write failed transiently while the outbox was replaying it; the outbox retries it later."""
+
+def _replaying():
+    return getattr(_outbox_replay, 'active', False)
+
+def _outbox_backlog():
+    """True if new writes must queue behind journaled ones to stay in order."""
+    return outbox is not None and not _replaying() and outbox.pending() > 0
+
+def _write_or_journal(kind, items, write):
+    """
+    Run `write()` against Supabase now, or journal `items` in the outbox.
+
+    Writes are journaled while the outbox has a backlog (so they stay in order
+    behind it) and when Supabase fails with a transient error. Without an
+    outbox, errors propagate; while the outbox replays, transient errors
+    become OutboxRetry so the operation stays journaled.
+
     Args:
-        review (dict): Review event data from Frigate MQTT
-        
+        kind (str): Outbox operation kind (see apply_outbox_batch)
+        items (list): Operations to journal if the write cannot happen now
+        write (callable): Performs the write, raising on failure
+
     Returns:
-        tuple: (bool, dict) - (should_create_alert, reasoning)
-        
-    Frigate Categorization:
-    - If Frigate marks it as an alert (is_alert: true), store it
-    - If Frigate marks it as a detection (is_alert: false), store it as detection
-    - We store both types for potential future evaluation
+        bool: True if written now, False if journaled
     """
-    reasoning = {
-        "decision": None,
-        "frigate_categorization": None,
-        "criteria_checked": [],
-        "details": {}
-    }
-    
-    # Check Frigate's categorization
-    is_frigate_alert = review.get('is_alert', False)
-    reasoning["frigate_categorization"] = "alert" if is_frigate_alert else "detection"
-    reasoning["criteria_checked"].append("frigate_categorization")
-    
-    # Check if review has zones (optional - for information only)
-    zones = review.get('zones', [])
-    reasoning["criteria_checked"].append("zones")
-    reasoning["details"]["zones"] = f"Found {len(zones)} zones: {zones}" if zones else "No zones detected"
-    
-    # Check if review has either snapshot or clip (required for storage)
-    snapshot_url = review.get('snapshot_url')
-    clip_url = review.get('clip_url')
-    
-    if not snapshot_url and not clip_url:
-        reasoning["decision"] = False
-        reasoning["criteria_checked"].append("media")
-        reasoning["details"]["media"] = "No snapshot or clip URL found"
-        return False, reasoning
-    
-    reasoning["criteria_checked"].append("media")
-    reasoning["details"]["media"] = {
-        "snapshot_url": snapshot_url,
-        "clip_url": clip_url
-    }
-    
-    # Store both alerts and detections for evaluation
-    reasoning["decision"] = True
-    reasoning["details"]["summary"] = f"Storing {reasoning['frigate_categorization']} for evaluation"
-    
-    return True, reasoning
+    if outbox is None or _replaying():
+        try:
+            write()
+        except Exception as e:
+            if outbox is not None and is_transient_error(e):
+                raise OutboxRetry(str(e)) from e
+            raise
+        return True
+    if outbox.pending():
+        outbox.append(kind, items)
+        return False
+    try:
+        write()
+        return True
+    except Exception as e:
+        if not is_transient_error(e):
+            raise
+        logger.warning(f"Supabase unavailable, journaling {len(items)} {kind} operations: {e}")
+        outbox.append(kind, items)
+        return False
+
+def defer_review(review):
+    """Journal a whole review to be processed once Supabase is reachable again."""
+    outbox.append('review', [review])
+    watched_logger.info(
+        "Deferred %s review %s from camera %s until Supabase is reachable",
+        review.get('review_type'), review.get('review_id'), review.get('camera'),
+        extra={"review_id": review.get('review_id'), "camera": review.get('camera')}
+    )
+    return 'deferred'
+
+def apply_outbox_batch(kind, items):
+    """
+    Write a batch of journaled operations to Supabase (called by the outbox).
+
+    Kinds:
+    - alert_insert: ai_alerts rows; upserted on event_id, so a retried batch
+      (or a review another instance already stored) cannot create duplicates;
+      rows actually inserted are then counted, prefetched and evaluated
+    - alert_update: {'alert_id', 'review', 'payload', 'delta', 'increment', 'row'} for update_alert()
+    - review_status: [review_id, status, reasoning, guard] lists (older journals
+      have no guard)
+    - review: a whole review whose processing was deferred
+    - rollup: ai_alert_rollups counter deltas (see lizi_rollups.py)
+    """
+    if kind == 'alert_insert':
+        for alert in _insert_alerts('outbox.alert_insert', items):
+            alert_stored(alert, alert.get('full_review_payload') or {})
+    elif kind == 'alert_update':
+        for item in items:
+            _, applied = _apply_alert_update(item['alert_id'], item['review'], None, item['payload'], item['delta'], item.get('increment', 1))
+            if applied:
+                record_update_rollup(item.get('row'), item['review'], item.get('increment', 1))
+    elif kind == 'review_status':
+        _write_review_statuses([tuple(item) for item in items])
+    elif kind == 'rollup':
+        _increment_rollups(items)
+    elif kind == 'review':
+        _outbox_replay.active = True
+        try:
+            for review in items:
+                process_review(review)
+        finally:
+            _outbox_replay.active = False
+    else:
+        raise ValueError(f"Unknown outbox operation kind: {kind}")
+
+def _is_retryable(error):
+    return isinstance(error, OutboxRetry) or is_transient_error(error)
+
+def start_outbox():
+    """Open the outbox journal at OUTBOX_PATH and start flushing it."""
+    global outbox
+    from lizi_outbox import Outbox
+    outbox = Outbox(
+        OUTBOX_PATH,
+        apply_outbox_batch,
+        _is_retryable,
+        batch_size=OUTBOX_BATCH_SIZE,
+        max_delay=OUTBOX_MAX_DELAY,
+        mergeable=('alert_insert', 'review_status', 'rollup')
+    )
+    outbox.start()
+    return outbox
+
+shard_leases = None
+# Set when this instance gains shards, whose waiting reviews are then rescanned from the start
+shards_gained = threading.Event()
+
+Gauge(
+    'lizi_owned_shards',
+    'Camera shards leased to this Lizi instance',
+    callback=lambda: len(shard_leases.owned) if shard_leases is not None else 0
+)
+
+def owns_review(review):
+    """True if this instance handles the review (always, unless sharding is enabled)."""
+    return shard_leases is None or shard_leases.owns(review.get('camera'))
+
+def _on_shards_changed(gained, lost):
+    if gained:
+        shards_gained.set()
+        review_inbox.put(None)  # Wake watch_reviews
+
+def _rpc(function, params):
+    return _execute(f'rpc.{function}', supabase.rpc(function, params)).data
+
+def start_shard_leases():
+    """Claim this instance's share of the LIZI_SHARD_COUNT shards and keep the leases alive."""
+    global shard_leases
+    from lizi_shards import ShardLeases
+    shard_leases = ShardLeases(_rpc, WORKER_ID, SHARD_COUNT, SHARD_LEASE_SECONDS, on_change=_on_shards_changed)
+    shard_leases.start()
+    return shard_leases
+
+media_prefetcher = None
+
+def start_media_prefetch():
+    """Start the background pool that copies alert snapshots from Frigate into the media cache."""
+    global media_prefetcher
+    from lizi_media import MediaCache, MediaPrefetcher
+    media_prefetcher = MediaPrefetcher(MediaCache(), workers=MEDIA_WORKERS, queue_size=MEDIA_QUEUE_SIZE)
+    logger.info(f"🖼️ Prefetching alert snapshots with {MEDIA_WORKERS} workers")
+    return media_prefetcher
+
+def prefetch_media(alert_id, review):
+    """Queue the review's snapshot for download into the media cache (never blocks)."""
+    if media_prefetcher is not None:
+        media_prefetcher.submit(alert_id, review.get('snapshot_url'))
+
+evaluator = None
+
+def start_evaluator():
+    """Start the evaluation worker that decides which new alerts are triggered."""
+    global evaluator
+    from lizi_evaluator import Evaluator
+    evaluator = Evaluator(supabase, owns=owns_review)
+    evaluator.start()
+    return evaluator
+
+def evaluate_alert(alert_data):
+    """Hand a new alert to the evaluation worker (never blocks)."""
+    if evaluator is not None:
+        evaluator.submit(alert_data)
+
+rollups = None
+
+def _increment_rollups(rows):
+    """Add counter deltas to ai_alert_rollups, turning rollups off if the function is missing."""
+    global rollups
+    try:
+        _rpc('lizi_increment_rollups', {"p_rows": rows})
+    except Exception as e:
+        if not is_missing_function_error(e):
+            raise
+        logger.warning("lizi_increment_rollups() not found in database, alert rollups disabled")
+        rollups = None
+
+def _write_rollups(rows):
+    _write_or_journal('rollup', rows, lambda: _increment_rollups(rows))
+
+def start_rollups():
+    """Start counting created/updated alerts into ai_alert_rollups."""
+    global rollups
+    from lizi_rollups import RollupBuffer
+    rollups = RollupBuffer(_write_rollups)
+    rollups.start()
+    return rollups
+
+def record_alert_rollup(alert_data):
+    if rollups is not None:
+        rollups.record_alert(alert_data)
+
+def record_update_rollup(row, review, increment=1):
+    """Count an applied update in the cell of its alert (skipped if the alert row is unknown)."""
+    if rollups is not None and row is not None:
+        rollups.record_update(row, review, increment)
+
+tracked_ingester = None
+
+def start_tracked_ingest():
+    """Subscribe to tracked object events and bulk insert their state changes."""
+    global tracked_ingester
+    from lizi_tracked import TrackedObjectIngester
+    tracked_ingester = TrackedObjectIngester(supabase, owns=lambda camera: owns_review({'camera': camera}))
+    tracked_ingester.start()
+    return tracked_ingester
+
+def warm_alert_cache():
+    """Preload the alert cache with the most recent ai_alerts rows."""
+    if alert_cache.max_size <= 0:
+        return
+    try:
+        result = _execute('ai_alerts.warm_cache', supabase.table('ai_alerts')
+            .select(f'event_id, {ALERT_LOOKUP_COLUMNS}')
+            .order('created_at', desc=True)
+            .limit(alert_cache.max_size))
+        # Insert oldest first so the newest alerts end up most recently used
+        for alert in reversed(result.data or []):
+            alert_cache.put(alert['event_id'], alert['id'], alert.get('update_count') or 0, row=alert_row(alert))
+        logger.info(f"Warmed alert cache with {len(alert_cache)} recent alerts")
+    except Exception as e:
+        logger.error(f"Error warming alert cache: {e}")
+
+def _insert_alerts(operation, rows):
+    """
+    Insert ai_alerts rows, skipping those whose event_id already has an alert.
+
+    Falls back to plain inserts if the unique index on event_id
+    (add_lizi_shard_leases.sql) has not been created yet, and leaves out
+    latest_review_key if its column (add_lizi_review_keys.sql) is missing.
+
+    Returns:
+        list: The rows actually inserted
+    """
+    global REVIEW_KEYS
+    if REVIEW_KEYS:
+        try:
+            return _insert_alert_rows(operation, rows)
+        except Exception as e:
+            if getattr(e, 'code', None) != 'PGRST204' or 'latest_review_key' not in str(e):
+                raise
+            logger.warning("ai_alerts.latest_review_key not found in database, review keys disabled")
+            REVIEW_KEYS = False
+    return _insert_alert_rows(operation, [
+        {column: value for column, value in row.items() if column != 'latest_review_key'} for row in rows
+    ])
+
+def _insert_alert_rows(operation, rows):
+    global UPSERT_ALERTS
+    if UPSERT_ALERTS:
+        try:
+            return _execute(operation, supabase.table('ai_alerts').upsert(
+                rows, on_conflict='event_id', ignore_duplicates=True)).data or []
+        except Exception as e:
+            if getattr(e, 'code', None) != '42P10':
+                raise
+            logger.warning("ai_alerts.event_id has no unique index, falling back to plain inserts")
+            UPSERT_ALERTS = False
+    return _execute(operation, supabase.table('ai_alerts').insert(rows)).data or []
+
+def alert_stored(alert_data, review):
+    """
+    Count, prefetch and evaluate an alert once its row is in ai_alerts.
+
+    Journaled alerts only get here when the outbox has written them (see
+    apply_outbox_batch), so nothing is counted or evaluated for a row that
+    might never exist.
+    """
+    record_alert_rollup(alert_data)
+    prefetch_media(alert_data['id'], review)
+    evaluate_alert(alert_data)
 
 def create_alert(review):
     """
@@ -113,64 +790,223 @@ def create_alert(review):
         
     Returns:
         dict: Created alert data if successful, None if failed
-        
-    Alert Data Structure:
-    - event_id: Reference to the original review
-    - camera: Camera identifier
-    - label: Primary detected object
-    - zones: Affected security zones
-    - reason: Alert description
-    - confidence: Detection confidence score
-    - created_at: Timestamp
-    - triggered: Alert trigger status (false - waiting for evaluation)
-    - frigate_categorization: 'alert' or 'detection' from Frigate
-    - full_review_payload: Complete review data for analysis
-    - update_count: Number of updates (starts at 0)
     """
     try:
-        # Get the first object as the primary label
-        objects = review.get('objects', [])
-        primary_object = objects[0] if objects else None
-        
-        # Get the first detection score if available
-        detections = review.get('metadata', {}).get('detections', [])
-        confidence = detections[0].get('score', 0.0) if detections else 0.0
-        
-        # Determine Frigate categorization
-        is_frigate_alert = review.get('is_alert', False)
-        frigate_categorization = "alert" if is_frigate_alert else "detection"
+        alert_data = build_alert_data(review)
         
-        # Prepare alert data with all necessary fields
-        alert_data = {
-            "event_id": review['review_id'],
-            "camera": review['camera'],
-            "label": primary_object,
-            "zones": review.get('zones', []),
-            "reason": review.get('reason', f'{frigate_categorization.title()} detected'),
-            "confidence": confidence,
-            "created_at": datetime.utcnow().isoformat(),
-            "triggered": False,  # Will be set by evaluation script later
-            "frigate_categorization": frigate_categorization,
-            "full_review_payload": review,  # Store complete review data
-            "update_count": 0  # Initialize update counter
-        }
-        
-        # Insert alert into database
-        result = supabase.table('ai_alerts').insert(alert_data).execute()
-        watched_logger.info(f"Stored {frigate_categorization} for review {review['review_id']} from camera {review['camera']}")
-        return result.data[0] if result.data else None
+        # Insert alert into database (or the outbox while Supabase is unavailable).
+        # Upserting on event_id keeps a review that another instance already
+        # handled from getting a second alert.
+        result = {}
+        def write():
+            result['data'] = _insert_alerts('ai_alerts.insert', [alert_data])
+        stored = _write_or_journal('alert_insert', [alert_data], write)
+        if stored and not result['data']:
+            return _update_existing_alert(review)
+        watched_logger.info(
+            "%s %s for review %s from camera %s",
+            "Stored" if stored else "Journaled", alert_data['frigate_categorization'], review['review_id'], review['camera'],
+            extra={"review_id": review['review_id'], "camera": review['camera']}
+        )
+        alert_cache.put(review['review_id'], alert_data['id'], 0, review_state(review), alert_row(alert_data))
+        if stored:
+            alert_stored(alert_data, review)
+        return alert_data
         
+    except OutboxRetry:
+        raise
     except Exception as e:
         logger.error(f"Error creating alert: {e}")
         return None
 
-def update_alert(alert_id, review):
+def _update_existing_alert(review):
+    """
+    Apply a review to the alert that already exists for it (lost an insert race).
+
+    Returns:
+        dict: The existing alert ({'id', 'update_count'}), None if it cannot be found
+    """
+    lookup = _execute('ai_alerts.lookup', supabase.table('ai_alerts').select(ALERT_LOOKUP_COLUMNS).eq('event_id', review['review_id']))
+    if not lookup.data:
+        logger.error(f"Alert for review {review['review_id']} conflicted on insert but could not be found")
+        return None
+    alert = lookup.data[0]
+    logger.info(f"Alert for review {review['review_id']} already exists, updating it instead")
+    update_alert(alert['id'], review, alert.get('update_count'), row=alert_row(alert))
+    return alert
+
+def create_alerts_bulk(reviews):
+    """
+    Create alerts for several reviews with a single insert.
+    
+    Falls back to one create_alert() call per review if the bulk insert fails,
+    so one bad row cannot sink the whole page.
+    
+    Args:
+        reviews (list): Review dicts that passed should_create_alert()
+        
+    Returns:
+        dict: review_id -> created alert row (missing if creation failed)
+    """
+    if not reviews:
+        return {}
+    try:
+        rows = [build_alert_data(review) for review in reviews]
+        states = {review['review_id']: review_state(review) for review in reviews}
+        result = {}
+        def write():
+            result['data'] = _insert_alerts('ai_alerts.insert_bulk', rows)
+        stored = _write_or_journal('alert_insert', rows, write)
+        inserted = {alert['event_id'] for alert in result.get('data') or []} if stored else None
+        created = {}
+        conflicts = []
+        for alert, review in zip(rows, reviews):
+            if inserted is None or alert['event_id'] in inserted:
+                created[alert['event_id']] = alert
+                alert_cache.put(alert['event_id'], alert['id'], 0, states.get(alert['event_id']), alert_row(alert))
+                if stored:
+                    alert_stored(alert, review)
+            else:
+                conflicts.append(review)
+        watched_logger.info(f"{'Stored' if stored else 'Journaled'} {len(created)} alerts in one batch")
+        for review in conflicts:
+            alert = _update_existing_alert(review)
+            if alert:
+                created[review['review_id']] = alert
+        return created
+    except OutboxRetry:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating alerts in bulk, falling back to one insert per review: {e}")
+        created = {}
+        for review in reviews:
+            alert = create_alert(review)
+            if alert:
+                created[review['review_id']] = alert
+        return created
+
+def _update_alert_atomic(alert_id, review, payload=None, delta=None, increment=1):
+    """
+    Apply a review update with one lizi_update_alert() RPC call.
+
+    The function increments update_count and merges additional_objects/
+    additional_zones server-side (see create_lizi_update_alert_function.sql).
+    It replaces full_review_payload when `payload` is given and appends
+    `delta` to payload_deltas when that is given. `increment` > 1 (coalesced
+    updates) needs the p_increment version of the function
+    (add_lizi_update_alert_increment.sql). The review's review_key() is sent
+    as p_review_key (add_lizi_review_keys.sql) so a message that was already
+    applied is ignored.
+
+    Returns:
+        tuple: (update_count, applied); applied is False when the function
+            ignored an already applied review (earlier versions return only
+            the count and always apply)
+    """
+    global REVIEW_KEYS
+    params = {
+        "p_alert_id": alert_id,
+        "p_review_type": review.get('review_type'),
+        "p_review_timestamp": review.get('created_at'),
+        "p_objects": review.get('objects') or None,
+        "p_zones": review.get('zones') or None,
+        "p_payload": payload,
+        "p_delta": delta
+    }
+    if increment != 1:
+        params["p_increment"] = increment
+    if REVIEW_KEYS:
+        try:
+            return _parse_update_result(_execute('rpc.lizi_update_alert', supabase.rpc(
+                'lizi_update_alert', {**params, "p_review_key": review_key(review)})))
+        except Exception as e:
+            if not is_missing_function_error(e):
+                raise
+            logger.warning("lizi_update_alert() has no p_review_key, review keys disabled")
+            REVIEW_KEYS = False
+    return _parse_update_result(_execute('rpc.lizi_update_alert', supabase.rpc('lizi_update_alert', params)))
+
+def _parse_update_result(result):
+    """(update_count, applied) from a lizi_update_alert() response."""
+    data = result.data
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if isinstance(data, dict):
+        if 'applied' in data:
+            return data.get('new_update_count'), bool(data['applied'])
+        data = next(iter(data.values()), None)
+    return data, data is not None
+
+def _apply_alert_update(alert_id, review, update_count=None, payload=None, delta=None, increment=1):
+    """
+    Write a review update to an alert, raising on failure.
+    
+    Uses the atomic lizi_update_alert() RPC when available (LIZI_ATOMIC_UPDATES,
+    on by default), falling back to a read-modify-write if the function has not
+    been deployed.
+    
+    Returns:
+        tuple: (update_count, applied), see _update_alert_atomic()
+    """
+    global ATOMIC_UPDATES
+    if ATOMIC_UPDATES:
+        try:
+            return _update_alert_atomic(alert_id, review, payload, delta, increment)
+        except Exception as e:
+            if not is_missing_function_error(e):
+                raise
+            logger.warning("lizi_update_alert() not found in database, falling back to read-modify-write updates")
+            ATOMIC_UPDATES = False
+
+    # Get current alert to increment update count, unless the cache already knows it
+    if update_count is None:
+        current_alert = _execute('ai_alerts.select_update_count', supabase.table('ai_alerts').select('update_count').eq('id', alert_id))
+        current_update_count = current_alert.data[0]['update_count'] if current_alert.data else 0
+    else:
+        current_update_count = update_count
+    
+    # Prepare update data
+    update_data = {
+        "updated_at": datetime.utcnow().isoformat(),
+        "latest_review_type": review.get('review_type'),
+        "latest_review_timestamp": review.get('created_at'),
+        "update_count": current_update_count + increment
+    }
+    if payload is not None:
+        update_data["full_review_payload"] = payload  # Store latest review data
+    
+    # Set ended_at when review ends
+    if review.get('review_type') == 'end':
+        update_data["ended_at"] = datetime.utcnow().isoformat()
+    
+    # Add new objects if detected
+    if review.get('objects'):
+        update_data["additional_objects"] = review['objects']
+    # Add new zones if detected
+    if review.get('zones'):
+        update_data["additional_zones"] = review['zones']
+        
+    # Update alert in database
+    _execute('ai_alerts.update', supabase.table('ai_alerts').update(update_data).eq('id', alert_id))
+    return current_update_count + increment, True
+
+def update_alert(alert_id, review, update_count=None, increment=1, row=None):
     """
     Update an existing alert with new information from a review update.
     
+    Written through _apply_alert_update(), or journaled in the outbox while
+    Supabase is unavailable.
+    
     Args:
         alert_id (str): ID of the alert to update
         review (dict): Updated review data
+        update_count (int): Current update_count if already known (e.g. from
+            the alert cache); looked up in the database when None. Only used
+            by the read-modify-write fallback.
+        increment (int): Reviews this update stands for (more than 1 when
+            coalesced updates are written together)
+        row (dict): The alert's alert_row(), where the update is counted in
+            the rollups (taken from the alert cache when None)
         
     Update Fields:
     - updated_at: Timestamp of the update
@@ -178,43 +1014,105 @@ def update_alert(alert_id, review):
     - latest_review_timestamp: Timestamp of the latest review
     - additional_objects: New objects detected
     - additional_zones: New zones affected
-    - update_count: Incremented counter
+    - update_count: Incremented counter (by the number of coalesced reviews)
     - ended_at: Set when review_type is 'end'
-    - full_review_payload: Updated with latest review data
+    - full_review_payload: Updated with latest review data (not in compact mode)
+    - payload_deltas: Compact mode only, a review_delta() appended per update
+      (the read-modify-write fallback skips it; additional_objects/zones still
+      record the changes)
     """
     try:
-        # Get current alert to increment update count
-        current_alert = supabase.table('ai_alerts').select('update_count').eq('id', alert_id).execute()
-        current_update_count = current_alert.data[0]['update_count'] if current_alert.data else 0
-        
-        # Prepare update data
-        update_data = {
-            "updated_at": datetime.utcnow().isoformat(),
-            "latest_review_type": review.get('review_type'),
-            "latest_review_timestamp": review.get('created_at'),
-            "update_count": current_update_count + 1,
-            "full_review_payload": review  # Store latest review data
-        }
-        
-        # Set ended_at when review ends
-        if review.get('review_type') == 'end':
-            update_data["ended_at"] = datetime.utcnow().isoformat()
-        
-        # Add new objects if detected
-        if review.get('objects'):
-            update_data["additional_objects"] = review['objects']
-        # Add new zones if detected
-        if review.get('zones'):
-            update_data["additional_zones"] = review['zones']
-            
-        # Update alert in database
-        supabase.table('ai_alerts').update(update_data).eq('id', alert_id).execute()
-        watched_logger.info(f"Updated alert {alert_id} for {review.get('review_type')} review {review['review_id']} from camera {review['camera']} (update #{current_update_count + 1})")
+        cached = alert_cache.get(review['review_id'])
+        if row is None and cached and cached['alert_id'] == alert_id:
+            row = cached['row']
+        state = review_state(review)
+        if COMPACT_PAYLOADS:
+            payload = None
+            delta = review_delta(review, cached['state'] if cached else None)
+        else:
+            payload = review
+            delta = None
+
+        result = {}
+        def write():
+            result['update_count'], result['applied'] = _apply_alert_update(alert_id, review, update_count, payload, delta, increment)
+
+        # Journaled updates are counted in the rollups when the outbox applies them
+        operation = {"alert_id": alert_id, "review": review, "payload": payload, "delta": delta, "increment": increment, "row": row}
+        if _write_or_journal('alert_update', [operation], write):
+            new_update_count = result['update_count']
+            action = "Updated" if result['applied'] else "Already applied"
+            if result['applied']:
+                record_update_rollup(row, review, increment)
+        else:
+            new_update_count = (update_count or 0) + increment
+            action = "Journaled update to"
+        alert_cache.put(review['review_id'], alert_id, new_update_count, state, row)
+        watched_logger.info(
+            "%s alert %s for %s review %s from camera %s (update #%s)",
+            action, alert_id, review.get('review_type'), review['review_id'], review['camera'], new_update_count,
+            extra={"review_id": review['review_id'], "camera": review['camera'], "alert_id": alert_id}
+        )
         
+    except OutboxRetry:
+        raise
     except Exception as e:
         logger.error(f"Error updating alert: {e}")
 
-def update_review_status(review_id, status, reasoning=None):
+def status_guard(review):
+    """
+    The state of the reviews row a status is meant for.
+
+    The dashboard keeps one reviews row per review_id and overwrites it (status
+    back to 'waiting') with every message, possibly before or after Lizi
+    handled that message over MQTT. A status is only written while the row
+    still holds the message it was decided on, so it can never mark a newer
+    message as processed; a row that does not hold it is re-checked shortly
+    after (status_rechecks) and processed again if it is still 'waiting'.
+
+    Returns:
+        dict: {'review_type', 'after_data'}, or None if the review has no after_data
+    """
+    if not isinstance(review.get('after_data'), dict):
+        return None
+    return {"review_type": review.get('review_type'), "after_data": review['after_data']}
+
+def _status_query(review_id, status, reasoning=None, guard=None):
+    """The per-row reviews update for a status, restricted to the row state in `guard`."""
+    update_data = {'status': status}
+    if reasoning:
+        update_data['reasoning'] = reasoning
+    query = supabase.table('reviews').update(update_data).eq('review_id', review_id)
+    if guard:
+        query = query.eq('review_type', guard['review_type']).eq('after_data', json.dumps(guard['after_data']))
+    return query
+
+def _write_status(operation, review_id, status, reasoning=None, guard=None):
+    """Write one status, scheduling a re-check if the guard matched no row."""
+    response = _execute(operation, _status_query(review_id, status, reasoning, guard))
+    if guard and not response.data:
+        status_rechecks.add([review_id])
+
+def _write_statuses(operation, updates):
+    """Write statuses with one lizi_update_review_statuses() call, scheduling re-checks for guard misses."""
+    response = _execute(operation, supabase.rpc('lizi_update_review_statuses', {
+        "p_updates": _status_rows(updates)
+    }))
+    # The RPC only reports how many rows it updated, so every guarded review is re-checked
+    if isinstance(response.data, int) and response.data < len(updates):
+        status_rechecks.add([update[0] for update in updates if len(update) > 3 and update[3]])
+
+def _status_rows(updates):
+    """p_updates for lizi_update_review_statuses() from (review_id, status, reasoning[, guard]) tuples."""
+    rows = []
+    for review_id, status, reasoning, *guard in updates:
+        row = {"review_id": review_id, "status": status, "reasoning": reasoning}
+        if guard and guard[0]:
+            row.update(guard[0])
+        rows.append(row)
+    return rows
+
+def update_review_status(review_id, status, reasoning=None, guard=None):
     """
     Update the status of a review after processing.
     
@@ -222,49 +1120,174 @@ def update_review_status(review_id, status, reasoning=None):
         review_id (str): ID of the review to update
         status (str): New status ('yes', 'no', or 'processed')
         reasoning (dict): JSON blob explaining the decision
+        guard (dict): status_guard() of the review; the row is left alone
+            unless it still holds that message
     """
     try:
-        update_data = {'status': status}
-        if reasoning:
-            update_data['reasoning'] = reasoning
-        
-        supabase.table('reviews').update(update_data).eq('review_id', review_id).execute()
-        logger.info(f"Updated review {review_id} status to {status}")
+        stored = _write_or_journal('review_status', [[review_id, status, reasoning, guard]], lambda: _write_status(
+            'reviews.update_status', review_id, status, reasoning, guard))
+        logger.info(
+            "%s review %s status to %s", "Updated" if stored else "Journaled", review_id, status,
+            extra={"review_id": review_id}
+        )
         if reasoning:
-            logger.info(f"Reasoning: {reasoning}")
+            logger.debug("Reasoning: %s", reasoning, extra={"review_id": review_id})
+    except OutboxRetry:
+        raise
     except Exception as e:
         logger.error(f"Error updating review status: {e}")
 
-def process_review(review):
+def update_review_statuses(updates):
+    """
+    Update the status of many reviews with one lizi_update_review_statuses() RPC.
+    
+    Falls back to update_review_status() per row if the bulk call fails.
+    
+    Args:
+        updates (list): (review_id, status, reasoning, guard) tuples, guard
+            being the review's status_guard()
+    """
+    if not updates:
+        return
+    try:
+        stored = _write_or_journal('review_status', [list(update) for update in updates], lambda: _write_statuses(
+            'rpc.lizi_update_review_statuses', updates))
+        counts = {}
+        for update in updates:
+            counts[update[1]] = counts.get(update[1], 0) + 1
+        logger.info(f"{'Updated' if stored else 'Journaled'} {len(updates)} review statuses in one batch: {counts}")
+    except OutboxRetry:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating review statuses in bulk, falling back to one update per review: {e}")
+        for update in updates:
+            update_review_status(*update)
+
+def _write_review_statuses(updates):
+    """Write (review_id, status, reasoning[, guard]) updates, raising on failure (used by the outbox)."""
+    try:
+        _write_statuses('outbox.review_statuses', updates)
+    except Exception as e:
+        if not is_missing_function_error(e):
+            raise
+        for update in updates:
+            _write_status('outbox.review_status', *update)
+
+def _updated_reasoning(review, alert_id, increment=1):
+    """Status reasoning for a review that updated an existing alert."""
+    reasoning = {
+        "decision": True,
+        "message": f"Updated existing alert for {review.get('review_type', 'unknown')} review",
+        "alert_id": alert_id,
+        "processed_at": datetime.utcnow().isoformat()
+    }
+    if increment > 1:
+        reasoning["coalesced_reviews"] = increment
+    return reasoning
+
+def _coalesce(review, alert):
+    """
+    Route a review for an existing alert through the coalescing window.
+
+    'update' reviews are buffered; any other review takes the buffered
+    updates of its review_id with it.
+
+    Returns:
+        tuple: (review, increment) to write now, or None if the review was buffered
+    """
+    if coalescer is None:
+        return review, 1
+    if review.get('review_type') == 'update':
+        coalescer.add(review, alert['id'], alert.get('update_count'), alert_row(alert))
+        return None
+    pending = coalescer.pop(review['review_id'])
+    if pending is None:
+        return review, 1
+    return merge_reviews(pending['review'], review), pending['count'] + 1
+
+def flush_coalesced(review_id):
+    """Write the buffered updates of one review as a single alert update."""
+    entry = coalescer.pop(review_id)
+    if entry is None:
+        return
+    update_alert(entry['alert_id'], entry['review'], entry['update_count'], entry['count'], entry['row'])
+    update_review_status(review_id, 'yes', _updated_reasoning(entry['review'], entry['alert_id'], entry['count']),
+                         status_guard(entry['review']))
+
+def flush_coalesced_updates(flush_all=False):
+    """
+    Write coalesced updates whose window has expired (or all of them).
+
+    Each flush runs on its review's worker lane, so it stays in order with
+    that review's other updates.
+    """
+    if coalescer is None:
+        return
+    for review_id in coalescer.due(flush_all):
+        if worker_pool is None:
+            flush_coalesced(review_id)
+        else:
+            worker_pool.submit(review_id, flush_coalesced, review_id)
+
+def process_review(review, received_at=None):
     """
     Process a review and create or update alerts as needed.
     
     Args:
         review (dict): Review data from the database
+        received_at (float): time.monotonic() when Lizi received the review, for latency metrics
+    """
+    started = time.perf_counter()
+    calls_before = _supabase_calls()
+    outcome = _process_review(review)
+    REVIEW_PROCESSING_SECONDS.observe(time.perf_counter() - started)
+    _record_review(review, outcome, received_at, _supabase_calls() - calls_before)
+
+def _process_review(review):
+    """
+    Create or update the alert for a review and record the review status.
+    
+    Returns:
+        str: Outcome - 'created', 'updated', 'coalesced' (buffered in the
+            coalescing window), 'skipped', 'duplicate' (already written, only
+            its status is written again), 'deferred' (journaled in the outbox)
+            or 'errored'
     """
     try:
         review_id = review.get('review_id', 'unknown')
         camera = review.get('camera', 'unknown')
         review_type = review.get('review_type', 'unknown')
+
+        guard = status_guard(review)
+        seen = seen_reviews.get(review)
+        if seen is not None:
+            update_review_status(review_id, *seen, guard)
+            return 'duplicate'
         
-        watched_logger.info(f"Processing {review_type} review {review_id} from camera {camera}")
-        
-        # Check if an alert already exists for this review_id
-        existing_alert_result = supabase.table('ai_alerts').select('id').eq('event_id', review_id).execute()
-        existing_alert = existing_alert_result.data[0] if existing_alert_result.data else None
+        # Check if an alert already exists for this review_id (cache first, then database)
+        cached = alert_cache.get(review_id)
+        if cached:
+            existing_alert = _cached_alert(cached)
+        elif _outbox_backlog():
+            # The alert may only exist in the outbox so far; process the review after it
+            return defer_review(review)
+        else:
+            existing_alert_result = _execute('ai_alerts.lookup', supabase.table('ai_alerts').select(ALERT_LOOKUP_COLUMNS).eq('event_id', review_id))
+            existing_alert = existing_alert_result.data[0] if existing_alert_result.data else None
         
         if existing_alert:
-            # Alert already exists - update it with new review data
-            watched_logger.info(f"Updating existing alert for review {review_id}")
-            update_alert(existing_alert['id'], review)
+            # Alert already exists - update it with new review data (unless it waits in the coalescing window)
+            coalesced = _coalesce(review, existing_alert)
+            if coalesced is None:
+                return 'coalesced'
+            update, increment = coalesced
+            update_alert(existing_alert['id'], update, existing_alert.get('update_count'), increment, alert_row(existing_alert))
             
             # Update review status to indicate it was processed
-            update_review_status(review_id, 'yes', {
-                "decision": True,
-                "message": f"Updated existing alert for {review_type} review",
-                "alert_id": existing_alert['id'],
-                "processed_at": datetime.utcnow().isoformat()
-            })
+            reasoning = _updated_reasoning(review, existing_alert['id'], increment)
+            update_review_status(review_id, 'yes', reasoning, guard)
+            seen_reviews.add(review, 'yes', reasoning)
+            return 'updated'
         else:
             # No existing alert - check if we should create one
             should_create, reasoning = should_create_alert(review)
@@ -280,16 +1303,27 @@ def process_review(review):
                 if result:
                     reasoning["alert_created"] = True
                     reasoning["alert_id"] = result.get('id') if result else None
-                    update_review_status(review_id, 'yes', reasoning)
+                    update_review_status(review_id, 'yes', reasoning, guard)
+                    seen_reviews.add(review, 'yes', reasoning)
+                    return 'created'
                 else:
                     reasoning["alert_created"] = False
                     reasoning["error"] = "Failed to create alert in database"
-                    update_review_status(review_id, 'no', reasoning)
+                    update_review_status(review_id, 'no', reasoning, guard)
+                    return 'errored'
             else:
                 # No alert created - just update review status
-                update_review_status(review_id, 'no', reasoning)
+                update_review_status(review_id, 'no', reasoning, guard)
+                seen_reviews.add(review, 'no', reasoning)
+                return 'skipped'
                 
+    except OutboxRetry:
+        raise
     except Exception as e:
+        if outbox is not None and is_transient_error(e):
+            if _replaying():
+                raise OutboxRetry(str(e)) from e
+            return defer_review(review)
         logger.error(f"Error processing review: {e}")
         error_reasoning = {
             "decision": False,
@@ -299,47 +1333,565 @@ def process_review(review):
             "camera": review.get('camera'),
             "review_type": review.get('review_type')
         }
-        update_review_status(review.get('review_id'), 'no', error_reasoning)
+        update_review_status(review.get('review_id'), 'no', error_reasoning, status_guard(review))
+        return 'errored'
+
+def find_existing_alerts(review_ids):
+    """
+    Look up existing alerts for several reviews, cache first, then one query.
+    
+    Args:
+        review_ids (list): Review IDs to look up
+        
+    Returns:
+        dict: review_id -> {'id', 'update_count', 'created_at', 'camera', 'label'} for reviews that have an alert
+    """
+    existing = {}
+    misses = []
+    for review_id in review_ids:
+        cached = alert_cache.get(review_id)
+        if cached:
+            existing[review_id] = _cached_alert(cached)
+        else:
+            misses.append(review_id)
+    if misses:
+        result = _execute('ai_alerts.lookup_bulk', supabase.table('ai_alerts').select(f'event_id, {ALERT_LOOKUP_COLUMNS}').in_('event_id', misses))
+        for alert in result.data or []:
+            existing[alert['event_id']] = alert
+    return existing
+
+def process_review_batch(reviews, received_at=None):
+    """
+    Process a page of reviews with batched database writes.
+    
+    Existing alerts are looked up in one query, new alerts are inserted in one
+    call and review statuses are written with one RPC. Alert updates still go
+    through update_alert() one at a time. Repeated review_ids within the page
+    are processed individually afterwards so their updates apply in order,
+    and reviews already written (seen_reviews) only get their status again.
+    
+    Args:
+        reviews (list): Review rows from the database
+        received_at (float): time.monotonic() when the page was fetched, for latency metrics
+    """
+    if _outbox_backlog():
+        for review in reviews:
+            process_review(review, received_at)
+        return
+
+    started = time.perf_counter()
+    calls_before = _supabase_calls()
+    batch = []
+    leftovers = []
+    duplicates = []
+    seen = set()
+    for review in reviews:
+        review_id = review.get('review_id')
+        if not review_id or review_id in seen:
+            leftovers.append(review)
+        elif seen_reviews.get(review) is not None:
+            seen.add(review_id)
+            duplicates.append(review)
+        else:
+            seen.add(review_id)
+            batch.append(review)
+
+    try:
+        existing = find_existing_alerts([review['review_id'] for review in batch])
+    except Exception as e:
+        logger.error(f"Error looking up alerts for batch, processing reviews one at a time: {e}")
+        for review in reviews:
+            process_review(review, received_at)
+        return
+
+    statuses = [(review['review_id'], *seen_reviews.get(review), status_guard(review)) for review in duplicates]
+    to_create = []
+    outcomes = {}
+    written = []
+    for review in batch:
+        review_id = review['review_id']
+        camera = review.get('camera', 'unknown')
+        review_type = review.get('review_type', 'unknown')
+
+        existing_alert = existing.get(review_id)
+        if existing_alert:
+            coalesced = _coalesce(review, existing_alert)
+            if coalesced is None:
+                outcomes[review_id] = 'coalesced'
+                continue
+            update, increment = coalesced
+            update_alert(existing_alert['id'], update, existing_alert.get('update_count'), increment, alert_row(existing_alert))
+            statuses.append((review_id, 'yes', _updated_reasoning(review, existing_alert['id'], increment), status_guard(review)))
+            written.append(review)
+            outcomes[review_id] = 'updated'
+            continue
+
+        should_create, reasoning = should_create_alert(review)
+        reasoning["processed_at"] = datetime.utcnow().isoformat()
+        reasoning["review_id"] = review_id
+        reasoning["camera"] = camera
+        reasoning["review_type"] = review_type
+        if should_create:
+            to_create.append((review, reasoning))
+        else:
+            statuses.append((review_id, 'no', reasoning, status_guard(review)))
+            written.append(review)
+            outcomes[review_id] = 'skipped'
+
+    created = create_alerts_bulk([review for review, _ in to_create])
+    for review, reasoning in to_create:
+        alert = created.get(review['review_id'])
+        if alert:
+            reasoning["alert_created"] = True
+            reasoning["alert_id"] = alert.get('id')
+            statuses.append((review['review_id'], 'yes', reasoning, status_guard(review)))
+            written.append(review)
+            outcomes[review['review_id']] = 'created'
+        else:
+            reasoning["alert_created"] = False
+            reasoning["error"] = "Failed to create alert in database"
+            statuses.append((review['review_id'], 'no', reasoning, status_guard(review)))
+            outcomes[review['review_id']] = 'errored'
+
+    update_review_statuses(statuses)
+    status_of = {review_id: (status, reasoning) for review_id, status, reasoning, _ in statuses}
+    for review in written:
+        seen_reviews.add(review, *status_of[review['review_id']])
+
+    for review in duplicates:
+        _record_review(review, 'duplicate', received_at)
+    if batch:
+        elapsed = time.perf_counter() - started
+        calls_per_review = (_supabase_calls() - calls_before) / len(batch)
+        for review in batch:
+            REVIEW_PROCESSING_SECONDS.observe(elapsed / len(batch))
+            _record_review(review, outcomes[review['review_id']], received_at, calls_per_review)
+
+    for review in leftovers:
+        process_review(review, received_at)
+
+def _process_in_pages(reviews, received_at=None):
+    """Process reviews in pages of BATCH_SIZE, or one at a time if batching is disabled."""
+    if BATCH_SIZE <= 1:
+        for review in reviews:
+            process_review(review, received_at)
+        return
+    for start in range(0, len(reviews), BATCH_SIZE):
+        process_review_batch(reviews[start:start + BATCH_SIZE], received_at)
+
+def process_reviews(reviews, received_at=None):
+    """
+    Process a list of reviews and wait until all of them are done.
+    
+    With a worker pool the reviews are split by lane and each lane works
+    through its share in pages, so ordering per review_id is preserved.
+    """
+    if worker_pool is None:
+        _process_in_pages(reviews, received_at)
+        return
+    lanes = {}
+    for review in reviews:
+        lanes.setdefault(worker_pool.lane_for(review.get('review_id')), []).append(review)
+    for lane_reviews in lanes.values():
+        worker_pool.submit(lane_reviews[0].get('review_id'), _process_in_pages, lane_reviews, received_at)
+    worker_pool.join()
+
+def dispatch_review(review, received_at=None):
+    """Process a single review, on its worker lane if a pool is running."""
+    if worker_pool is None:
+        process_review(review, received_at)
+    else:
+        worker_pool.submit(review.get('review_id'), process_review, review, received_at)
+
+def load_cursor():
+    """
+    Load the poll cursor (high-water mark) from CURSOR_PATH.
+
+    Returns:
+        dict: {'created_at', 'id'} of the last review handled, or None to start from the beginning
+    """
+    try:
+        with open(CURSOR_PATH) as f:
+            cursor = json.load(f)
+        if isinstance(cursor, dict) and cursor.get('created_at') is not None and cursor.get('id') is not None:
+            return cursor
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.error(f"Ignoring unreadable poll cursor {CURSOR_PATH}: {e}")
+    return None
+
+def save_cursor(cursor):
+    """Persist the poll cursor atomically so a crash never leaves a half-written file."""
+    try:
+        tmp_path = f"{CURSOR_PATH}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cursor, f)
+        os.replace(tmp_path, CURSOR_PATH)
+    except OSError as e:
+        logger.error(f"Error saving poll cursor: {e}")
+
+def _cursor_time(cursor):
+    """The cursor's created_at as a datetime, or None if it cannot be parsed."""
+    try:
+        return datetime.fromisoformat(str(cursor['created_at']).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+def rewind_cursor(cursor, seconds):
+    """
+    A cursor `seconds` before `cursor`, so the next poll reads that window again.
+
+    Returns:
+        dict: {'created_at', 'id': None} (every row from that time on), the
+            cursor itself if seconds is 0, or None (rescan everything) if its
+            timestamp cannot be parsed
+    """
+    if cursor is None or seconds <= 0:
+        return cursor
+    moment = _cursor_time(cursor)
+    if moment is None:
+        return None
+    return {"created_at": (moment - timedelta(seconds=seconds)).isoformat(), "id": None}
+
+def _cursor_ids(cursor, other):
+    """
+    The two cursors' ids, comparable the way the id column orders them.
+
+    PostgREST casts the id in the fetch_waiting_reviews() filter to the
+    column's type, so integer ids (also when saved as digit strings) compare
+    numerically, where str() would put '10' before '9'; other ids (uuid,
+    text) compare as strings.
+    """
+    ids = (cursor['id'], other['id'])
+    try:
+        if not any(isinstance(value, (bool, float)) for value in ids):
+            return tuple(int(value) for value in ids)
+    except (TypeError, ValueError):
+        pass
+    return tuple(str(value) for value in ids)
+
+def _later_cursor(cursor, other):
+    """The later of two cursors (None counts as the beginning)."""
+    if cursor is None or other is None:
+        return cursor or other
+    moment, other_moment = _cursor_time(cursor), _cursor_time(other)
+    if moment is None or other_moment is None or (moment.tzinfo is None) != (other_moment.tzinfo is None):
+        return other
+    cursor_id, other_id = _cursor_ids(cursor, other)
+    return cursor if (moment, cursor_id) > (other_moment, other_id) else other
+
+def fetch_waiting_reviews(cursor=None, limit=None):
+    """
+    Fetch the next page of reviews that are still waiting for Lizi.
+
+    Pages on (created_at, id) so every row is seen once, using the values the
+    database returned rather than local clock time. Backed by the
+    idx_reviews_waiting_cursor partial index.
+
+    Args:
+        cursor (dict): {'created_at', 'id'} of the last review already handled,
+            {'created_at', 'id': None} to start at that time (see rewind_cursor()),
+            or None to start from the oldest waiting review
+        limit (int): Page size, defaults to POLL_PAGE_SIZE
+
+    Returns:
+        list: Review rows ordered by (created_at, id)
+    """
+    query = supabase.table('reviews') \
+        .select(REVIEW_COLUMNS) \
+        .eq('status', 'waiting')
+    if cursor is not None and cursor.get('id') is None:
+        query = query.gte('created_at', cursor['created_at'])
+    elif cursor is not None:
+        created_at = cursor['created_at']
+        query = query.or_(
+            f'created_at.gt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.gt."{cursor["id"]}")'
+        )
+    response = _execute('reviews.poll', query
+        .order('created_at')
+        .order('id')
+        .limit(limit or POLL_PAGE_SIZE))
+    return response.data or []
+
+def drain_waiting_reviews(cursor, rescan=False):
+    """
+    Process every waiting review after the cursor, one page at a time.
+
+    Reading starts POLL_LOOKBACK seconds behind the cursor, so reviews that
+    committed after later ones were already read, or were left 'waiting' by
+    a failed status write, are still picked up; reviews already written are
+    recognised by seen_reviews and their alert updates by review_key(). The
+    high-water mark is saved after each page. When sharding, reviews of
+    cameras leased to other instances are skipped.
+
+    Args:
+        cursor (dict): The high-water mark, or None for the beginning
+        rescan (bool): Read every waiting review, not just those near or after the cursor
+
+    Returns:
+        dict: The new high-water mark
+    """
+    high = cursor
+    cursor = None if rescan else rewind_cursor(cursor, POLL_LOOKBACK)
+    while True:
+        reviews = fetch_waiting_reviews(cursor)
+        if not reviews:
+            return high
+        received_at = time.monotonic()
+        owned = [review for review in reviews if owns_review(review)]
+        logger.info(f"Found {len(owned)} new reviews" + (f" ({len(reviews) - len(owned)} on other shards)" if len(owned) < len(reviews) else ""))
+        process_reviews(owned, received_at)
+        flush_coalesced_updates()
+        last = reviews[-1]
+        cursor = {"created_at": last['created_at'], "id": last['id']}
+        high = _later_cursor(high, cursor)
+        save_cursor(high)
+        if len(reviews) < POLL_PAGE_SIZE:
+            return high
+
+def recheck_statuses():
+    """
+    Re-read the reviews whose guarded status write matched no row.
+
+    Rows still 'waiting' are processed again; a message Lizi already handled
+    is a duplicate, so only its status is written, now onto the row that
+    holds it. Review_ids the dashboard has not stored yet are tried again
+    later (see StatusRechecks).
+    """
+    due = status_rechecks.due()
+    if not due:
+        return
+    try:
+        result = _execute('reviews.recheck', supabase.table('reviews')
+            .select(f'status, {REVIEW_COLUMNS}')
+            .in_('review_id', list(due)))
+    except Exception as e:
+        logger.warning(f"Error re-checking {len(due)} review statuses, retrying later: {e}")
+        for review_id, attempt in due.items():
+            status_rechecks.add([review_id], attempt)
+        return
+    rows = result.data or []
+    found = {row.get('review_id') for row in rows}
+    for review_id, attempt in due.items():
+        if review_id not in found:
+            status_rechecks.add([review_id], attempt + 1)
+    waiting = []
+    for row in rows:
+        if row.pop('status', None) == 'waiting' and owns_review(row):
+            waiting.append(row)
+    if waiting:
+        logger.info(f"Re-checking {len(waiting)} reviews left 'waiting' after their status write")
+        process_reviews(waiting, time.monotonic())
+        flush_coalesced_updates()
+
+def _rescan_due(last_rescan):
+    """True if a full rescan of waiting reviews is due (always at startup, when last_rescan is None)."""
+    return RESCAN_INTERVAL > 0 and (last_rescan is None or time.monotonic() - last_rescan >= RESCAN_INTERVAL)
 
 def poll_reviews():
     """Continuously poll for new reviews and process them."""
     logger.info("🤖 Lizi is watching for reviews...")
-    last_check = None  # None means first run after restart
+    cursor = load_cursor()
+    if cursor is None or RESCAN_INTERVAL > 0:
+        logger.info("Processing ALL waiting reviews.")
+    else:
+        logger.info(f"Resuming from poll cursor {cursor}")
     
+    failures = 0
+    last_rescan = None
+    rescan = False
     while True:
         try:
-            current_time = datetime.now(timezone.utc)
-            if last_check is None:
-                logger.info("First run after restart: processing ALL waiting reviews.")
-                response = supabase.table('reviews') \
-                    .select('*') \
-                    .eq('status', 'waiting') \
-                    .execute()
-            else:
-                logger.info(f"Checking for reviews between {last_check.isoformat()} and {current_time.isoformat()}")
-                # Convert UTC to Central Time for database comparison
-                central_tz = timezone(timedelta(hours=-6))  # CST is UTC-6
-                last_check_central = last_check.astimezone(central_tz)
-                response = supabase.table('reviews') \
-                    .select('*') \
-                    .eq('status', 'waiting') \
-                    .gte('created_at', last_check_central.strftime('%Y-%m-%d %H:%M:%S')) \
-                    .execute()
-            # Log the number of reviews found
-            if response.data:
-                logger.info(f"Found {len(response.data)} new reviews")
-                for review in response.data:
-                    logger.info(f"Processing review {review.get('review_id', 'unknown')} from camera {review.get('camera', 'unknown')}")
-                    process_review(review)
-            else:
-                logger.info("No new reviews found")
-            # Update last check time
-            last_check = current_time
-            time.sleep(5)
+            if shards_gained.is_set():
+                shards_gained.clear()
+                logger.info("Shards changed: rescanning waiting reviews from the start")
+                rescan = True
+            rescan = rescan or _rescan_due(last_rescan)
+            cursor = drain_waiting_reviews(cursor, rescan)
+            if rescan:
+                last_rescan = time.monotonic()
+                rescan = False
+            recheck_statuses()
+            flush_coalesced_updates()
+            failures = 0
+            time.sleep(POLL_INTERVAL)
         except Exception as e:
-            logger.error(f"❌ Error polling reviews: {str(e)}")
-            time.sleep(5)  # Wait before retrying
+            failures += 1
+            # Back off while Supabase stays unreachable instead of retrying every interval
+            delay = min(OUTBOX_MAX_DELAY, POLL_INTERVAL * 2 ** (failures - 1))
+            logger.error(f"❌ Error polling reviews (retrying in {delay:.0f}s): {str(e)}")
+            time.sleep(delay)
 
-if __name__ == "__main__":
+def watch_reviews():
+    """
+    Process reviews as Frigate publishes them on MQTT.
+
+    Messages are handed from the MQTT network thread to this thread through
+    review_inbox, so reviews are processed in arrival order (per review_id
+    when worker lanes are enabled). Supabase is only queried for waiting
+    reviews after a (re)connect, to catch up on anything published while Lizi
+    was not subscribed, and for the full rescans every RESCAN_INTERVAL.
+    """
+    from lizi_mqtt import create_mqtt_client
+
+    logger.info("🤖 Lizi is listening for reviews on MQTT...")
+    inbox = review_inbox
+    needs_catch_up = {"value": False}
+    last_rescan = None
+    # Wake up regularly while updates wait in the coalescing window, for status re-checks and for rescans
+    waits = [wait for wait in (
+        coalescer.window / 2 if coalescer is not None else 0,
+        STATUS_RECHECK_DELAY if STATUS_RECHECK_ATTEMPTS > 0 else 0,
+        RESCAN_INTERVAL
+    ) if wait > 0]
+    timeout = min(waits) if waits else None
+
+    def on_message(topic, payload):
+        inbox.put((payload, time.monotonic()))
+
+    def on_connect():
+        needs_catch_up["value"] = True
+        inbox.put(None)  # Wake the processing loop
+
+    client = create_mqtt_client(
+        os.getenv('LIZI_MQTT_CLIENT_ID', 'lizi'),
+        [REVIEW_TOPIC],
+        on_message,
+        on_connect=on_connect
+    )
+    client.loop_start()
+
+    try:
+        while True:
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            flush_coalesced_updates()
+            gained = shards_gained.is_set()
+            if gained:
+                shards_gained.clear()
+            rescan = gained or _rescan_due(last_rescan)
+            if rescan:
+                needs_catch_up["value"] = True
+            if needs_catch_up["value"]:
+                needs_catch_up["value"] = False
+                try:
+                    logger.info("Catching up on waiting reviews of newly owned shards" if gained else
+                                "Rescanning all waiting reviews" if rescan else
+                                "Catching up on waiting reviews after (re)connect")
+                    drain_waiting_reviews(load_cursor(), rescan)
+                    if rescan:
+                        last_rescan = time.monotonic()
+                except Exception as e:
+                    logger.error(f"❌ Error catching up on waiting reviews: {str(e)}")
+                    needs_catch_up["value"] = True
+                    if gained:
+                        shards_gained.set()
+                    time.sleep(5)
+                    inbox.put(None)
+            try:
+                recheck_statuses()
+            except Exception as e:
+                logger.error(f"❌ Error re-checking review statuses: {str(e)}")
+            if item is None:
+                continue
+            payload, received_at = item
+            try:
+                review = review_from_mqtt(json.loads(payload))
+            except ValueError as e:
+                logger.error(f"Ignoring malformed review message: {e}")
+                continue
+            if review is None:
+                logger.error("Ignoring review message without review_id or camera")
+                continue
+            if not owns_review(review):
+                continue
+            dispatch_review(review, received_at)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+def _handle_sigterm(signum, frame):
+    """Turn `docker stop` into a normal exit so the worker lanes get drained."""
+    raise SystemExit(0)
+
+def check_environment():
+    """
+    Log the Supabase settings and fail fast if they are missing.
+
+    Raises:
+        ValueError: If SUPABASE_URL or SERVICE_ROLE_KEY is not set
+    """
+    logger.info("Environment variables loaded:")
+    logger.info(f"SUPABASE_URL: {os.getenv('SUPABASE_URL', 'http://10.0.1.217:8000')}")
+    logger.info(f"SERVICE_ROLE_KEY: {'Present' if os.getenv('SERVICE_ROLE_KEY') else 'Missing'}")
+
+    if not os.getenv('SUPABASE_URL') or not os.getenv('SERVICE_ROLE_KEY'):
+        raise ValueError("Missing SUPABASE_URL or SERVICE_ROLE_KEY")
+
+    logger.info(f"🔌 Connecting to Supabase at {os.getenv('SUPABASE_URL', 'http://10.0.1.217:8000')}")
+    logger.info(f"Review ingestion mode: {INGEST_MODE}")
+
+def main():
+    """Configure logging, check the environment, start the enabled workers and process reviews until stopped."""
+    global worker_pool
+
+    # Configure logging (queue-backed, rotated at LIZI_LOG_MAX_BYTES, text or JSON per LIZI_LOG_FORMAT)
+    configure_logging(suffix=_STATE_SUFFIX)
+
+    # Configure httpx logger to use watchers name
+    httpx_logger = logging.getLogger('httpx')
+    httpx_logger.name = 'watchers'
+
+    check_environment()
     logger.info("Starting Lizi Alert Manager...")
-    poll_reviews() 
\ No newline at end of file
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    warm_alert_cache()
+    if SHARD_COUNT > 0:
+        start_shard_leases()
+    if OUTBOX_PATH:
+        start_outbox()
+    if MEDIA_PREFETCH:
+        start_media_prefetch()
+    if EVALUATE:
+        start_evaluator()
+    if TRACKED_INGEST:
+        start_tracked_ingest()
+    if ROLLUPS:
+        start_rollups()
+    if WORKERS > 1:
+        worker_pool = ReviewWorkerPool(WORKERS, WORKER_QUEUE_SIZE)
+    try:
+        if INGEST_MODE == 'mqtt':
+            watch_reviews()
+        else:
+            poll_reviews()
+    finally:
+        try:
+            flush_coalesced_updates(flush_all=True)
+        except Exception as e:
+            logger.error(f"Error flushing coalesced updates at shutdown: {e}")
+        if worker_pool is not None:
+            worker_pool.shutdown()
+        if rollups is not None:
+            rollups.stop()
+        if outbox is not None:
+            outbox.stop()
+        if media_prefetcher is not None:
+            media_prefetcher.shutdown()
+        if evaluator is not None:
+            evaluator.stop()
+        if tracked_ingester is not None:
+            tracked_ingester.stop()
+        if shard_leases is not None:
+            shard_leases.stop()
+        close_db()
+        logger.info("Lizi Alert Manager stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import subprocess
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+import os
+import glob
 import json
+import asyncio
 from datetime import datetime
 import logging
 import traceback
+from lizi_log_index import LogIndex
+from lizi_rollups import DIMENSIONS, summarize
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Lizi writes this file on the shared lizi-logs volume (lizi.<worker>.log per instance when sharding)
+LOG_PATH = os.getenv('LIZI_LOG_PATH', '/app/logs/lizi.log')
+_log_root, _log_extension = os.path.splitext(LOG_PATH)
+LOG_FILES = f"{glob.escape(_log_root)}*{glob.escape(_log_extension)}"
+# SQLite index of the log, kept next to it on the volume, and its row cap
+LOG_INDEX_PATH = os.getenv('LIZI_LOG_INDEX_PATH', '/app/logs/lizi_log_index.db')
+LOG_INDEX_MAX_ROWS = int(os.getenv('LIZI_LOG_INDEX_MAX_ROWS', '500000'))
+# Entries returned by /logs when no limit is given, and the hard maximum
+TAIL_LINES = int(os.getenv('LIZI_LOG_TAIL_LINES', '100'))
+MAX_LIMIT = int(os.getenv('LIZI_LOG_MAX_LIMIT', '5000'))
+# Rows read per request when loading ai_alert_rollups (PostgREST caps responses)
+ROLLUP_PAGE_SIZE = int(os.getenv('LIZI_ROLLUP_PAGE_SIZE', '1000'))
+# Seconds between index refreshes and between checks for new lines on /logs/stream
+STREAM_INTERVAL = float(os.getenv('LIZI_LOG_STREAM_INTERVAL', '1'))
+
+CURSOR_HEADER = 'X-Log-Cursor'
+
 app = FastAPI()
 
 # Configure CORS
@@ -19,6 +41,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CURSOR_HEADER],
 )
 
 def determine_log_name(logger_name: str) -> str:
@@ -31,70 +54,247 @@ def determine_log_name(logger_name: str) -> str:
     else:
         return 'info'
 
-def get_logs_for_container(container_name: str) -> list:
-    """Get logs for a specific container by name."""
+def parse_log_line(line: str, fallback_timestamp: str = None) -> dict:
+    """
+    Parse one line from lizi.log.
+
+    Handles both JSON lines (LIZI_LOG_FORMAT=json, fields are read directly)
+    and 'timestamp - logger - level - message' text lines. Lines in any other
+    shape (tracebacks, continuation lines) are returned as raw info entries
+    stamped with `fallback_timestamp` so they stay in order.
+    """
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+            entry = dict(record)
+            entry["level"] = str(record.get("level", "info")).lower()
+            entry["name"] = determine_log_name(str(record.get("name", "")))
+            entry["timestamp"] = record.get("timestamp") or fallback_timestamp or datetime.now().isoformat()
+            entry["message"] = record.get("message", "")
+            return entry
+        except ValueError:
+            pass
+    parts = line.split(" - ", 3)
+    if len(parts) == 4:
+        timestamp, logger_name, level, message = parts
+        return {
+            "timestamp": timestamp,
+            "level": level.lower(),
+            "message": message,
+            "name": determine_log_name(logger_name)
+        }
+    return {
+        "timestamp": fallback_timestamp or datetime.now().isoformat(),
+        "level": "info",
+        "message": line,
+        "name": "info"
+    }
+
+def parse_log_lines(lines: list) -> list:
+    """Parse lines in file order, carrying timestamps over to unparseable lines."""
+    entries = []
+    last_timestamp = None
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = parse_log_line(line, last_timestamp)
+        last_timestamp = entry["timestamp"]
+        entries.append(entry)
+    return entries
+
+log_index = None
+
+def get_log_index() -> LogIndex:
+    """Open the log index on first use."""
+    global log_index
+    if log_index is None:
+        log_index = LogIndex(LOG_INDEX_PATH, LOG_FILES, parse_log_lines, max_rows=LOG_INDEX_MAX_ROWS)
+    return log_index
+
+async def refresh_log_index():
+    """Index lines appended to the log since the last refresh (off the event loop)."""
+    return await asyncio.to_thread(get_log_index().ingest)
+
+@app.on_event("startup")
+async def start_log_indexer():
+    """Keep indexing in the background so logs stay queryable after the file rotates."""
+    async def index_forever():
+        while True:
+            try:
+                await refresh_log_index()
+            except Exception as e:
+                logger.error(f"Error indexing logs: {str(e)}")
+            await asyncio.sleep(STREAM_INTERVAL)
+
+    asyncio.create_task(index_forever())
+
+def _split(values: str) -> list:
+    return [value.strip() for value in values.split(',') if value.strip()] if values else None
+
+@app.get("/logs")
+async def get_logs(
+    since: str = None,
+    until: str = None,
+    level: str = None,
+    name: str = None,
+    limit: int = Query(None, ge=1),
+    cursor: str = None,
+    review_id: str = None,
+    camera: str = None
+):
+    """
+    Return parsed Lizi log entries from the log index.
+
+    Query parameters:
+    - since / until: ISO timestamps bounding the entries
+    - level: comma-separated levels (info, warning, error, ...)
+    - name: comma-separated categories (watchers, watched, info)
+    - limit: maximum entries (default LIZI_LOG_TAIL_LINES)
+    - cursor: only entries after this cursor (from X-Log-Cursor)
+    - review_id / camera: only entries logged with these structured fields
+      (LIZI_LOG_FORMAT=json); entries include all their structured fields
+
+    Entries are in time order, also across the files of sharded instances.
+    Without cursor or since, the newest entries are returned. The
+    X-Log-Cursor response header holds the cursor for the next call.
+    """
     try:
-        logger.info(f"Getting logs for container {container_name}")
-        result = subprocess.run(
-            ['docker', 'logs', '--tail', '100', '--timestamps', container_name],
-            capture_output=True,
-            text=True,
-            check=True
+        await refresh_log_index()
+        entries, next_cursor = await asyncio.to_thread(
+            get_log_index().query,
+            since=since,
+            until=until,
+            levels=_split(level),
+            names=_split(name),
+            limit=min(limit or TAIL_LINES, MAX_LIMIT),
+            cursor=cursor,
+            fields={"review_id": review_id, "camera": camera}
         )
-        
-        logs = result.stdout
-        logger.info(f"Raw log content for container {container_name}: {repr(logs)}")
-        logger.info(f"Retrieved {len(logs.split('\n'))} log lines from container {container_name}")
-        
-        parsed_logs = []
-        for line in logs.split('\n'):
-            if not line.strip():
-                continue
-
-            logger.info(f"Processing line: {repr(line)}")
-            parts = line.split(" - ", 3)
-            if len(parts) == 4:
-                timestamp, logger_name, level, message = parts
-                name = determine_log_name(logger_name)
-                parsed_logs.append({
-                    "timestamp": timestamp,
-                    "level": level.lower(),
-                    "message": message,
-                    "name": name
-                })
-                logger.info(f"Successfully parsed regular log entry: timestamp={timestamp}, name={name}, level={level}")
-            else:
-                # If can't parse, add as raw log
-                parsed_logs.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "level": "info",
-                    "message": line,
-                    "name": "info"
-                })
-                logger.info(f"Added unparseable log as raw entry: {line}")
-        
-        return parsed_logs
-        
+        return JSONResponse(entries, headers={CURSOR_HEADER: str(next_cursor)})
     except Exception as e:
-        logger.error(f"Error getting logs for container {container_name}: {str(e)}")
+        logger.error(f"Error in get_logs: {str(e)}")
         logger.error(traceback.format_exc())
-        return []
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/logs")
-async def get_logs():
+@app.get("/logs/stream")
+async def stream_logs(request: Request, level: str = None, name: str = None, cursor: str = None,
+                      review_id: str = None, camera: str = None):
+    """
+    Stream new Lizi log entries as server-sent events.
+
+    Each event's id is the index cursor after it, so a reconnecting
+    EventSource resumes from Last-Event-ID without gaps or repeats. Accepts
+    the same level/name/review_id/camera filters as /logs.
+    """
+    last_event_id = request.headers.get('last-event-id')
+    if cursor is None and last_event_id:
+        cursor = last_event_id
+    levels = _split(level)
+    names = _split(name)
+    fields = {"review_id": review_id, "camera": camera}
+
+    async def events(cursor):
+        if cursor is None:
+            cursor = await asyncio.to_thread(get_log_index().last_cursor)
+        while not await request.is_disconnected():
+            await refresh_log_index()
+            entries, cursor_after = await asyncio.to_thread(
+                get_log_index().query, levels=levels, names=names, limit=MAX_LIMIT, cursor=cursor, fields=fields)
+            if entries:
+                yield f"id: {cursor_after}\ndata: {json.dumps(entries)}\n\n"
+            cursor = cursor_after
+            await asyncio.sleep(STREAM_INTERVAL)
+
+    return StreamingResponse(
+        events(cursor),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+media_cache = None
+
+def get_media_cache():
+    """Open the media cache Lizi prefetches snapshots into on first use."""
+    global media_cache
+    if media_cache is None:
+        from lizi_media import MediaCache
+        media_cache = MediaCache()
+    return media_cache
+
+@app.get("/media/{alert_id}/{variant}")
+async def get_media(alert_id: str, variant: str):
+    """
+    Serve an alert's snapshot ('snapshot') or its downscaled thumbnail
+    ('thumbnail') from the local media cache.
+
+    Returns 404 when Lizi has not cached it (yet), in which case callers can
+    fall back to Frigate. The file is read into memory first (snapshots are
+    small), so Lizi evicting it meanwhile cannot cut the response short.
+    """
+    if variant not in ('snapshot', 'thumbnail'):
+        raise HTTPException(status_code=404, detail=f"Unknown media variant: {variant}")
+    thumbnail = variant == 'thumbnail'
+    cached = await asyncio.to_thread(get_media_cache().read, alert_id, 'snapshot', thumbnail)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Media not cached")
+    entry, content = cached
+    return Response(
+        content,
+        media_type='image/jpeg' if thumbnail else (entry["content_type"] or 'application/octet-stream'),
+        headers={'Cache-Control': 'public, max-age=86400', 'ETag': f'"{entry["sha256"]}"'}
+    )
+
+@app.get("/rollups")
+async def get_rollups(
+    since: str = None,
+    until: str = None,
+    camera: str = None,
+    label: str = None,
+    group_by: str = 'camera'
+):
+    """
+    Summarize alerts from the hourly ai_alert_rollups table.
+
+    Query parameters:
+    - since / until: ISO timestamps bounding the hourly buckets
+    - camera / label: comma-separated filters
+    - group_by: comma-separated dimensions (hour, day, camera, label); empty
+      for one total
+
+    Each entry holds the group's dimension values, the alert, detection,
+    update, ended, triggered and feedback counts, alert_ratio and
+    false_alert_rate. The cost depends on the number of buckets, not alerts.
+    """
+    dimensions = tuple(_split(group_by) or ())
+    unknown = [dimension for dimension in dimensions if dimension not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by dimensions: {', '.join(unknown)}")
     try:
-        logger.info("Fetching logs...")
-        container_name = 'cameraguardai-lizi-1'
-        all_logs = get_logs_for_container(container_name)
-        all_logs.sort(key=lambda x: x["timestamp"])
-        logger.info(f"DEBUG: all_logs = {all_logs}")  # Use logger instead of print
-        logger.info(f"Successfully parsed {len(all_logs)} total log entries")
-        return all_logs
+        from lizi_db import get_async_client
+        db = await get_async_client()
+        rows = []
+        while True:
+            query = db.table('ai_alert_rollups').select('*')
+            if since:
+                query = query.gte('bucket', since)
+            if until:
+                query = query.lt('bucket', until)
+            if camera:
+                query = query.in_('camera', _split(camera))
+            if label:
+                query = query.in_('label', _split(label))
+            result = await query.order('bucket').order('camera').order('label') \
+                .range(len(rows), len(rows) + ROLLUP_PAGE_SIZE - 1).execute()
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < ROLLUP_PAGE_SIZE:
+                break
+        return summarize(rows, dimensions)
     except Exception as e:
-        logger.error(f"Error in get_logs: {str(e)}")
+        logger.error(f"Error in get_rollups: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=5000)
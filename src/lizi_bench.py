@@ -0,0 +1,732 @@
+"""
+Lizi Benchmark
+--------------
+Replays Frigate review lifecycles (new -> update... -> end) through the Lizi
+pipeline against an in-process Supabase stand-in, so throughput changes can
+be measured without touching the real database.
+
+The stand-in answers the same table queries and RPCs Lizi makes, sleeping a
+configurable latency per request. The run reports reviews/sec, p50/p99
+review latency and Supabase requests per review.
+
+Usage:
+    python lizi_bench.py --reviews 500 --cameras 8 --latency 0.005
+    python lizi_bench.py --replay recorded_reviews.ndjson --mode batch --workers 4
+    python lizi_bench.py --startup --runs 10
+    python lizi_bench.py --checks
+
+--startup measures how long a fresh interpreter takes to import lizi_decisions,
+lizi and lizi_api instead, i.e. the import cost paid on every container
+(re)start. --checks runs scenario checks of behaviour that throughput runs
+do not cover (status re-checks, the media cache, ...) and exits non-zero if one fails.
+
+Recorded files hold one Frigate review MQTT message ({'type', 'before',
+'after'}) per line, e.g. captured with `mosquitto_sub -t frigate/reviews`.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+
+LABELS = ['person', 'car', 'truck', 'bicycle', 'dog']
+ZONES = ['driveway', 'porch', 'street', 'yard']
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Chainable PostgREST query builder backed by FakeSupabase's tables."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.operation = 'select'
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.row_limit = None
+
+    def select(self, columns='*', **kwargs):
+        self.operation = 'select'
+        return self
+
+    def insert(self, data, **kwargs):
+        self.operation = 'insert'
+        self.payload = data
+        return self
+
+    def upsert(self, data, on_conflict='id', ignore_duplicates=False, **kwargs):
+        self.operation = 'upsert'
+        self.payload = data
+        self.conflict_column = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data, **kwargs):
+        self.operation = 'update'
+        self.payload = data
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = 'delete'
+        return self
+
+    def eq(self, column, value):
+        # PostgREST casts the filter value to the column type, e.g. JSON text for jsonb columns
+        self.filters.append(lambda row: row.get(column) == (
+            json.loads(value) if isinstance(row.get(column), (dict, list)) and isinstance(value, str) else value))
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and str(row.get(column)) >= str(value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and str(row.get(column)) < str(value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and str(row.get(column)) > str(value))
+        return self
+
+    def is_(self, column, value):
+        expected = None if value == 'null' else value
+        self.filters.append(lambda row: row.get(column) is expected)
+        return self
+
+    def or_(self, expression):
+        # Only used by the poller's cursor filter, which the benchmark does not drive
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        return self.db._execute(f"{self.table}.{self.operation}", self._run)
+
+    def _run(self, tables):
+        rows = tables.setdefault(self.table, [])
+        if self.operation == 'upsert':
+            by_key = {row.get(self.conflict_column): row for row in rows}
+            written = []
+            for item in self.payload if isinstance(self.payload, list) else [self.payload]:
+                existing = by_key.get(item.get(self.conflict_column))
+                if existing is None:
+                    row = dict(item)
+                    row.setdefault('id', str(uuid.uuid4()))
+                    rows.append(row)
+                    by_key[row.get(self.conflict_column)] = row
+                    written.append(dict(row))
+                elif not self.ignore_duplicates:
+                    existing.update(item)
+                    written.append(dict(existing))
+            return written
+        if self.operation == 'insert':
+            created = []
+            for item in self.payload if isinstance(self.payload, list) else [self.payload]:
+                row = dict(item)
+                row.setdefault('id', str(uuid.uuid4()))
+                rows.append(row)
+                created.append(dict(row))
+            return created
+        matched = [row for row in rows if all(check(row) for check in self.filters)]
+        if self.operation == 'update':
+            for row in matched:
+                row.update(self.payload)
+            return [dict(row) for row in matched]
+        if self.operation == 'delete':
+            tables[self.table] = [row for row in rows if not any(row is match for match in matched)]
+            return [dict(row) for row in matched]
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda row: str(row.get(column)), reverse=desc)
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        return [dict(row) for row in matched]
+
+
+class FakeRpc:
+    def __init__(self, db, function, params):
+        self.db = db
+        self.function = function
+        self.params = params
+
+    def execute(self):
+        handler = getattr(self.db, f"_rpc_{self.function}", None)
+        if handler is None or not self.db.rpc_enabled:
+            self.db._execute(f"rpc.{self.function}", lambda tables: None)
+            raise Exception(f"Could not find the function public.{self.function}")
+        return self.db._execute(f"rpc.{self.function}", lambda tables: handler(tables, self.params))
+
+
+class FakeSupabase:
+    """
+    In-process stand-in for the Supabase client.
+
+    Args:
+        latency (float): Seconds each request sleeps, modelling the network round trip
+        jitter (float): Extra random sleep of up to this many seconds per request
+        rpc_enabled (bool): False behaves like a database without the Lizi functions
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, rpc_enabled=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.rpc_enabled = rpc_enabled
+        self.tables = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, function, params=None):
+        return FakeRpc(self, function, params or {})
+
+    def request_count(self):
+        return sum(self.requests.values())
+
+    def _execute(self, operation, run):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+            return FakeResponse(run(self.tables))
+
+    def _rpc_lizi_update_alert(self, tables, params):
+        for alert in tables.setdefault('ai_alerts', []):
+            if alert['id'] == params['p_alert_id']:
+                if params.get('p_review_type') == 'new' or (
+                        params.get('p_review_key') is not None and alert.get('latest_review_key') == params['p_review_key']):
+                    # Already applied (redelivered review)
+                    return [{"new_update_count": alert.get('update_count'), "applied": False}]
+                alert['update_count'] = (alert.get('update_count') or 0) + params.get('p_increment', 1)
+                alert['latest_review_type'] = params.get('p_review_type')
+                alert['latest_review_timestamp'] = params.get('p_review_timestamp')
+                alert['latest_review_key'] = params.get('p_review_key')
+                if params.get('p_payload') is not None:
+                    alert['full_review_payload'] = params['p_payload']
+                if params.get('p_delta') is not None:
+                    alert.setdefault('payload_deltas', []).append(params['p_delta'])
+                return [{"new_update_count": alert['update_count'], "applied": True}]
+        return []
+
+    def _rpc_lizi_update_review_statuses(self, tables, params):
+        updates = {item['review_id']: item for item in params.get('p_updates') or []}
+        updated = 0
+        for review in tables.setdefault('reviews', []):
+            item = updates.get(review.get('review_id'))
+            if item and (item.get('after_data') is None or (
+                    review.get('review_type') == item.get('review_type') and review.get('after_data') == item['after_data'])):
+                review['status'] = item['status']
+                review['reasoning'] = item.get('reasoning')
+                updated += 1
+        return updated
+
+
+    def _rpc_lizi_apply_evaluations(self, tables, params):
+        results = {item['id']: item for item in params.get('p_results') or []}
+        updated = 0
+        for alert in tables.setdefault('ai_alerts', []):
+            item = results.get(alert['id'])
+            if item:
+                alert['triggered'] = item['triggered']
+                if item.get('reason') is not None:
+                    alert['reason'] = item['reason']
+                if item.get('confidence') is not None:
+                    alert['confidence'] = item['confidence']
+                alert['evaluated_at'] = datetime.now(timezone.utc).isoformat()
+                updated += 1
+        return updated
+
+
+    def _rpc_lizi_increment_rollups(self, tables, params):
+        rollups = tables.setdefault('ai_alert_rollups', [])
+        by_key = {(row['bucket'], row['camera'], row['label']): row for row in rollups}
+        for item in params.get('p_rows') or []:
+            key = (item['bucket'], item['camera'], item.get('label') or '')
+            row = by_key.get(key)
+            if row is None:
+                row = by_key[key] = {"bucket": key[0], "camera": key[1], "label": key[2]}
+                rollups.append(row)
+            for name in ('alerts', 'detections', 'updates', 'ended'):
+                row[name] = row.get(name, 0) + (item.get(name) or 0)
+        return len(params.get('p_rows') or [])
+
+
+def synthetic_lifecycles(reviews=200, cameras=4, updates=3, payload_bytes=2048, seed=1):
+    """
+    Build Frigate review MQTT messages for `reviews` lifecycles.
+
+    Each lifecycle is a 'new' message, `updates` 'update' messages (each with
+    a new detection, the zone list sometimes growing) and an 'end' message. Lifecycles on different
+    cameras overlap the way they do on a busy site, while the messages of one
+    review stay in order.
+
+    Args:
+        reviews (int): Number of review lifecycles
+        cameras (int): Number of cameras they are spread across
+        updates (int): 'update' messages per lifecycle
+        payload_bytes (int): Approximate size of each message's detection data
+        seed (int): Random seed, so runs are comparable
+
+    Returns:
+        list: Decoded MQTT payloads in publish order
+    """
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc).timestamp()
+    lifecycles = []
+    for index in range(reviews):
+        camera = f"camera_{index % cameras}"
+        review_id = f"{start:.6f}-{index:06d}"
+        labels = rng.sample(LABELS, rng.randint(1, 2))
+        zones = rng.sample(ZONES, rng.randint(0, 2))
+        severity = rng.choice(['alert', 'detection'])
+        detections = []
+        while len(json.dumps(detections)) < payload_bytes:
+            detections.append({
+                "id": f"{review_id}-{len(detections)}",
+                "label": rng.choice(labels),
+                "score": round(rng.uniform(0.5, 0.99), 3),
+                "box": [rng.random() for _ in range(4)]
+            })
+        messages = []
+        before = None
+        for step in range(updates + 2):
+            review_type = 'new' if step == 0 else 'end' if step == updates + 1 else 'update'
+            if step and rng.random() < 0.3:
+                extra = rng.choice(ZONES)
+                if extra not in zones:
+                    zones = zones + [extra]
+            if review_type == 'update':
+                # Frigate only publishes an update when something changed
+                detections = detections + [{
+                    "id": f"{review_id}-{len(detections)}",
+                    "label": rng.choice(labels),
+                    "score": round(rng.uniform(0.5, 0.99), 3),
+                    "box": [rng.random() for _ in range(4)]
+                }]
+            after = {
+                "id": review_id,
+                "camera": camera,
+                "start_time": start + index,
+                "end_time": start + index + step if review_type == 'end' else None,
+                "severity": severity,
+                "thumb_path": f"/media/frigate/clips/review/thumb-{camera}-{review_id}.webp",
+                "data": {
+                    "detections": detections,
+                    "objects": list(labels),
+                    "zones": list(zones),
+                    "sub_labels": [],
+                    "audio": []
+                }
+            }
+            messages.append({"type": review_type, "before": before or after, "after": after})
+            before = after
+        lifecycles.append(messages)
+
+    # Interleave lifecycles, keeping each one's messages in order
+    ordered = []
+    active = []
+    pending = list(reversed(lifecycles))
+    while pending or active:
+        while pending and (not active or rng.random() < 0.5):
+            active.append(pending.pop())
+        lifecycle = rng.choice(active)
+        ordered.append(lifecycle.pop(0))
+        if not lifecycle:
+            active.remove(lifecycle)
+    return ordered
+
+
+def load_recorded(path):
+    """Read recorded Frigate review messages, one JSON object per line."""
+    messages = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                messages.append(json.loads(line))
+    return messages
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def import_lizi():
+    """
+    Import the Lizi pipeline without touching real infrastructure.
+
+    Importing lizi opens no log files and builds no Supabase client (both
+    happen in lizi.main() / on first use), so no credentials are needed; the
+    client is replaced by a FakeSupabase before anything runs.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import lizi
+    return lizi
+
+
+# Modules timed by --startup: the pure decision logic, the alert manager and the API
+STARTUP_MODULES = ('lizi_decisions', 'lizi', 'lizi_api')
+
+
+def startup_benchmark(modules=STARTUP_MODULES, runs=5):
+    """
+    Time importing each module in a fresh interpreter.
+
+    Every run starts a new Python process, so nothing is cached in
+    sys.modules; the figure is what a restarted container pays before it can
+    start working.
+
+    Args:
+        modules (tuple): Module names, importable from this directory
+        runs (int): Processes started per module
+
+    Returns:
+        dict: module -> {'median_ms', 'p90_ms', 'process_ms'} where
+            process_ms is the median wall time of the whole process
+    """
+    import subprocess
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    results = {}
+    for module in modules:
+        imports, processes = [], []
+        code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+        for _ in range(runs):
+            started = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', code], env=env, cwd=here,
+                                    capture_output=True, text=True, check=True).stdout
+            processes.append(time.perf_counter() - started)
+            imports.append(float(output.strip().splitlines()[-1]))
+        results[module] = {
+            "median_ms": percentile(imports, 0.5) * 1000,
+            "p90_ms": percentile(imports, 0.9) * 1000,
+            "process_ms": percentile(processes, 0.5) * 1000
+        }
+    return results
+
+
+def format_startup_report(results, runs):
+    """Render a startup_benchmark() result as a short text report."""
+    lines = [f"Lizi startup ({runs} fresh interpreters per module)",
+             f"  {'module':<20} {'import p50':>11} {'import p90':>11} {'process p50':>12}"]
+    lines.extend(
+        f"  {module:<20} {result['median_ms']:>8.1f} ms {result['p90_ms']:>8.1f} ms {result['process_ms']:>9.1f} ms"
+        for module, result in results.items()
+    )
+    return '\n'.join(lines)
+
+
+def run_benchmark(lizi, messages, fake, mode='single', workers=1, batch_size=100, coalesce_window=0.0):
+    """
+    Push review messages through Lizi and measure them.
+
+    Args:
+        lizi (module): The imported lizi module
+        messages (list): Frigate review MQTT payloads in publish order
+        fake (FakeSupabase): Stand-in that lizi.supabase is pointed at
+        mode (str): 'single' processes each review as it arrives (the MQTT path),
+            'batch' processes pages of `batch_size` (the poll backlog path)
+        workers (int): Worker lanes (1 runs on this thread)
+        batch_size (int): Page size in batch mode
+        coalesce_window (float): LIZI_COALESCE_WINDOW to run with (0 disables coalescing)
+
+    Returns:
+        dict: reviews, seconds, reviews_per_sec, p50_ms, p99_ms,
+            requests_per_review, outcomes and requests by operation
+    """
+    lizi.supabase = fake
+    lizi.alert_cache = lizi.AlertCache(lizi.alert_cache.max_size, lizi.alert_cache.ttl)
+    lizi.ATOMIC_UPDATES = True
+    lizi.BATCH_SIZE = batch_size
+    lizi.coalescer = lizi.UpdateCoalescer(coalesce_window) if coalesce_window > 0 else None
+    reviews = [review for review in (lizi.review_from_mqtt(message) for message in messages) if review]
+    for index, review in enumerate(reviews):
+        review['id'] = index + 1
+        review['status'] = 'waiting'
+    fake.tables['reviews'] = [dict(review) for review in reviews]
+    fake.requests.clear()
+
+    latencies = []
+    latency_lock = threading.Lock()
+    outcomes = {}
+    process_review = lizi._process_review
+
+    def timed_process_review(review):
+        started = time.perf_counter()
+        outcome = process_review(review)
+        elapsed = time.perf_counter() - started
+        with latency_lock:
+            latencies.append(elapsed)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return outcome
+
+    lizi._process_review = timed_process_review
+    lizi.worker_pool = lizi.ReviewWorkerPool(workers, lizi.WORKER_QUEUE_SIZE) if workers > 1 else None
+    started = time.perf_counter()
+    try:
+        if mode == 'batch':
+            page_latencies = []
+            for start in range(0, len(reviews), batch_size):
+                page = reviews[start:start + batch_size]
+                page_started = time.perf_counter()
+                lizi.process_reviews(page, time.monotonic())
+                lizi.flush_coalesced_updates()
+                page_latencies.extend([time.perf_counter() - page_started] * len(page))
+            # Batched reviews finish together, so each one's latency is its page's
+            latencies = page_latencies
+        else:
+            for review in reviews:
+                lizi.dispatch_review(review, time.monotonic())
+                lizi.flush_coalesced_updates()
+        lizi.flush_coalesced_updates(flush_all=True)
+        if lizi.worker_pool is not None:
+            lizi.worker_pool.join()
+        if mode == 'batch':
+            # Batches don't report per-review outcomes; count the statuses written instead
+            outcomes = {}
+            for review in fake.tables['reviews']:
+                status = f"status_{review.get('status')}"
+                outcomes[status] = outcomes.get(status, 0) + 1
+    finally:
+        elapsed = time.perf_counter() - started
+        if lizi.worker_pool is not None:
+            lizi.worker_pool.shutdown()
+            lizi.worker_pool = None
+        lizi._process_review = process_review
+
+    total = len(reviews)
+    return {
+        "reviews": total,
+        "seconds": elapsed,
+        "reviews_per_sec": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "requests_per_review": fake.request_count() / total if total else 0.0,
+        "outcomes": outcomes,
+        "requests": dict(sorted(fake.requests.items()))
+    }
+
+
+def _reset(lizi, fake):
+    """Point lizi at `fake` with empty caches, one lane and no coalescing, for a scenario check."""
+    lizi.supabase = fake
+    lizi.seen_reviews = lizi.SeenReviews()
+    lizi.alert_cache = lizi.AlertCache()
+    lizi.status_rechecks = lizi.StatusRechecks(0, 3)
+    lizi.coalescer = None
+    lizi.worker_pool = None
+    lizi.ATOMIC_UPDATES = True
+
+
+def check_status_rechecks(lizi):
+    """
+    MQTT mode: Lizi handles each message before the dashboard stores its
+    reviews row, so every guarded status write misses; the re-check must
+    still leave each row processed, with every update applied once.
+    """
+    fake = FakeSupabase()
+    _reset(lizi, fake)
+    messages = synthetic_lifecycles(4, 2, 2, 100)
+    rows = {}
+    for message in messages:
+        lizi.process_review(lizi.review_from_mqtt(message))
+    assert len(lizi.status_rechecks) == 4, f"{len(lizi.status_rechecks)} re-checks scheduled"
+    lizi.recheck_statuses()  # No rows yet: scheduled again
+    assert len(lizi.status_rechecks) == 4, "re-checks dropped before the rows existed"
+    for index, message in enumerate(messages):
+        # The dashboard keeps one row per review_id, reset to 'waiting' by every message
+        review = lizi.review_from_mqtt(message)
+        row = rows.setdefault(review['review_id'], {"id": index + 1})
+        if len(row) == 1:
+            fake.tables.setdefault('reviews', []).append(row)
+        row.update(review, status='waiting')
+    lizi.recheck_statuses()
+    statuses = {row['status'] for row in fake.tables['reviews']}
+    assert statuses == {'yes'}, f"review statuses {statuses}"
+    counts = {alert['update_count'] for alert in fake.tables['ai_alerts']}
+    assert counts == {3}, f"update counts {counts}"
+
+
+def check_media_cache(lizi):
+    """
+    A prefetched snapshot is served by lizi_api's /media route, and still in
+    full when the cache evicts it between the lookup and the response.
+    Frigate is an httpx.MockTransport; the cache lives in a temporary directory.
+    """
+    import shutil
+    import tempfile
+    import httpx
+    from fastapi.testclient import TestClient
+    from lizi_media import MediaCache, MediaPrefetcher
+    level = logging.getLogger().level
+    import lizi_api
+    logging.getLogger().setLevel(level)  # lizi_api configures logging on import
+
+    snapshot = os.urandom(4096)
+    fetched = []
+
+    def frigate(request):
+        fetched.append(request.url.path)
+        if request.url.path == '/api/events/a1/snapshot.jpg':
+            return httpx.Response(200, content=snapshot, headers={'content-type': 'image/jpeg'})
+        return httpx.Response(404)
+
+    root = tempfile.mkdtemp(prefix='lizi-media-')
+    cache = MediaCache(root, max_bytes=1024 * 1024)
+    prefetcher = MediaPrefetcher(cache, 'http://frigate.test/api', workers=1, transport=httpx.MockTransport(frigate))
+    lizi.media_prefetcher, lizi_api.media_cache = prefetcher, cache
+    try:
+        lizi.prefetch_media('a1', {"snapshot_url": '/media/frigate/events/a1/snapshot.jpg'})
+        prefetcher.join()
+        assert fetched == ['/api/events/a1/snapshot.jpg'], f"fetched {fetched}"
+
+        client = TestClient(lizi_api.app)
+        response = client.get('/media/a1/snapshot')
+        assert response.status_code == 200, f"/media/a1/snapshot returned {response.status_code}"
+        assert response.content == snapshot, "served snapshot differs from Frigate's"
+        assert response.headers['content-type'] == 'image/jpeg', response.headers['content-type']
+        for path in ('/media/a2/snapshot', '/media/a1/poster'):
+            assert client.get(path).status_code == 404, f"{path} did not return 404"
+
+        read = cache.read
+
+        def read_then_evict(*args):
+            cached = read(*args)
+            cache.max_bytes = 0
+            cache.evict()
+            return cached
+
+        cache.read = read_then_evict
+        response = client.get('/media/a1/snapshot')
+        assert response.status_code == 200 and response.content == snapshot, "snapshot cut short by eviction"
+        assert client.get('/media/a1/snapshot').status_code == 404, "evicted snapshot still served"
+    finally:
+        lizi.media_prefetcher, lizi_api.media_cache = None, None
+        prefetcher.shutdown()
+        cache.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# Scenario checks run by --checks; each raises AssertionError on failure
+CHECKS = (check_status_rechecks, check_media_cache)
+
+
+def run_checks(lizi, checks=CHECKS):
+    """
+    Run the scenario checks.
+
+    Returns:
+        list: (check name, error message or None)
+    """
+    results = []
+    for check in checks:
+        try:
+            check(lizi)
+            results.append((check.__name__, None))
+        except AssertionError as e:
+            results.append((check.__name__, str(e) or 'assertion failed'))
+    return results
+
+
+def format_report(result, label=''):
+    """Render a benchmark result as a short text report."""
+    lines = [
+        f"Lizi benchmark{f' ({label})' if label else ''}",
+        f"  reviews:             {result['reviews']}",
+        f"  elapsed:             {result['seconds']:.2f}s",
+        f"  reviews/sec:         {result['reviews_per_sec']:.1f}",
+        f"  latency p50 / p99:   {result['p50_ms']:.1f} ms / {result['p99_ms']:.1f} ms",
+        f"  requests per review: {result['requests_per_review']:.2f}",
+        f"  outcomes:            {result['outcomes']}",
+        "  requests by operation:"
+    ]
+    lines.extend(f"    {operation:<40} {count}" for operation, count in result['requests'].items())
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay review lifecycles through Lizi against a fake Supabase")
+    parser.add_argument('--replay', help="NDJSON file of recorded Frigate review messages (default: synthetic)")
+    parser.add_argument('--reviews', type=int, default=200, help="Synthetic review lifecycles")
+    parser.add_argument('--cameras', type=int, default=4, help="Cameras the synthetic reviews are spread across")
+    parser.add_argument('--updates', type=int, default=3, help="'update' messages per synthetic lifecycle")
+    parser.add_argument('--payload-bytes', type=int, default=2048, help="Approximate detection data size per message")
+    parser.add_argument('--latency', type=float, default=0.002, help="Seconds of simulated latency per Supabase request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra seconds per request")
+    parser.add_argument('--mode', choices=['single', 'batch'], default='single', help="Per-review (MQTT) or paged (poll) processing")
+    parser.add_argument('--workers', type=int, default=1, help="Worker lanes")
+    parser.add_argument('--batch-size', type=int, default=100, help="Page size in batch mode")
+    parser.add_argument('--coalesce-window', type=float, default=0.0, help="Seconds to coalesce 'update' reviews (LIZI_COALESCE_WINDOW)")
+    parser.add_argument('--no-rpc', action='store_true', help="Simulate a database without the Lizi RPC functions")
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--startup', action='store_true', help="Measure module import (container start) time instead")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per module with --startup")
+    parser.add_argument('--checks', action='store_true', help="Run the scenario checks instead (exit status 1 on failure)")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        results = startup_benchmark(runs=args.runs)
+        print(json.dumps(results, indent=2) if args.json else format_startup_report(results, args.runs))
+        return
+
+    lizi = import_lizi()
+    # Keep per-review log lines out of the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.checks:
+        results = run_checks(lizi)
+        for name, error in results:
+            print(f"{'ok  ' if error is None else 'FAIL'} {name}{f': {error}' if error else ''}")
+        sys.exit(1 if any(error for _, error in results) else 0)
+
+    if args.replay:
+        messages = load_recorded(args.replay)
+    else:
+        messages = synthetic_lifecycles(args.reviews, args.cameras, args.updates, args.payload_bytes, args.seed)
+    fake = FakeSupabase(args.latency, args.jitter, rpc_enabled=not args.no_rpc)
+    random.seed(args.seed)
+    result = run_benchmark(lizi, messages, fake, args.mode, args.workers, args.batch_size, args.coalesce_window)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_report(result, f"{args.mode}, {args.workers} worker(s), {args.latency * 1000:.1f} ms/request"))
+
+
+if __name__ == "__main__":
+    main()
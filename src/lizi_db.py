@@ -0,0 +1,201 @@
+"""
+Lizi Data Access
+----------------
+Shared Supabase clients for everything that talks to the database.
+
+Clients are built once per (url, key) on top of a keep-alive httpx
+connection pool (HTTP/2 when the h2 package is installed), so callers stop
+paying DNS/TCP/TLS setup on every request. An async client with the same
+pooling is available for code that wants to overlap requests.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import importlib.util
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import httpx
+from supabase import create_client, acreate_client, Client, AsyncClient, ClientOptions, AsyncClientOptions
+
+logger = logging.getLogger('lizi')
+
+DEFAULT_SUPABASE_URL = 'http://10.0.1.217:8000'
+
+# Connection pool tuning
+POOL_SIZE = int(os.getenv('LIZI_DB_POOL_SIZE', '20'))
+KEEPALIVE_EXPIRY = float(os.getenv('LIZI_DB_KEEPALIVE', '60'))
+TIMEOUT = float(os.getenv('LIZI_DB_TIMEOUT', '10'))
+HTTP2 = os.getenv('LIZI_DB_HTTP2', 'true').lower() == 'true' and importlib.util.find_spec('h2') is not None
+
+# The dashboard stamps reviews and tracked_objects rows in this zone's wall time (toCentralTime in route.ts)
+DASHBOARD_TIMEZONE = ZoneInfo(os.getenv('LIZI_DASHBOARD_TIMEZONE', 'America/Chicago'))
+
+_lock = threading.Lock()
+_clients = {}
+_async_clients = {}
+_http_clients = []
+_async_http_clients = []
+
+
+def _credentials(url, key):
+    return url or os.getenv('SUPABASE_URL', DEFAULT_SUPABASE_URL), key or os.getenv('SERVICE_ROLE_KEY')
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=POOL_SIZE,
+        max_keepalive_connections=POOL_SIZE,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+
+
+def get_client(url=None, key=None) -> Client:
+    """
+    Return the shared synchronous Supabase client.
+
+    Args:
+        url (str): Supabase URL, defaults to SUPABASE_URL
+        key (str): API key, defaults to SERVICE_ROLE_KEY
+
+    Returns:
+        Client: A client reusing one pooled httpx.Client; safe to share between threads
+    """
+    url, key = _credentials(url, key)
+    with _lock:
+        client = _clients.get((url, key))
+        if client is None:
+            http_client = httpx.Client(http2=HTTP2, limits=_limits(), timeout=TIMEOUT)
+            client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
+            _clients[(url, key)] = client
+            _http_clients.append(http_client)
+            logger.info(f"Created pooled Supabase client for {url} (http2={HTTP2}, pool={POOL_SIZE})")
+    return client
+
+
+def dashboard_time(moment=None):
+    """
+    A timestamp in the dashboard's convention: DASHBOARD_TIMEZONE wall time
+    without an offset, which Postgres stores as if it were UTC.
+
+    Rows Lizi writes next to dashboard rows (tracked_objects.received_at),
+    and cutoffs compared against them, must use it so they order together.
+
+    Args:
+        moment (datetime): Aware time to convert, defaults to now
+
+    Returns:
+        str: ISO timestamp without offset
+    """
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(DASHBOARD_TIMEZONE).replace(tzinfo=None).isoformat()
+
+
+class LazyClient:
+    """
+    Stand-in for a Supabase client that is only built on first use.
+
+    Lets modules keep a module-level client without connecting (or needing
+    credentials) when they are merely imported.
+
+    Args:
+        factory (callable): Returns the real client, e.g. get_client
+    """
+
+    def __init__(self, factory=get_client):
+        self._factory = factory
+        self._client = None
+
+    def resolve(self):
+        """Build the client if needed and return it."""
+        client = self._client
+        if client is None:
+            client = self._client = self._factory()
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+
+async def get_async_client(url=None, key=None) -> AsyncClient:
+    """
+    Return the shared async Supabase client for the running event loop.
+
+    Async httpx clients are tied to the loop that created them, so one client
+    is kept per (loop, url, key).
+
+    Returns:
+        AsyncClient: A client reusing one pooled httpx.AsyncClient
+    """
+    url, key = _credentials(url, key)
+    cache_key = (id(asyncio.get_running_loop()), url, key)
+    client = _async_clients.get(cache_key)
+    if client is None:
+        http_client = httpx.AsyncClient(http2=HTTP2, limits=_limits(), timeout=TIMEOUT)
+        client = await acreate_client(url, key, options=AsyncClientOptions(httpx_client=http_client))
+        _async_clients[cache_key] = client
+        _async_http_clients.append(http_client)
+    return client
+
+
+# PostgREST/Postgres error codes that mean "try again later": database
+# unreachable or busy, timeouts, serialization failures, overload
+TRANSIENT_ERROR_CODES = {
+    '408', '429', '500', '502', '503', '504',
+    'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003',
+    '57014', '40001', '40P01', '53300', '57P01', '57P03'
+}
+
+
+def is_transient_error(error):
+    """
+    True if a failed request is worth retrying later.
+
+    Network errors and timeouts always are; API errors are when their code
+    says the database was unreachable, busy or restarting rather than that
+    the request itself was bad.
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    return str(getattr(error, 'code', '') or '') in TRANSIENT_ERROR_CODES
+
+
+def is_missing_function_error(error):
+    """True if PostgREST reports that an RPC function is not deployed."""
+    code = getattr(error, 'code', None)
+    return code in ('PGRST202', '42883') or 'Could not find the function' in str(error)
+
+
+async def execute_all(*queries):
+    """
+    Run several async query builders concurrently over the shared pool.
+
+    Example:
+        db = await get_async_client()
+        alerts, reviews = await execute_all(
+            db.table('ai_alerts').select('id').limit(10),
+            db.table('reviews').select('id').limit(10)
+        )
+
+    Returns:
+        list: The APIResponse of each query, in order
+    """
+    return await asyncio.gather(*(query.execute() for query in queries))
+
+
+def close():
+    """Close the pooled connections of the synchronous clients (call at process exit)."""
+    with _lock:
+        for http_client in _http_clients:
+            http_client.close()
+        _http_clients.clear()
+        _clients.clear()
+
+
+async def aclose():
+    """Close the pooled connections of the async clients."""
+    for http_client in _async_http_clients:
+        await http_client.aclose()
+    _async_http_clients.clear()
+    _async_clients.clear()
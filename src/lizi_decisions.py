@@ -0,0 +1,254 @@
+"""
+Lizi Decisions
+--------------
+The pure part of Lizi: whether a review gets an alert, the ai_alerts row it
+becomes, and how review updates are merged and diffed. Nothing here talks to
+Supabase, MQTT or the file system, so it can be imported (and benchmarked)
+without any configuration; lizi.py re-exports every name.
+"""
+
+import os
+import json
+import uuid
+import hashlib
+from datetime import datetime, timezone
+
+# Store full_review_payload once at creation and only a delta on later updates
+COMPACT_PAYLOADS = os.getenv('LIZI_COMPACT_PAYLOADS', 'true').lower() == 'true'
+# Review fields never worth storing in full_review_payload in compact mode
+PAYLOAD_SKIP_FIELDS = ('before_data', 'reasoning', 'status')
+
+
+def review_key(review):
+    """
+    Stable fingerprint of one Frigate review message.
+
+    Built from the review type and Frigate's own `after` state (start/end
+    time, detections, objects, zones, ...), which the MQTT message and the
+    reviews row the dashboard stores for it share, so the same message is
+    recognised whichever way it reaches Lizi and however often it is
+    delivered. Rows without after_data fall back to their created_at.
+
+    Returns:
+        str: Hex digest, or None if the review cannot be identified
+    """
+    after = review.get('after_data')
+    if after:
+        basis = json.dumps(after, sort_keys=True, separators=(',', ':'), default=str)
+    elif review.get('created_at'):
+        basis = str(review['created_at'])
+    else:
+        return None
+    return hashlib.sha1(f"{review.get('review_type')}|{basis}".encode('utf-8')).hexdigest()
+
+
+def should_create_alert(review):
+    """
+    Determine if an alert should be created based on Frigate's categorization.
+    
+    Args:
+        review (dict): Review event data from Frigate MQTT
+        
+    Returns:
+        tuple: (bool, dict) - (should_create_alert, reasoning)
+        
+    Frigate Categorization:
+    - If Frigate marks it as an alert (is_alert: true), store it
+    - If Frigate marks it as a detection (is_alert: false), store it as detection
+    - We store both types for potential future evaluation
+    """
+    reasoning = {
+        "decision": None,
+        "frigate_categorization": None,
+        "criteria_checked": [],
+        "details": {}
+    }
+    
+    # Check Frigate's categorization
+    is_frigate_alert = review.get('is_alert', False)
+    reasoning["frigate_categorization"] = "alert" if is_frigate_alert else "detection"
+    reasoning["criteria_checked"].append("frigate_categorization")
+    
+    # Check if review has zones (optional - for information only)
+    zones = review.get('zones', [])
+    reasoning["criteria_checked"].append("zones")
+    reasoning["details"]["zones"] = f"Found {len(zones)} zones: {zones}" if zones else "No zones detected"
+    
+    # Check if review has either snapshot or clip (required for storage)
+    snapshot_url = review.get('snapshot_url')
+    clip_url = review.get('clip_url')
+    
+    if not snapshot_url and not clip_url:
+        reasoning["decision"] = False
+        reasoning["criteria_checked"].append("media")
+        reasoning["details"]["media"] = "No snapshot or clip URL found"
+        return False, reasoning
+    
+    reasoning["criteria_checked"].append("media")
+    reasoning["details"]["media"] = {
+        "snapshot_url": snapshot_url,
+        "clip_url": clip_url
+    }
+    
+    # Store both alerts and detections for evaluation
+    reasoning["decision"] = True
+    reasoning["details"]["summary"] = f"Storing {reasoning['frigate_categorization']} for evaluation"
+    
+    return True, reasoning
+
+
+def storage_payload(review):
+    """Return the review as stored in full_review_payload (trimmed in compact mode)."""
+    if not COMPACT_PAYLOADS:
+        return review
+    return {key: value for key, value in review.items() if key not in PAYLOAD_SKIP_FIELDS}
+
+
+def review_state(review):
+    """The parts of a review that change over its lifecycle, used to build update deltas."""
+    after = review.get('after_data') or {}
+    return {
+        "objects": review.get('objects') or [],
+        "zones": review.get('zones') or [],
+        "severity": (review.get('metadata') or {}).get('severity'),
+        "end_time": after.get('end_time')
+    }
+
+
+def review_delta(review, previous_state=None):
+    """
+    Describe what changed in a review since the last state written for its alert.
+    
+    Args:
+        review (dict): The update/end review
+        previous_state (dict): Last review_state() for the alert, None if unknown
+        
+    Returns:
+        dict: Review type/timestamp plus every field that differs from previous_state
+            (all of them when previous_state is unknown)
+    """
+    delta = {
+        "review_type": review.get('review_type'),
+        "created_at": review.get('created_at')
+    }
+    for key, value in review_state(review).items():
+        if previous_state is None or previous_state.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+def merge_reviews(older, newer):
+    """Combine two reviews of the same event: the newer one wins, objects and zones are unioned."""
+    merged = dict(newer)
+    for key in ('objects', 'zones'):
+        values = list(older.get(key) or [])
+        values.extend(value for value in newer.get(key) or [] if value not in values)
+        merged[key] = values
+    return merged
+
+
+def build_alert_data(review):
+    """
+    Build the ai_alerts row for a review.
+    
+    Args:
+        review (dict): Review event data from Frigate MQTT
+        
+    Returns:
+        dict: Alert data ready to insert
+        
+    Alert Data Structure:
+    - event_id: Reference to the original review
+    - camera: Camera identifier
+    - label: Primary detected object
+    - zones: Affected security zones
+    - reason: Alert description
+    - confidence: Detection confidence score
+    - created_at: Timestamp
+    - triggered: Alert trigger status (false - waiting for evaluation)
+    - frigate_categorization: 'alert' or 'detection' from Frigate
+    - full_review_payload: Complete review data for analysis
+    - update_count: Number of updates (starts at 0)
+    - latest_review_type/latest_review_timestamp/latest_review_key: The
+      review that created it, so lizi_update_alert() ignores that review if
+      it is delivered again
+    - id: Generated here rather than by the database, so a journaled alert
+      can be updated before it has been written
+    """
+    # Get the first object as the primary label
+    objects = review.get('objects', [])
+    primary_object = objects[0] if objects else None
+    
+    # Get the first detection score if available
+    detections = review.get('metadata', {}).get('detections', [])
+    confidence = detections[0].get('score', 0.0) if detections else 0.0
+    
+    # Determine Frigate categorization
+    is_frigate_alert = review.get('is_alert', False)
+    frigate_categorization = "alert" if is_frigate_alert else "detection"
+    
+    # Prepare alert data with all necessary fields
+    return {
+        "id": str(uuid.uuid4()),
+        "event_id": review['review_id'],
+        "camera": review['camera'],
+        "label": primary_object,
+        "zones": review.get('zones', []),
+        "reason": review.get('reason', f'{frigate_categorization.title()} detected'),
+        "confidence": confidence,
+        "created_at": datetime.utcnow().isoformat(),
+        "triggered": False,  # Set by the evaluation worker (lizi_evaluator.py)
+        "frigate_categorization": frigate_categorization,
+        "full_review_payload": storage_payload(review),  # Store complete review data
+        "update_count": 0,  # Initialize update counter
+        "latest_review_type": review.get('review_type'),
+        "latest_review_timestamp": review.get('created_at'),
+        "latest_review_key": review_key(review)
+    }
+
+
+def review_from_mqtt(payload):
+    """
+    Convert a Frigate review MQTT message into the row shape process_review expects.
+
+    Mirrors the field extraction the dashboard uses when it stores the same
+    message in the reviews table.
+
+    Args:
+        payload (dict): Decoded message from the Frigate reviews topic
+
+    Returns:
+        dict: Review data, or None if the message has no review_id/camera
+    """
+    before = payload.get('before') or {}
+    after = payload.get('after') or {}
+    before_data = before.get('data') or {}
+    after_data = after.get('data') or {}
+
+    review_id = after.get('id') or before.get('id')
+    camera = after.get('camera') or before.get('camera')
+    if not review_id or not camera:
+        return None
+
+    severity = after.get('severity') or before.get('severity') or 'unknown'
+    return {
+        "review_type": payload.get('type'),
+        "review_id": review_id,
+        "camera": camera,
+        "zones": after_data.get('zones') or before_data.get('zones') or [],
+        "objects": after_data.get('objects') or before_data.get('objects') or [],
+        "clip_url": after.get('clip_path') or before.get('clip_path') or after.get('clip_url') or before.get('clip_url'),
+        "snapshot_url": after.get('thumb_path') or before.get('thumb_path') or after.get('snapshot_url') or before.get('snapshot_url'),
+        "metadata": {
+            "severity": severity,
+            "detections": after_data.get('detections') or before_data.get('detections') or [],
+            "sub_labels": after_data.get('sub_labels') or before_data.get('sub_labels') or [],
+            "audio": after_data.get('audio') or before_data.get('audio') or []
+        },
+        "reason": severity,
+        "is_alert": severity == 'alert',
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": "frigate",
+        "before_data": payload.get('before'),
+        "after_data": payload.get('after')
+    }
@@ -0,0 +1,394 @@
+"""
+Lizi Evaluator
+--------------
+Scores the alerts Lizi creates (ai_alerts rows with triggered = false and no
+evaluated_at yet) and writes the decision back as triggered/reason/confidence.
+
+New alerts are handed over in-process as Lizi creates them, and the table is
+swept for pending alerts as a fallback (restarts, journaled inserts, failed
+write-backs). Alerts are collected into micro-batches that are scored once
+LIZI_EVAL_BATCH_SIZE alerts are waiting or the oldest has waited
+LIZI_EVAL_MAX_WAIT seconds, then written back with one
+lizi_apply_evaluations() call (add_ai_alerts_evaluation.sql). Results are
+cached by event_id, so an alert is scored once however often it is seen.
+
+Scoring goes through a pluggable backend chosen with LIZI_EVAL_BACKEND:
+'rules' (the lizi_rules table), 'stub' (a constant answer, for tests and
+dry runs) or 'package.module:factory' for a custom model. Backends run on
+the CPU in the evaluator thread.
+"""
+
+import os
+import time
+import queue
+import logging
+import importlib
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from lizi_db import get_client, is_missing_function_error
+from lizi_metrics import Counter, Histogram
+from lizi_rules import default_engine
+
+logger = logging.getLogger('lizi')
+
+BACKEND = os.getenv('LIZI_EVAL_BACKEND', 'rules')
+BATCH_SIZE = int(os.getenv('LIZI_EVAL_BATCH_SIZE', '32'))
+MAX_WAIT = float(os.getenv('LIZI_EVAL_MAX_WAIT', '1'))
+SWEEP_INTERVAL = float(os.getenv('LIZI_EVAL_SWEEP_INTERVAL', '30'))
+CACHE_SIZE = int(os.getenv('LIZI_EVAL_CACHE_SIZE', '10000'))
+
+ALERT_COLUMNS = 'id, event_id, camera, label, zones, confidence, frigate_categorization, full_review_payload, created_at'
+
+EVALUATIONS_TOTAL = Counter('lizi_evaluations_total', 'Alerts evaluated, by result', ['result'])
+EVALUATION_BATCH_SECONDS = Histogram('lizi_evaluation_batch_seconds', 'Time spent scoring one micro-batch')
+EVALUATION_BATCH_SIZE = Histogram('lizi_evaluation_batch_size', 'Alerts scored per micro-batch', buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+Evaluation = namedtuple('Evaluation', ['triggered', 'reason', 'confidence'])
+
+
+class StubBackend:
+    """
+    Backend that gives every alert the same answer.
+
+    Args:
+        triggered (bool): Decision returned for every alert
+        reason (str): Reason returned for every alert
+        confidence (float): Confidence returned for every alert
+    """
+
+    name = 'stub'
+
+    def __init__(self, triggered=False, reason=None, confidence=0.0):
+        self.result = Evaluation(triggered, reason, confidence)
+
+    def evaluate(self, alerts):
+        return [self.result for _ in alerts]
+
+
+class RuleBackend:
+    """
+    Backend that runs alerts through the lizi_rules table.
+
+    Every object in the review is tried as the label, in order, and the first
+    one a rule matches decides. Reviews do not say whether an object was
+    stationary, so alerts are evaluated as moving.
+
+    Args:
+        engine (RuleEngine): Compiled rules, defaults to lizi_rules.default_engine()
+    """
+
+    name = 'rules'
+
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine()
+
+    @staticmethod
+    def _events(alert):
+        payload = alert.get('full_review_payload') or {}
+        labels = [alert.get('label')] + [label for label in payload.get('objects') or [] if label != alert.get('label')]
+        return [{
+            "after": {
+                "label": label,
+                "current_zones": alert.get('zones') or [],
+                "stationary": False,
+                "score": alert.get('confidence') or 0.0
+            }
+        } for label in labels if label]
+
+    def evaluate(self, alerts):
+        events = []
+        owners = []
+        for index, alert in enumerate(alerts):
+            for event in self._events(alert):
+                events.append(event)
+                owners.append(index)
+        reasons, confidences = self.engine.evaluate(events)
+        results = [Evaluation(False, None, alert.get('confidence')) for alert in alerts]
+        for index, reason, confidence in zip(owners, reasons, confidences):
+            if reason and not results[index].triggered:
+                results[index] = Evaluation(True, reason, confidence)
+        return results
+
+
+BACKENDS = {
+    'rules': RuleBackend,
+    'stub': StubBackend,
+}
+
+
+def load_backend(spec=BACKEND):
+    """
+    Build the backend named by `spec`.
+
+    Args:
+        spec (str): 'rules', 'stub', or 'package.module:factory' where factory()
+            returns an object with an evaluate(alerts) -> [Evaluation] method
+
+    Returns:
+        object: The backend
+    """
+    if spec in BACKENDS:
+        return BACKENDS[spec]()
+    module_name, _, attribute = spec.partition(':')
+    if not attribute:
+        raise ValueError(f"Unknown evaluation backend {spec!r} (expected one of {sorted(BACKENDS)} or module:factory)")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+class Evaluator:
+    """
+    Micro-batching evaluation worker.
+
+    Args:
+        client (Client): Supabase client, defaults to the shared pooled client
+        backend (object): Scoring backend, defaults to load_backend()
+        batch_size (int): Alerts scored together
+        max_wait (float): Seconds the oldest queued alert waits for a full batch
+        sweep_interval (float): Seconds between scans of ai_alerts for pending
+            alerts (0 disables the scan)
+        cache_size (int): event_ids whose result is remembered
+        owns (callable): owns(alert) -> False for alerts another instance
+            evaluates (sharding); every alert is evaluated when None
+    """
+
+    def __init__(self, client=None, backend=None, batch_size=BATCH_SIZE, max_wait=MAX_WAIT,
+                 sweep_interval=SWEEP_INTERVAL, cache_size=CACHE_SIZE, owns=None):
+        self.client = client or get_client()
+        self.backend = backend or load_backend()
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.sweep_interval = sweep_interval
+        self.cache_size = cache_size
+        self.owns = owns
+        self.rpc_enabled = True
+        self._cache = OrderedDict()
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def submit(self, alert):
+        """Queue a newly created alert (an ai_alerts row dict) for evaluation."""
+        if alert and alert.get('id'):
+            self._queue.put((alert, time.monotonic()))
+
+    def _cached(self, event_id):
+        result = self._cache.get(event_id)
+        if result is not None:
+            self._cache.move_to_end(event_id)
+        return result
+
+    def _remember(self, event_id, result):
+        if self.cache_size <= 0:
+            return
+        self._cache[event_id] = result
+        self._cache.move_to_end(event_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def evaluate(self, alerts):
+        """
+        Score alerts, reusing cached results for event_ids already scored.
+
+        Returns:
+            list: (alert_id, Evaluation) pairs in input order
+        """
+        results = {}
+        to_score = []
+        for alert in alerts:
+            cached = self._cached(alert.get('event_id'))
+            if cached is not None:
+                results[alert['id']] = cached
+                EVALUATIONS_TOTAL.inc(result='cached')
+            elif alert['id'] not in results:
+                results[alert['id']] = None
+                to_score.append(alert)
+        for start in range(0, len(to_score), self.batch_size):
+            batch = to_score[start:start + self.batch_size]
+            started = time.monotonic()
+            scored = self.backend.evaluate(batch)
+            EVALUATION_BATCH_SECONDS.observe(time.monotonic() - started)
+            EVALUATION_BATCH_SIZE.observe(len(batch))
+            for alert, result in zip(batch, scored):
+                results[alert['id']] = result
+                self._remember(alert.get('event_id'), result)
+                EVALUATIONS_TOTAL.inc(result='triggered' if result.triggered else 'ignored')
+        return [(alert_id, result) for alert_id, result in results.items() if result is not None]
+
+    def write_back(self, results):
+        """
+        Store evaluation results in ai_alerts in one request.
+
+        Falls back to one update per alert if lizi_apply_evaluations() has not
+        been deployed.
+
+        Returns:
+            int: Alerts updated (alerts whose insert is still journaled are not)
+        """
+        if not results:
+            return 0
+        rows = [{
+            "id": alert_id,
+            "triggered": result.triggered,
+            "reason": result.reason,
+            "confidence": result.confidence
+        } for alert_id, result in results]
+        if self.rpc_enabled:
+            try:
+                data = self.client.rpc('lizi_apply_evaluations', {"p_results": rows}).execute().data
+                if isinstance(data, list):
+                    data = data[0] if data else 0
+                if isinstance(data, dict):
+                    data = next(iter(data.values()), 0)
+                return data or 0
+            except Exception as e:
+                if not is_missing_function_error(e):
+                    raise
+                logger.warning("lizi_apply_evaluations() is not deployed, writing evaluations one alert at a time")
+                self.rpc_enabled = False
+        evaluated_at = datetime.now(timezone.utc).isoformat()
+        updated = 0
+        for row in rows:
+            values = {"triggered": row["triggered"], "evaluated_at": evaluated_at}
+            if row["reason"] is not None:
+                values["reason"] = row["reason"]
+            if row["confidence"] is not None:
+                values["confidence"] = row["confidence"]
+            updated += len(self.client.table('ai_alerts').update(values).eq('id', row["id"]).execute().data or [])
+        return updated
+
+    def fetch_pending(self, after=None, limit=None):
+        """
+        One page of alerts still waiting for an evaluation, oldest first.
+
+        Pages on (created_at, id), so alerts sharing a created_at across a
+        page boundary are not skipped.
+
+        Args:
+            after (dict): {'created_at', 'id'} of the last alert of the previous page
+            limit (int): Page size
+
+        Returns:
+            list: The page, before filtering out alerts this instance does not own
+        """
+        query = self.client.table('ai_alerts') \
+            .select(ALERT_COLUMNS) \
+            .eq('triggered', False) \
+            .is_('evaluated_at', 'null')
+        if after:
+            created_at = after['created_at']
+            query = query.or_(
+                f'created_at.gt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.gt."{after["id"]}")'
+            )
+        return query.order('created_at').order('id').limit(limit or self.batch_size * 8).execute().data or []
+
+    def process(self, alerts):
+        """
+        Score a batch of alerts and write the results back.
+
+        Returns:
+            int: Alerts updated
+        """
+        results = self.evaluate(alerts)
+        updated = self.write_back(results)
+        triggered = sum(1 for _, result in results if result.triggered)
+        if triggered:
+            logger.info(f"🚨 Evaluated {len(results)} alerts, {triggered} triggered")
+        return updated
+
+    def sweep(self):
+        """
+        Evaluate every pending alert in ai_alerts, page by page.
+
+        Returns:
+            int: Alerts updated
+        """
+        updated = 0
+        after = None
+        limit = self.batch_size * 8
+        while not self._stopping.is_set():
+            page = self.fetch_pending(after, limit)
+            alerts = [alert for alert in page if self.owns is None or self.owns(alert)]
+            if alerts:
+                updated += self.process(alerts)
+            if len(page) < limit:
+                break
+            after = {"created_at": page[-1].get('created_at'), "id": page[-1].get('id')}
+        return updated
+
+    def _collect(self):
+        """Wait for a micro-batch: batch_size alerts, or whatever arrived within max_wait of the first."""
+        try:
+            alert, queued_at = self._queue.get(timeout=self.sweep_interval or None)
+        except queue.Empty:
+            return []
+        if alert is None:
+            return []
+        batch = [alert]
+        deadline = queued_at + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                alert, _ = self._queue.get(timeout=max(0.0, remaining)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if alert is None:
+                break
+            batch.append(alert)
+        return batch
+
+    def start(self):
+        """Start the evaluator thread (sweeps once, then evaluates submitted alerts as they arrive)."""
+        self._thread = threading.Thread(target=self._run, name='lizi-evaluator', daemon=True)
+        self._thread.start()
+        logger.info(f"🧠 Evaluating alerts with the {getattr(self.backend, 'name', type(self.backend).__name__)} backend (batches of {self.batch_size}, max wait {self.max_wait}s)")
+
+    def _run(self):
+        next_sweep = 0.0
+        while not self._stopping.is_set():
+            try:
+                if self.sweep_interval and time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.sweep_interval
+                    self.sweep()
+                batch = self._collect()
+                if batch:
+                    self.process(batch)
+            except Exception as e:
+                logger.error(f"❌ Error evaluating alerts: {e}")
+                time.sleep(min(self.max_wait, 1.0) or 1.0)
+
+    def stop(self, timeout=10.0):
+        """Stop the thread after evaluating the alerts already submitted."""
+        self._stopping.set()
+        self._queue.put((None, time.monotonic()))
+        if self._thread is not None:
+            self._thread.join(timeout)
+        batch = []
+        while True:
+            try:
+                alert, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if alert is not None:
+                batch.append(alert)
+        if batch:
+            try:
+                self.process(batch)
+            except Exception as e:
+                logger.warning(f"{len(batch)} alerts left unevaluated at shutdown (the next sweep picks them up): {e}")
+
+
+if __name__ == "__main__":
+    from lizi_logging import configure_logging
+    configure_logging()
+    evaluator = Evaluator()
+    logger.info("Starting Lizi evaluator...")
+    evaluator.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        evaluator.stop()
@@ -0,0 +1,280 @@
+"""
+Lizi Log Index
+--------------
+Rolling SQLite index of the Lizi log files, so lizi_api can answer
+time/level/category queries over hours of logs without rescanning text.
+
+The index tails lizi.log (and the lizi.<worker>.log files of sharded
+instances) by byte offset (kept in the database, so restarts resume where
+they stopped), stores one row per entry and drops the oldest rows once it
+holds more than `max_rows`. Structured fields of JSON log lines (review_id,
+camera, latency_ms, ...) are kept in a JSON column and can be filtered on.
+Entries are ordered and paged by (ts, id), so entries of several instances'
+files come back in time order whatever order they were indexed in.
+When a file has been rotated, the rest of the rotated file is read before
+the new one.
+"""
+
+import os
+import glob
+import json
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    level TEXT NOT NULL,
+    name TEXT NOT NULL,
+    message TEXT NOT NULL,
+    fields TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(ts);
+CREATE INDEX IF NOT EXISTS idx_logs_level_ts ON logs(level, ts);
+CREATE INDEX IF NOT EXISTS idx_logs_name_ts ON logs(name, ts);
+CREATE INDEX IF NOT EXISTS idx_logs_review_id ON logs(json_extract(fields, '$.review_id'));
+CREATE INDEX IF NOT EXISTS idx_logs_camera ON logs(json_extract(fields, '$.camera'));
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize_timestamp(timestamp):
+    """Turn '2024-01-01 12:00:00,123' into sortable '2024-01-01T12:00:00.123'."""
+    return timestamp.strip().replace(' ', 'T', 1).replace(',', '.')
+
+
+# Entry keys stored in their own columns; any other key goes into `fields`
+COLUMNS = ('id', 'timestamp', 'level', 'name', 'message')
+# Structured fields that query() can filter on (indexed)
+FILTER_FIELDS = ('review_id', 'camera')
+
+
+class LogIndex:
+    """
+    SQLite-backed, size-capped index of parsed log entries.
+
+    Args:
+        db_path (str): SQLite file (on the lizi-logs volume next to the log)
+        log_path (str): Log file to tail, or a glob pattern for several
+        parse_lines (callable): Turns a list of raw lines into entry dicts
+            with timestamp, level, name and message keys
+        max_rows (int): Oldest rows are deleted beyond this many
+        max_read_bytes (int): Upper bound on bytes ingested per call
+    """
+
+    def __init__(self, db_path, log_path, parse_lines, max_rows=500000, max_read_bytes=4 * 1024 * 1024):
+        self.db_path = db_path
+        self.log_path = log_path
+        self.parse_lines = parse_lines
+        self.max_rows = max_rows
+        self.max_read_bytes = max_read_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs'").fetchone():
+            # Indexes created before structured fields were kept
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(logs)")}
+            if 'fields' not in columns:
+                self._conn.execute("ALTER TABLE logs ADD COLUMN fields TEXT")
+        self._conn.executescript(SCHEMA)
+
+    def _get_state(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_state(self, key, value):
+        self._conn.execute(
+            "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+
+    def ingest(self):
+        """
+        Index every complete line appended to the log files since the last call.
+
+        Returns:
+            int: Number of entries added
+        """
+        with self._lock:
+            added = 0
+            for path in sorted(glob.glob(self.log_path)):
+                added += self._ingest_file(path)
+            if added:
+                self._trim()
+            self._conn.commit()
+            return added
+
+    def _ingest_file(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return 0
+
+        # Indexes built before per-file state kept a single offset/inode
+        offset = int(self._get_state(f'offset:{path}', self._get_state('offset', 0)))
+        inode = self._get_state(f'inode:{path}', self._get_state('inode'))
+        added = 0
+        if inode is not None and inode != str(stat.st_ino):
+            # Log was rotated: finish the old file (now path.1, ...) before starting on the new one
+            rotated = self._rotated_file(path, inode)
+            if rotated is not None:
+                added += self._read(rotated, offset, os.stat(rotated).st_size)[0]
+            offset = 0
+        elif offset > stat.st_size:
+            offset = 0  # Truncated; start over
+
+        added_now, offset = self._read(path, offset, stat.st_size)
+        self._set_state(f'offset:{path}', offset)
+        self._set_state(f'inode:{path}', stat.st_ino)
+        return added + added_now
+
+    @staticmethod
+    def _rotated_file(path, inode):
+        """The backup (path.1, path.2, ...) that is the file `inode` identified, or None."""
+        for backup in glob.glob(f"{glob.escape(path)}.*"):
+            try:
+                if str(os.stat(backup).st_ino) == inode:
+                    return backup
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _read(self, path, offset, size):
+        """
+        Index the complete lines of `path` between offset and size.
+
+        Returns:
+            tuple: (entries added, offset after the last complete line)
+        """
+        added = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while offset < size:
+                data = f.read(min(size - offset, self.max_read_bytes))
+                end = data.rfind(b'\n') + 1
+                if end == 0:
+                    break  # Only a partial line so far
+                lines = data[:end].decode('utf-8', errors='replace').splitlines()
+                entries = self.parse_lines(lines)
+                self._conn.executemany(
+                    "INSERT INTO logs (ts, level, name, message, fields) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (normalize_timestamp(entry["timestamp"]), entry["level"], entry["name"], entry["message"],
+                         self._fields(entry))
+                        for entry in entries
+                    ]
+                )
+                added += len(entries)
+                offset += end
+                f.seek(offset)
+        return added, offset
+
+    @staticmethod
+    def _fields(entry):
+        """The entry's structured fields as JSON, or None if it has none."""
+        fields = {key: value for key, value in entry.items() if key not in COLUMNS and value is not None}
+        return json.dumps(fields, default=str) if fields else None
+
+    def _trim(self):
+        row = self._conn.execute("SELECT MAX(id) AS max_id FROM logs").fetchone()
+        if row["max_id"] is not None and row["max_id"] > self.max_rows:
+            self._conn.execute("DELETE FROM logs WHERE id <= ?", (row["max_id"] - self.max_rows,))
+
+    def query(self, since=None, until=None, levels=None, names=None, limit=100, cursor=None, fields=None):
+        """
+        Query indexed entries.
+
+        Args:
+            since (str): Only entries at or after this ISO timestamp
+            until (str): Only entries before this ISO timestamp
+            levels (list): Only these levels (e.g. ['error', 'warning'])
+            names (list): Only these categories ('watchers', 'watched', 'info')
+            limit (int): Maximum entries to return
+            fields (dict): Only entries whose structured fields have these
+                values, e.g. {'review_id': '...'} (keys from FILTER_FIELDS)
+            cursor (str): Only entries after this cursor ('<ts>|<id>', from a
+                previous call; a bare id from older clients is still accepted).
+                Without a cursor or `since`, the newest `limit` entries are returned.
+
+        Returns:
+            tuple: (entries in time order, next cursor)
+        """
+        position = self._position(cursor)
+        clauses = []
+        params = []
+        if since:
+            clauses.append("ts >= ?")
+            params.append(normalize_timestamp(since))
+        if until:
+            clauses.append("ts < ?")
+            params.append(normalize_timestamp(until))
+        if levels:
+            clauses.append(f"level IN ({','.join('?' * len(levels))})")
+            params.extend(level.lower() for level in levels)
+        if names:
+            clauses.append(f"name IN ({','.join('?' * len(names))})")
+            params.extend(names)
+        for field, value in (fields or {}).items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Cannot filter logs on {field}")
+            if value is not None:
+                clauses.append(f"json_extract(fields, '$.{field}') = ?")
+                params.append(value)
+        if position is not None:
+            clauses.append("(ts > ? OR (ts = ? AND id > ?))")
+            params.extend([position[0], position[0], position[1]])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        # Tail queries walk the index backwards and are reversed afterwards
+        newest_first = position is None and not since
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT id, ts, level, name, message, fields FROM logs {where} ORDER BY ts {order}, id {order} LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        if newest_first:
+            rows.reverse()
+
+        entries = []
+        for row in rows:
+            entry = json.loads(row["fields"]) if row["fields"] else {}
+            entry.update({"id": row["id"], "timestamp": row["ts"], "level": row["level"], "name": row["name"], "message": row["message"]})
+            entries.append(entry)
+        if entries:
+            next_cursor = f"{entries[-1]['timestamp']}|{entries[-1]['id']}"
+        elif position is not None:
+            next_cursor = f"{position[0]}|{position[1]}"
+        else:
+            next_cursor = self.last_cursor()
+        return entries, next_cursor
+
+    def _position(self, cursor):
+        """(ts, id) of a cursor, or None for no cursor."""
+        if cursor is None or cursor == '':
+            return None
+        cursor = str(cursor)
+        if '|' in cursor:
+            ts, _, entry_id = cursor.rpartition('|')
+            return ts, int(entry_id)
+        # A bare id from before cursors carried the timestamp
+        with self._lock:
+            row = self._conn.execute("SELECT ts FROM logs WHERE id = ?", (int(cursor),)).fetchone()
+        return (row["ts"] if row else '', int(cursor))
+
+    def last_cursor(self):
+        """Cursor after the newest indexed entry ('' when empty)."""
+        with self._lock:
+            row = self._conn.execute("SELECT id, ts FROM logs ORDER BY ts DESC, id DESC LIMIT 1").fetchone()
+        return f"{row['ts']}|{row['id']}" if row else ''
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
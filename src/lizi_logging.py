@@ -0,0 +1,98 @@
+"""
+Lizi Logging
+------------
+Non-blocking logging setup for the Lizi processes.
+
+Records are put on an in-memory queue by the calling thread and written to
+the console and a size-rotated log file by a background QueueListener, so
+disk I/O never runs on the review processing path. With LIZI_LOG_FORMAT=json
+each line is a JSON object carrying structured fields (review_id, camera,
+latency_ms, ...) that consumers can read without string splitting.
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Extra attributes copied into JSON records when present (pass them with extra={...})
+STRUCTURED_FIELDS = ('review_id', 'camera', 'review_type', 'alert_id', 'outcome', 'latency_ms', 'calls')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(log_path=None, log_format=None, level=logging.INFO, suffix=''):
+    """
+    Route all logging through a queue to console and rotating file handlers.
+
+    Args:
+        log_path (str): Log file, defaults to LIZI_LOG_PATH or /app/logs/lizi.log
+        log_format (str): 'text' or 'json', defaults to LIZI_LOG_FORMAT or text
+        level (int): Root log level
+        suffix (str): Inserted before the file extension (lizi.<suffix>.log), so
+            instances sharing the log volume rotate their own files
+
+    Returns:
+        QueueListener: The running listener (stopped automatically at exit)
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    root_path, extension = os.path.splitext(log_path or os.getenv('LIZI_LOG_PATH', '/app/logs/lizi.log'))
+    log_path = f"{root_path}{suffix}{extension}"
+    log_format = (log_format or os.getenv('LIZI_LOG_FORMAT', 'text')).lower()
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+
+    file_handler = RotatingFileHandler(
+        log_path,
+        maxBytes=int(os.getenv('LIZI_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv('LIZI_LOG_BACKUPS', '5'))
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the background listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
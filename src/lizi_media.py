@@ -0,0 +1,332 @@
+"""
+Lizi Media Cache
+----------------
+Prefetches alert snapshots from Frigate into a local, content-addressed
+cache so the dashboard and evaluation read them from lizi_api instead of
+hitting the Frigate box on every view.
+
+Files are stored under LIZI_MEDIA_DIR by SHA-256 (identical images are kept
+once), with a downscaled JPEG thumbnail when Pillow is installed. A SQLite
+index maps alerts to their media and tracks last access, and the least
+recently used files are evicted once the cache exceeds LIZI_MEDIA_MAX_BYTES.
+"""
+
+import os
+import io
+import time
+import queue
+import hashlib
+import sqlite3
+import logging
+import threading
+from urllib.parse import urljoin
+import httpx
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails are optional
+    Image = None
+
+logger = logging.getLogger('lizi')
+
+FRIGATE_API_URL = os.getenv('FRIGATE_API_URL', '')
+MEDIA_DIR = os.getenv('LIZI_MEDIA_DIR', '/app/logs/media')
+MEDIA_MAX_BYTES = int(os.getenv('LIZI_MEDIA_MAX_BYTES', str(1024 * 1024 * 1024)))
+THUMBNAIL_SIZE = int(os.getenv('LIZI_MEDIA_THUMBNAIL_SIZE', '320'))
+
+# Frigate publishes paths inside its container; they are served under the API root
+FRIGATE_MEDIA_PREFIX = '/media/frigate/'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    has_thumbnail INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_media_last_access ON media(last_access);
+CREATE TABLE IF NOT EXISTS alert_media (
+    alert_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    source_url TEXT,
+    PRIMARY KEY (alert_id, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_alert_media_sha256 ON alert_media(sha256);
+"""
+
+
+def media_url(path, base_url=None):
+    """
+    Turn a review's snapshot/clip path into a URL on the Frigate API.
+
+    Args:
+        path (str): Absolute URL, Frigate container path (/media/frigate/...)
+            or path relative to the API root
+        base_url (str): Frigate API root, defaults to FRIGATE_API_URL
+
+    Returns:
+        str: URL to fetch, or None if there is nothing to fetch
+    """
+    if not path:
+        return None
+    if path.startswith(('http://', 'https://')):
+        return path
+    base_url = base_url or FRIGATE_API_URL
+    if not base_url:
+        return None
+    if path.startswith(FRIGATE_MEDIA_PREFIX):
+        path = path[len(FRIGATE_MEDIA_PREFIX):]
+    return urljoin(base_url.rstrip('/') + '/', path.lstrip('/'))
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """Downscale an image to fit in size x size, as JPEG bytes (None without Pillow or for non-images)."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            image.convert('RGB').save(output, format='JPEG', quality=80)
+            return output.getvalue()
+    except Exception as e:
+        logger.debug(f"Could not build thumbnail: {e}")
+        return None
+
+
+class MediaCache:
+    """
+    Content-addressed media store with an LRU disk budget.
+
+    Args:
+        root (str): Directory for the files and the media.db index
+        max_bytes (int): Disk budget (originals plus thumbnails)
+        thumbnail_size (int): Longest thumbnail edge in pixels
+    """
+
+    def __init__(self, root=MEDIA_DIR, max_bytes=MEDIA_MAX_BYTES, thumbnail_size=THUMBNAIL_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'media.db'), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def path(self, sha256, thumbnail=False):
+        """File holding the original (or thumbnail) for a hash."""
+        return os.path.join(self.root, sha256[:2], sha256 + ('.thumb.jpg' if thumbnail else ''))
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def store(self, data, content_type=None):
+        """
+        Add media to the cache (a no-op for content it already holds).
+
+        Returns:
+            str: SHA-256 of the content
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM media WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            self._write(self.path(sha256), data)
+            size = len(data)
+            thumbnail = make_thumbnail(data, self.thumbnail_size)
+            if thumbnail is not None:
+                self._write(self.path(sha256, thumbnail=True), thumbnail)
+                size += len(thumbnail)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO media (sha256, size, content_type, has_thumbnail, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (sha256, size, content_type, 1 if thumbnail is not None else 0, now, now)
+                )
+                self._conn.commit()
+            self.evict()
+        else:
+            self.touch(sha256)
+        return sha256
+
+    def link(self, alert_id, kind, sha256, source_url=None):
+        """Record that an alert's `kind` media ('snapshot', 'clip') is the given content."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO alert_media (alert_id, kind, sha256, source_url) VALUES (?, ?, ?, ?)",
+                (str(alert_id), kind, sha256, source_url)
+            )
+            self._conn.commit()
+
+    def lookup(self, alert_id, kind='snapshot'):
+        """
+        Find an alert's cached media and mark it as recently used.
+
+        Returns:
+            dict: sha256, content_type, has_thumbnail, size; None if not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT m.sha256, m.content_type, m.has_thumbnail, m.size FROM alert_media a "
+                "JOIN media m ON m.sha256 = a.sha256 WHERE a.alert_id = ? AND a.kind = ?",
+                (str(alert_id), kind)
+            ).fetchone()
+        if row is None:
+            return None
+        self.touch(row["sha256"])
+        return dict(row)
+
+    def read(self, alert_id, kind='snapshot', thumbnail=False):
+        """
+        Load an alert's cached media (or its thumbnail) into memory.
+
+        The whole file is read before it is served, so an eviction (also one
+        by the Lizi process sharing the cache) cannot delete it mid-response.
+
+        Returns:
+            tuple: (entry as returned by lookup(), bytes); None if not cached
+        """
+        entry = self.lookup(alert_id, kind)
+        if entry is None or (thumbnail and not entry["has_thumbnail"]):
+            return None
+        try:
+            with open(self.path(entry["sha256"], thumbnail), 'rb') as f:
+                return entry, f.read()
+        except FileNotFoundError:  # Evicted since the lookup
+            return None
+
+    def touch(self, sha256):
+        with self._lock:
+            self._conn.execute("UPDATE media SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+            self._conn.commit()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM media").fetchone()[0]
+
+    def evict(self):
+        """
+        Delete least recently used media until the cache fits in max_bytes.
+
+        Returns:
+            int: Bytes freed
+        """
+        freed = 0
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT sha256, size FROM media ORDER BY last_access LIMIT 100"
+                ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                for thumbnail in (False, True):
+                    try:
+                        os.remove(self.path(row["sha256"], thumbnail))
+                    except FileNotFoundError:
+                        pass
+                with self._lock:
+                    self._conn.execute("DELETE FROM media WHERE sha256 = ?", (row["sha256"],))
+                    self._conn.execute("DELETE FROM alert_media WHERE sha256 = ?", (row["sha256"],))
+                    self._conn.commit()
+                total -= row["size"]
+                freed += row["size"]
+        if freed:
+            logger.info(f"🧹 Evicted {freed / 1024 / 1024:.1f} MB of cached media")
+        return freed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MediaPrefetcher:
+    """
+    Bounded background pool that downloads alert media into a MediaCache.
+
+    submit() never blocks the review pipeline: when the queue is full the
+    request is dropped (the media can still be fetched from Frigate).
+
+    Args:
+        cache (MediaCache): Where fetched media is stored
+        base_url (str): Frigate API root for relative paths
+        workers (int): Concurrent downloads
+        queue_size (int): Pending downloads before new ones are dropped
+        timeout (float): Per-request timeout in seconds
+        transport (httpx.BaseTransport): Transport for the HTTP client
+            (e.g. httpx.MockTransport in checks), defaults to the network
+    """
+
+    def __init__(self, cache, base_url=FRIGATE_API_URL, workers=4, queue_size=200, timeout=10.0, transport=None):
+        self.cache = cache
+        self.base_url = base_url
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._http = httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=workers), transport=transport)
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._run, name=f"lizi-media-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, alert_id, path, kind='snapshot'):
+        """
+        Queue a download of an alert's media.
+
+        Returns:
+            bool: True if queued, False if there was nothing to fetch or the queue was full
+        """
+        url = media_url(path, self.base_url)
+        if not url or not alert_id:
+            return False
+        try:
+            self._queue.put_nowait((alert_id, kind, url))
+            return True
+        except queue.Full:
+            logger.warning(f"Media prefetch queue full, skipping {kind} for alert {alert_id}")
+            return False
+
+    def fetch(self, alert_id, kind, url):
+        """Download one file into the cache and link it to the alert."""
+        response = self._http.get(url)
+        response.raise_for_status()
+        sha256 = self.cache.store(response.content, response.headers.get('content-type'))
+        self.cache.link(alert_id, kind, sha256, url)
+        return sha256
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.fetch(*item)
+            except Exception as e:
+                logger.warning(f"Error prefetching {item[1]} for alert {item[0]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Block until every queued download has finished."""
+        self._queue.join()
+
+    def shutdown(self):
+        """Finish queued downloads, then stop the pool."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._http.close()
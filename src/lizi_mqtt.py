@@ -0,0 +1,73 @@
+"""
+Lizi MQTT helpers
+-----------------
+Small wrapper around paho-mqtt used by the Lizi processes that subscribe
+to Frigate topics directly instead of polling Supabase.
+"""
+
+import os
+import logging
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger('lizi')
+
+
+def mqtt_settings():
+    """Read the MQTT connection settings from the environment."""
+    return {
+        "host": os.getenv('MQTT_HOST'),
+        "port": int(os.getenv('MQTT_PORT') or 1883),
+        "user": os.getenv('MQTT_USER'),
+        "password": os.getenv('MQTT_PASS'),
+    }
+
+
+def create_mqtt_client(client_id, topics, on_message, on_connect=None, on_disconnect=None):
+    """
+    Build and connect an MQTT client subscribed to the given topics.
+
+    Args:
+        client_id (str): MQTT client identifier
+        topics (list): Topics to (re)subscribe to on every connect
+        on_message (callable): Called as on_message(topic, payload_bytes)
+        on_connect (callable): Optional, called after every (re)connect
+        on_disconnect (callable): Optional, called after every disconnect
+
+    Returns:
+        mqtt.Client: Connected client; call loop_start() to run the network thread
+    """
+    settings = mqtt_settings()
+    if not settings["host"]:
+        raise ValueError("Missing MQTT_HOST")
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=True)
+    if settings["user"]:
+        client.username_pw_set(settings["user"], settings["password"])
+    client.reconnect_delay_set(min_delay=1, max_delay=30)
+
+    def _on_connect(client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.error(f"❌ MQTT connection refused: {reason_code}")
+            return
+        logger.info(f"📡 Connected to MQTT broker at {settings['host']}:{settings['port']}")
+        for topic in topics:
+            client.subscribe(topic, qos=1)
+            logger.info(f"Subscribed to {topic}")
+        if on_connect:
+            on_connect()
+
+    def _on_disconnect(client, userdata, flags, reason_code, properties):
+        logger.warning(f"MQTT disconnected: {reason_code}")
+        if on_disconnect:
+            on_disconnect()
+
+    def _on_message(client, userdata, message):
+        on_message(message.topic, message.payload)
+
+    client.on_connect = _on_connect
+    client.on_disconnect = _on_disconnect
+    client.on_message = _on_message
+
+    logger.info(f"🔌 Connecting to MQTT broker at {settings['host']}:{settings['port']}")
+    client.connect_async(settings["host"], settings["port"], keepalive=60)
+    return client
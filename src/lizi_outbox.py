@@ -0,0 +1,188 @@
+"""
+Lizi Outbox
+-----------
+Durable local journal for Supabase writes that could not be made right away.
+
+When Supabase is slow or down, Lizi appends the alert inserts, alert
+updates, review status changes and whole reviews it could not handle to a
+SQLite journal on the lizi-logs volume instead of dropping them. A
+background thread flushes the journal in order, merging consecutive
+operations of the same kind into one batch, and backs off exponentially
+while the database keeps failing. Entries survive restarts.
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger('lizi')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    item TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(failed, id);
+"""
+
+
+class Outbox:
+    """
+    SQLite-backed write-ahead queue of pending Supabase operations.
+
+    Args:
+        path (str): SQLite file for the journal
+        apply (callable): apply(kind, items) writes a batch to Supabase and
+            raises on failure
+        is_transient (callable): is_transient(error) -> True if a failed batch
+            should be retried later; other errors park the batch as failed
+        batch_size (int): Maximum operations read per flush
+        interval (float): Seconds between flushes while the journal is idle
+        max_delay (float): Upper bound on the retry backoff
+        mergeable (tuple): Kinds whose consecutive items can be sent as one batch
+    """
+
+    def __init__(self, path, apply, is_transient, batch_size=200, interval=1.0, max_delay=60.0, mergeable=()):
+        self.path = path
+        self.apply = apply
+        self.is_transient = is_transient
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_delay = max_delay
+        self.mergeable = set(mergeable)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM outbox WHERE failed = 0").fetchone()[0]
+        if self._pending:
+            logger.info(f"📮 Outbox has {self._pending} operations left from a previous run")
+
+    def append(self, kind, items):
+        """Journal operations in one transaction; they are flushed after everything appended before them."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO outbox (kind, item, created_at) VALUES (?, ?, ?)",
+                [(kind, json.dumps(item, default=str), now) for item in items]
+            )
+            self._conn.commit()
+            self._pending += len(items)
+        self._wake.set()
+
+    def pending(self):
+        """Operations waiting to be flushed."""
+        return self._pending
+
+    def failed(self):
+        """Operations parked after a non-retryable error."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE failed = 1").fetchone()[0]
+
+    def _next_group(self):
+        """Oldest pending operation plus the consecutive ones that can go in the same batch."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, item FROM outbox WHERE failed = 0 ORDER BY id LIMIT ?",
+                (self.batch_size,)
+            ).fetchall()
+        if not rows:
+            return None, []
+        kind = rows[0][1]
+        group = [rows[0]]
+        if kind in self.mergeable:
+            for row in rows[1:]:
+                if row[1] != kind:
+                    break
+                group.append(row)
+        return kind, group
+
+    def flush(self):
+        """
+        Flush pending operations until the journal is empty or a write fails.
+
+        Returns:
+            int: Operations written
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        flushed = 0
+        while True:
+            kind, group = self._next_group()
+            if not group:
+                return flushed
+            ids = [row[0] for row in group]
+            try:
+                self.apply(kind, [json.loads(row[2]) for row in group])
+            except Exception as e:
+                placeholders = ','.join('?' * len(ids))
+                retry = self.is_transient(e)
+                with self._lock:
+                    self._conn.execute(
+                        f"UPDATE outbox SET attempts = attempts + 1, last_error = ?, failed = ? WHERE id IN ({placeholders})",
+                        [str(e), 0 if retry else 1] + ids
+                    )
+                    self._conn.commit()
+                    if not retry:
+                        self._pending -= len(ids)
+                if retry:
+                    raise
+                logger.error(f"❌ Outbox parked {len(ids)} {kind} operations after a non-retryable error: {e}")
+                continue
+            with self._lock:
+                self._conn.execute(f"DELETE FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids)
+                self._conn.commit()
+                self._pending -= len(ids)
+            flushed += len(ids)
+
+    def start(self):
+        """Start the background flush thread."""
+        self._thread = threading.Thread(target=self._run, name='lizi-outbox', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        retry_at = 0.0
+        while not self._stopping.is_set():
+            # New appends wake the thread, but never before the backoff has passed
+            self._wake.wait(max(self.interval, retry_at - time.monotonic()) if self._failures else self.interval)
+            self._wake.clear()
+            if not self._pending or time.monotonic() < retry_at:
+                continue
+            try:
+                flushed = self.flush()
+                if self._failures:
+                    logger.info(f"📮 Supabase reachable again, flushed {flushed} outbox operations")
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                delay = min(self.max_delay, self.interval * 2 ** self._failures)
+                retry_at = time.monotonic() + delay
+                logger.warning(f"Outbox flush failed ({self._pending} pending), retrying in {delay:.0f}s: {e}")
+
+    def stop(self, timeout=10.0):
+        """Stop the flush thread after one last attempt to drain the journal."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Outbox still holds {self._pending} operations at shutdown: {e}")
+        with self._lock:
+            self._conn.close()
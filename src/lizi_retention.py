@@ -0,0 +1,356 @@
+"""
+Lizi Retention
+--------------
+Archives and purges old rows from reviews, ai_alerts and tracked_objects.
+
+Each table has a retention policy (LIZI_RETAIN_*_DAYS, 0 keeps everything).
+Rows past it are exported to a compressed newline-delimited JSON archive
+under LIZI_ARCHIVE_DIR (zstd when the zstandard package is installed, gzip
+otherwise) and deleted in batches of LIZI_RETENTION_BATCH_SIZE, at most
+LIZI_RETENTION_MAX_BATCHES per table per run, pausing between batches so
+the live pipeline keeps its share of the database. A batch is deleted only
+after it has been flushed to the archive file.
+
+tracked_objects is partitioned by month (add_lizi_retention.sql): monthly
+partitions entirely past the retention period are archived and dropped
+whole, upcoming ones are created on every run, and rows in the default
+(pre-partitioning) partition are purged in batches like the other tables.
+Aggregate history stays in ai_alert_rollups. Cutoffs for reviews and
+tracked_objects are taken in the dashboard's wall time (LIZI_DASHBOARD_TIMEZONE),
+the time base those columns are written in.
+
+Usage:
+    python lizi_retention.py --dry-run
+    python lizi_retention.py --table tracked_objects --max-batches 50
+"""
+
+import os
+import gzip
+import json
+import time
+import logging
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+try:
+    import zstandard
+except ImportError:  # Falls back to gzip
+    zstandard = None
+
+logger = logging.getLogger('lizi')
+
+ARCHIVE_DIR = os.getenv('LIZI_ARCHIVE_DIR', '/app/logs/archive')
+BATCH_SIZE = int(os.getenv('LIZI_RETENTION_BATCH_SIZE', '500'))
+MAX_BATCHES = int(os.getenv('LIZI_RETENTION_MAX_BATCHES', '200'))
+PAUSE = float(os.getenv('LIZI_RETENTION_PAUSE', '0.2'))
+PARTITIONS_AHEAD = int(os.getenv('LIZI_RETENTION_PARTITIONS_AHEAD', '2'))
+
+# dashboard_time: the column holds the dashboard's wall time (lizi_db.dashboard_time()), not UTC
+Policy = namedtuple('Policy', ['table', 'time_column', 'days', 'condition', 'dashboard_time'])
+
+
+def _processed_reviews(query):
+    """Reviews Lizi still has to pick up are never purged."""
+    return query.neq('status', 'waiting')
+
+
+POLICIES = [
+    Policy('reviews', 'created_at', int(os.getenv('LIZI_RETAIN_REVIEWS_DAYS', '30')), _processed_reviews, True),
+    Policy('ai_alerts', 'created_at', int(os.getenv('LIZI_RETAIN_ALERTS_DAYS', '90')), None, False),
+    Policy('tracked_objects', 'received_at', int(os.getenv('LIZI_RETAIN_TRACKED_DAYS', '14')), None, True),
+]
+
+PARTITIONED_TABLES = ('tracked_objects',)
+
+
+class ArchiveWriter:
+    """
+    Append-only compressed NDJSON file for one table and run.
+
+    Every write() is flushed and fsynced before it returns, so rows can be
+    deleted from the database as soon as it does.
+
+    Args:
+        directory (str): Where archive files are created
+        table (str): Table name, used in the file name
+    """
+
+    def __init__(self, directory, table):
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        extension = 'ndjson.zst' if zstandard is not None else 'ndjson.gz'
+        self.path = os.path.join(directory, f"{table}-{stamp}.{extension}")
+        self._file = open(self.path, 'ab')
+        if zstandard is not None:
+            self._stream = zstandard.ZstdCompressor(level=10).stream_writer(self._file, closefd=False)
+        else:
+            self._stream = gzip.GzipFile(fileobj=self._file, mode='ab', compresslevel=6)
+        self.rows = 0
+        self.raw_bytes = 0
+
+    def write(self, rows):
+        data = ''.join(json.dumps(row, default=str, separators=(',', ':')) + '\n' for row in rows).encode('utf-8')
+        self._stream.write(data)
+        self._stream.flush()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.rows += len(rows)
+        self.raw_bytes += len(data)
+
+    def close(self):
+        self._stream.close()
+        self._file.close()
+        return os.path.getsize(self.path)
+
+
+def _timestamp(value):
+    moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def policy_cutoff(policy, now=None):
+    """
+    The time before which rows fall outside the policy, in the time base of
+    its column so it compares correctly with the stored values.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=policy.days)
+    if policy.dashboard_time:
+        from lizi_db import dashboard_time
+        return dashboard_time(cutoff)
+    return cutoff.isoformat()
+
+
+def _scalar(data):
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if isinstance(data, dict):
+        data = next(iter(data.values()), None)
+    return data
+
+
+class RetentionJob:
+    """
+    One retention run over a set of policies.
+
+    Args:
+        client (Client): Supabase client (service role)
+        policies (list): Policy tuples to apply
+        archive_dir (str): Directory for archive files
+        batch_size (int): Rows archived and deleted per batch
+        max_batches (int): Batches per table per run
+        pause (float): Seconds to sleep between batches
+        dry_run (bool): Only report what would be archived and purged
+    """
+
+    def __init__(self, client, policies=POLICIES, archive_dir=ARCHIVE_DIR, batch_size=BATCH_SIZE,
+                 max_batches=MAX_BATCHES, pause=PAUSE, dry_run=False):
+        self.client = client
+        self.policies = policies
+        self.archive_dir = archive_dir
+        self.batch_size = max(1, batch_size)
+        self.max_batches = max_batches
+        self.pause = pause
+        self.dry_run = dry_run
+
+    def table_sizes(self, tables):
+        """On-disk bytes per table (partitions included), empty if lizi_table_sizes() is missing."""
+        try:
+            data = self.client.rpc('lizi_table_sizes', {"p_tables": list(tables)}).execute().data or []
+            return {row['table_name']: row['total_bytes'] for row in data}
+        except Exception as e:
+            logger.warning(f"Could not read table sizes: {e}")
+            return {}
+
+    def _expired(self, policy, cutoff, columns='*'):
+        query = self.client.table(policy.table).select(columns).lt(policy.time_column, cutoff)
+        return policy.condition(query) if policy.condition is not None else query
+
+    def ensure_partitions(self):
+        """Create the upcoming monthly tracked_objects partitions."""
+        try:
+            created = self.client.rpc('lizi_ensure_tracked_partitions', {"p_months_ahead": PARTITIONS_AHEAD}).execute().data or []
+            for name in created:
+                logger.info(f"🗂️ Created partition {_scalar(name)}")
+        except Exception as e:
+            logger.warning(f"Could not create tracked_objects partitions (is add_lizi_retention.sql applied?): {e}")
+
+    def _archive_partition(self, policy, partition, report):
+        """Copy every row of a monthly partition to the archive, page by page."""
+        last_id = None
+        while True:
+            query = self.client.table(policy.table).select('*') \
+                .gte(policy.time_column, partition['range_start']) \
+                .lt(policy.time_column, partition['range_end'])
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            rows = query.order('id').limit(self.batch_size).execute().data or []
+            if rows:
+                self._archive(policy, report).write(rows)
+                report['archived'] += len(rows)
+                last_id = rows[-1]['id']
+            if len(rows) < self.batch_size:
+                return
+
+    def drop_partitions(self, policy, cutoff, report):
+        """Archive and drop monthly partitions that end before the cutoff."""
+        try:
+            partitions = self.client.rpc('lizi_tracked_partitions', {}).execute().data or []
+        except Exception as e:
+            logger.warning(f"Could not list {policy.table} partitions: {e}")
+            return
+        for partition in partitions:
+            if _timestamp(partition['range_end']) > _timestamp(cutoff):
+                continue
+            if self.dry_run:
+                logger.info(f"Would archive and drop partition {partition['partition_name']} ({partition['total_bytes'] / 1024 / 1024:.1f} MB)")
+                report['partitions'].append(partition['partition_name'])
+                continue
+            self._archive_partition(policy, partition, report)
+            freed = _scalar(self.client.rpc('lizi_drop_tracked_partition', {"p_partition": partition['partition_name']}).execute().data)
+            report['partitions'].append(partition['partition_name'])
+            logger.info(f"🗑️ Dropped partition {partition['partition_name']} ({(freed or 0) / 1024 / 1024:.1f} MB)")
+
+    def _archive(self, policy, report):
+        writer = report.get('_writer')
+        if writer is None:
+            writer = report['_writer'] = ArchiveWriter(self.archive_dir, policy.table)
+            report['archive'] = writer.path
+        return writer
+
+    def purge(self, policy, cutoff, report):
+        """Archive and delete expired rows in bounded batches, oldest first."""
+        for _ in range(self.max_batches):
+            rows = self._expired(policy, cutoff).order(policy.time_column).order('id').limit(self.batch_size).execute().data or []
+            if not rows:
+                return
+            self._archive(policy, report).write(rows)
+            report['archived'] += len(rows)
+            ids = [row['id'] for row in rows]
+            self.client.table(policy.table).delete().in_('id', ids).execute()
+            report['purged'] += len(ids)
+            if len(rows) < self.batch_size:
+                return
+            if self.pause:
+                time.sleep(self.pause)
+        logger.info(f"{policy.table}: stopped after {self.max_batches} batches, the next run continues")
+
+    def estimate(self, policy, cutoff, report):
+        """Dry run: count expired rows and estimate their size from a sample batch."""
+        sample = self._expired(policy, cutoff).order(policy.time_column).limit(self.batch_size).execute().data or []
+        count = None
+        if len(sample) == self.batch_size:
+            query = self.client.table(policy.table).select('id', count='exact').lt(policy.time_column, cutoff)
+            if policy.condition is not None:
+                query = policy.condition(query)
+            count = getattr(query.limit(1).execute(), 'count', None)
+        if count is None:
+            count = len(sample)
+        sample_bytes = sum(len(json.dumps(row, default=str)) for row in sample)
+        report['candidates'] = count
+        report['raw_bytes'] = int(sample_bytes / len(sample) * count) if sample else 0
+
+    def run(self, tables=None):
+        """
+        Apply the retention policies.
+
+        Args:
+            tables (list): Only these tables (all policies when None)
+
+        Returns:
+            list: One report dict per table (table, cutoff, candidates,
+                archived, purged, partitions, archive, archive_bytes,
+                raw_bytes, size_before, size_after, reclaimed)
+        """
+        policies = [policy for policy in self.policies if policy.days > 0 and (not tables or policy.table in tables)]
+        if not self.dry_run and any(policy.table in PARTITIONED_TABLES for policy in policies):
+            self.ensure_partitions()
+        sizes_before = self.table_sizes([policy.table for policy in policies])
+        reports = []
+        for policy in policies:
+            cutoff = policy_cutoff(policy)
+            report = {
+                "table": policy.table, "cutoff": cutoff, "dry_run": self.dry_run,
+                "candidates": None, "archived": 0, "purged": 0, "partitions": [],
+                "archive": None, "archive_bytes": 0, "raw_bytes": 0
+            }
+            try:
+                if policy.table in PARTITIONED_TABLES:
+                    self.drop_partitions(policy, cutoff, report)
+                if self.dry_run:
+                    self.estimate(policy, cutoff, report)
+                else:
+                    self.purge(policy, cutoff, report)
+            except Exception as e:
+                report['error'] = str(e)
+                logger.error(f"❌ Retention for {policy.table} failed: {e}")
+            finally:
+                writer = report.pop('_writer', None)
+                if writer is not None:
+                    report['archive_bytes'] = writer.close()
+                    report['raw_bytes'] = writer.raw_bytes
+            reports.append(report)
+        sizes_after = self.table_sizes([policy.table for policy in policies]) if not self.dry_run else sizes_before
+        for report in reports:
+            report['size_before'] = sizes_before.get(report['table'])
+            report['size_after'] = sizes_after.get(report['table'])
+            if report['size_before'] is not None and report['size_after'] is not None:
+                report['reclaimed'] = report['size_before'] - report['size_after']
+            else:
+                report['reclaimed'] = None
+        return reports
+
+
+def _mb(value):
+    return '-' if value is None else f"{value / 1024 / 1024:.1f} MB"
+
+
+def format_report(reports):
+    """Human-readable summary of a run."""
+    lines = []
+    for report in reports:
+        if report['dry_run']:
+            lines.append(
+                f"{report['table']}: would purge {report['candidates']} rows older than {report['cutoff'][:10]} "
+                f"(~{_mb(report['raw_bytes'])} as JSON)"
+                + (f", drop partitions {', '.join(report['partitions'])}" if report['partitions'] else "")
+                + f"; table is {_mb(report['size_before'])}"
+            )
+            continue
+        lines.append(
+            f"{report['table']}: archived {report['archived']} rows ({_mb(report['raw_bytes'])} -> {_mb(report['archive_bytes'])}"
+            f"{' in ' + report['archive'] if report['archive'] else ''}), purged {report['purged']}"
+            + (f", dropped {', '.join(report['partitions'])}" if report['partitions'] else "")
+            + f"; size {_mb(report['size_before'])} -> {_mb(report['size_after'])}, reclaimed {_mb(report['reclaimed'])}"
+            + (f"; error: {report['error']}" if report.get('error') else "")
+        )
+    if not any(report['dry_run'] for report in reports) and any(report['purged'] for report in reports):
+        lines.append("Space freed by row deletes is reused by new rows after autovacuum; dropped partitions are returned at once.")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and purge old Lizi rows")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be purged without changing anything")
+    parser.add_argument('--table', action='append', choices=[policy.table for policy in POLICIES], help="Only this table (repeatable)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--max-batches', type=int, default=MAX_BATCHES, help="Batches per table per run")
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    from lizi_db import get_client
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    job = RetentionJob(
+        get_client(),
+        archive_dir=args.archive_dir,
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+        dry_run=args.dry_run
+    )
+    reports = job.run(args.table)
+    print(format_report(reports))
+    return 1 if any(report.get('error') for report in reports) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
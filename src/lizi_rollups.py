@@ -0,0 +1,228 @@
+"""
+Lizi Rollups
+------------
+Hourly per-camera/per-label counters over ai_alerts, kept in
+ai_alert_rollups (create_ai_alert_rollups.sql) so dashboard summaries read
+one row per bucket instead of scanning every alert.
+
+Lizi counts the alerts and detections it creates and the update/end reviews
+it applies in a RollupBuffer and adds them to the table with one
+lizi_increment_rollups() call every LIZI_ROLLUP_INTERVAL seconds. Counters
+Lizi does not see being set (triggered, user_feedback) are maintained by a
+trigger on ai_alerts. Every count for an alert goes to the cell of the alert
+row itself (the hour of its created_at, its camera and label), the same cell
+the trigger and lizi_rebuild_rollups() use, and an update is only counted
+once lizi_update_alert() reports it was applied.
+
+Existing history, or buckets that drifted, are rebuilt from ai_alerts with:
+
+    python lizi_rollups.py backfill [--since 2024-01-01T00:00:00Z]
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger('lizi')
+
+ROLLUP_INTERVAL = float(os.getenv('LIZI_ROLLUP_INTERVAL', '10'))
+
+# Counters Lizi increments itself; the rest come from the ai_alerts trigger
+COUNTERS = ('alerts', 'detections', 'updates', 'ended')
+ALL_COUNTERS = COUNTERS + ('triggered', 'feedback_good', 'feedback_false_alert', 'feedback_unsure')
+
+# Dimensions /rollups can group by ('hour' is the stored bucket)
+DIMENSIONS = ('hour', 'day', 'camera', 'label')
+
+
+def bucket_for(alert):
+    """Start of the hour (UTC, ISO) of an ai_alerts row's created_at, as date_trunc('hour', created_at)."""
+    created_at = alert.get('created_at')
+    if isinstance(created_at, datetime):
+        moment = created_at
+    else:
+        try:
+            moment = datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
+        except ValueError:
+            moment = datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)  # Naive timestamps are stored as UTC
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+class RollupBuffer:
+    """
+    In-memory rollup deltas, flushed periodically.
+
+    Args:
+        apply (callable): apply(rows) adds a list of {'bucket', 'camera',
+            'label', <counter>: n} deltas to the table, raising on failure
+        interval (float): Seconds between flushes
+    """
+
+    def __init__(self, apply, interval=ROLLUP_INTERVAL):
+        self.apply = apply
+        self.interval = interval
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, bucket, camera, label, **counts):
+        """Add counter increments to one (bucket, camera, label) cell."""
+        key = (bucket, camera, label or '')
+        with self._lock:
+            cell = self._counts.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for name, value in counts.items():
+                cell[name] += value
+
+    def record_alert(self, alert):
+        """Count a newly created alert (or detection) row."""
+        kind = 'alerts' if alert.get('frigate_categorization') == 'alert' else 'detections'
+        self.add(bucket_for(alert), alert.get('camera'), alert.get('label'), **{kind: 1})
+
+    def record_update(self, alert, review, increment=1):
+        """
+        Count update/end reviews applied to an alert (increment > 1 for coalesced ones).
+
+        Args:
+            alert (dict): The alert row's 'created_at', 'camera' and 'label'
+            review (dict): The review that was applied
+            increment (int): Reviews the update stood for
+        """
+        ended = 1 if review.get('review_type') == 'end' else 0
+        self.add(bucket_for(alert), alert.get('camera'), alert.get('label'), updates=increment, ended=ended)
+
+    def pending(self):
+        """Cells waiting to be flushed."""
+        return len(self._counts)
+
+    def flush(self):
+        """
+        Write the buffered deltas; on failure they are merged back for the next flush.
+
+        Returns:
+            int: Cells written
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, {}
+            if not counts:
+                return 0
+            rows = [
+                {"bucket": bucket, "camera": camera, "label": label, **cell}
+                for (bucket, camera, label), cell in counts.items()
+            ]
+            try:
+                self.apply(rows)
+            except Exception:
+                for (bucket, camera, label), cell in counts.items():
+                    self.add(bucket, camera, label, **cell)
+                raise
+            return len(rows)
+
+    def start(self):
+        """Start flushing every `interval` seconds on a background thread."""
+        self._thread = threading.Thread(target=self._run, name='lizi-rollups', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Error flushing alert rollups ({self.pending()} cells kept for the next flush): {e}")
+
+    def stop(self):
+        """Stop the flush thread and write what is left."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Alert rollups not written at shutdown ({self.pending()} cells): {e}")
+
+
+def summarize(rows, group_by=('camera',)):
+    """
+    Aggregate ai_alert_rollups rows along some dimensions.
+
+    Args:
+        rows (list): Rollup rows ({'bucket', 'camera', 'label', <counters>})
+        group_by (tuple): Any of DIMENSIONS; empty for one grand total
+
+    Returns:
+        list: One dict per group with the dimension values, summed counters,
+            alert_ratio (alerts / alerts and detections) and false_alert_rate
+            (false alerts / alerts with feedback)
+    """
+    groups = {}
+    for row in rows:
+        values = {}
+        for dimension in group_by:
+            if dimension == 'hour':
+                values['hour'] = row['bucket']
+            elif dimension == 'day':
+                values['day'] = str(row['bucket'])[:10]
+            else:
+                values[dimension] = row.get(dimension)
+        key = tuple(values.values())
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {**values, **dict.fromkeys(ALL_COUNTERS, 0)}
+        for name in ALL_COUNTERS:
+            group[name] += row.get(name) or 0
+    summary = []
+    for key in sorted(groups, key=lambda key: tuple(str(value) for value in key)):
+        group = groups[key]
+        total = group['alerts'] + group['detections']
+        feedback = group['feedback_good'] + group['feedback_false_alert'] + group['feedback_unsure']
+        group['alert_ratio'] = round(group['alerts'] / total, 4) if total else None
+        group['false_alert_rate'] = round(group['feedback_false_alert'] / feedback, 4) if feedback else None
+        summary.append(group)
+    return summary
+
+
+def backfill(client, since=None):
+    """
+    Rebuild rollups from ai_alerts with lizi_rebuild_rollups().
+
+    Buckets older than the oldest alert still in ai_alerts are left alone, so
+    history whose alerts were purged is kept.
+
+    Args:
+        client (Client): Supabase client
+        since (str): Only rebuild buckets from this ISO timestamp on
+
+    Returns:
+        int: Rollup rows written
+    """
+    data = client.rpc('lizi_rebuild_rollups', {"p_since": since}).execute().data
+    if isinstance(data, list):
+        data = data[0] if data else 0
+    if isinstance(data, dict):
+        data = next(iter(data.values()), 0)
+    return data or 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the ai_alert_rollups table")
+    commands = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = commands.add_parser('backfill', help="Rebuild rollups from ai_alerts")
+    backfill_parser.add_argument('--since', help="Only rebuild buckets from this ISO timestamp on")
+    args = parser.parse_args(argv)
+
+    from lizi_db import get_client
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    started = time.monotonic()
+    rows = backfill(get_client(), args.since)
+    logger.info(f"📊 Rebuilt {rows} rollup rows{' since ' + args.since if args.since else ''} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
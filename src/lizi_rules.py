@@ -0,0 +1,124 @@
+"""
+Lizi Alert Rules
+----------------
+Declarative label x zone x motion x min score -> reason rules for tracked
+object events, compiled into an indexed lookup so a whole batch of events
+can be evaluated without walking every rule for every event.
+
+Rules are checked in table order: when several rules match an event, the
+one listed first wins. Use '*' as a label or zone wildcard and None for
+`moving` to match both moving and stationary objects.
+"""
+
+import os
+import json
+from collections import namedtuple
+
+Rule = namedtuple('Rule', ['label', 'zone', 'moving', 'min_score', 'reason'])
+
+ANY = '*'
+
+# Default rules (the original hard-coded should_alert() logic)
+DEFAULT_RULES = [
+    Rule("person", "driveway", True, 0.7, "Person is moving in driveway"),
+    Rule("person", "porch", True, 0.7, "Person is moving on porch"),
+    Rule("car", "driveway", True, 0.7, "Car is moving in driveway"),
+    Rule("car", "street", True, 0.7, "Car is moving on street"),
+    Rule("truck", "driveway", True, 0.7, "Truck is moving in driveway"),
+    Rule("bicycle", "driveway", True, 0.7, "Bicycle is moving in monitored area"),
+    Rule("bicycle", "porch", True, 0.7, "Bicycle is moving in monitored area"),
+]
+
+
+class RuleEngine:
+    """
+    Compiled rule table.
+
+    Rules are indexed by (label, moving, zone), with the wildcards stored as
+    their own keys. Each key holds (priority, min_score, reason) entries
+    sorted by priority, so evaluating an event costs a handful of dict
+    lookups per zone regardless of how many rules exist.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._index = {}
+        for priority, rule in enumerate(self.rules):
+            key = (rule.label, rule.moving, rule.zone)
+            self._index.setdefault(key, []).append((priority, rule.min_score, rule.reason))
+        for entries in self._index.values():
+            entries.sort()
+
+    def _match(self, label, moving, zones, score):
+        best = None
+        for rule_label in (label, ANY):
+            for rule_moving in (moving, None):
+                for zone in zones:
+                    for priority, min_score, reason in self._index.get((rule_label, rule_moving, zone), ()):
+                        if best is not None and priority >= best[0]:
+                            break
+                        if score >= min_score:
+                            best = (priority, reason)
+                            break
+        return best[1] if best else None
+
+    def evaluate(self, events):
+        """
+        Evaluate a batch of tracked object events.
+
+        Args:
+            events (list): Frigate event payloads ({'after': {'label', 'current_zones',
+                'stationary', 'score', ...}})
+
+        Returns:
+            tuple: (reasons, confidences) - parallel lists; reason is None and
+            confidence 0.0 for events no rule matched
+        """
+        reasons = []
+        confidences = []
+        for event in events:
+            after = event.get('after') or {}
+            score = after.get('score') or 0
+            zones = list(after.get('current_zones') or []) + [ANY]
+            reason = self._match(after.get('label'), not after.get('stationary', False), zones, score)
+            reasons.append(reason)
+            confidences.append(score if reason else 0.0)
+        return reasons, confidences
+
+    def evaluate_one(self, event):
+        """Evaluate a single event, returning (reason, confidence)."""
+        reasons, confidences = self.evaluate([event])
+        return reasons[0], confidences[0]
+
+
+def load_rules(path):
+    """
+    Load rules from a JSON file.
+
+    The file holds a list of objects with label, zone, moving (true, false or
+    null for either), min_score and reason keys; label and zone default to '*'.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    return [
+        Rule(
+            entry.get('label', ANY),
+            entry.get('zone', ANY),
+            entry.get('moving'),
+            float(entry.get('min_score', 0.0)),
+            entry['reason']
+        )
+        for entry in entries
+    ]
+
+
+_default_engine = None
+
+
+def default_engine():
+    """Return the engine for LIZI_RULES_PATH, or the built-in rules if it is not set."""
+    global _default_engine
+    if _default_engine is None:
+        path = os.getenv('LIZI_RULES_PATH')
+        _default_engine = RuleEngine(load_rules(path) if path else DEFAULT_RULES)
+    return _default_engine
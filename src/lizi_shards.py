@@ -0,0 +1,120 @@
+"""
+Lizi Shards
+-----------
+Lease-based split of the review stream across several Lizi instances.
+
+Reviews are assigned to one of LIZI_SHARD_COUNT shards by a hash of their
+camera, so every review of a camera is handled by the same instance. Each
+instance claims a fair share of the shards through the lizi_claim_shards()
+RPC (FOR UPDATE SKIP LOCKED on lizi_shard_leases, see
+add_lizi_shard_leases.sql) and renews its leases from a heartbeat thread.
+Shards of an instance that stops heartbeating are taken over by the others
+once its leases expire; a new instance gets shards as the others hand back
+what exceeds their fair share.
+"""
+
+import time
+import zlib
+import logging
+import threading
+
+logger = logging.getLogger('lizi')
+
+
+def shard_for(key, shard_count):
+    """Shard a key (camera name) belongs to."""
+    return zlib.crc32(str(key).encode('utf-8')) % shard_count
+
+
+class ShardLeases:
+    """
+    The shards this instance currently owns, kept fresh by a heartbeat.
+
+    Args:
+        rpc (callable): rpc(function, params) calls a database function and
+            returns its data
+        owner (str): Unique id of this instance (LIZI_WORKER_ID)
+        shard_count (int): Total number of shards; must match on every instance
+        lease_seconds (float): Lease length; renewed every third of it
+        on_change (callable): on_change(gained, lost) with the sets of shards
+            that changed hands, called from the heartbeat thread
+    """
+
+    def __init__(self, rpc, owner, shard_count, lease_seconds=30, on_change=None):
+        self.rpc = rpc
+        self.owner = owner
+        self.shard_count = shard_count
+        self.lease_seconds = lease_seconds
+        self.on_change = on_change
+        self.owned = frozenset()
+        self._valid_until = 0.0
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def owns(self, key):
+        """
+        True if the shard of `key` is leased to this instance.
+
+        Ownership lapses locally when the leases could not be renewed in time,
+        since another instance may have taken them over by then.
+        """
+        return shard_for(key, self.shard_count) in self.owned and time.monotonic() < self._valid_until
+
+    def renew(self):
+        """
+        Renew held leases and claim or hand back shards toward a fair share.
+
+        Returns:
+            frozenset: The shards owned after renewal
+        """
+        started = time.monotonic()
+        data = self.rpc('lizi_claim_shards', {
+            "p_owner": self.owner,
+            "p_shard_count": self.shard_count,
+            "p_lease_seconds": int(self.lease_seconds)
+        }) or []
+        owned = frozenset(
+            int(next(iter(row.values())) if isinstance(row, dict) else row)
+            for row in data
+        )
+        # Shards whose lease lapsed locally may have been processed by another
+        # instance meanwhile, so re-acquiring them counts as gaining them
+        held = self.owned if started < self._valid_until else frozenset()
+        if self.owned and not held:
+            logger.warning(f"Shard leases of worker {self.owner} lapsed before renewal, re-acquiring them")
+        self._valid_until = started + self.lease_seconds
+        gained = owned - held
+        lost = self.owned - owned
+        self.owned = owned
+        if gained or lost:
+            logger.info(f"🧩 Worker {self.owner} owns shards {sorted(owned)} of {self.shard_count} (gained {sorted(gained)}, lost {sorted(lost)})")
+            if self.on_change is not None:
+                self.on_change(gained, lost)
+        return owned
+
+    def start(self):
+        """Take the first leases, then keep renewing them on a background thread."""
+        try:
+            self.renew()
+        except Exception as e:
+            logger.error(f"❌ Error claiming shards, retrying in the background: {e}")
+        self._thread = threading.Thread(target=self._run, name='lizi-shards', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                logger.warning(f"Error renewing shard leases (held until they expire): {e}")
+
+    def stop(self):
+        """Stop heartbeating and release every lease so other instances take over at once."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.owned = frozenset()
+        try:
+            self.rpc('lizi_release_shards', {"p_owner": self.owner})
+        except Exception as e:
+            logger.warning(f"Error releasing shard leases (they expire in {self.lease_seconds:.0f}s): {e}")
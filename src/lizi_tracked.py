@@ -0,0 +1,301 @@
+"""
+Lizi Tracked Objects
+--------------------
+MQTT -> tracked_objects ingester for Frigate's per-object event stream.
+
+Frigate publishes a message for every frame an object is tracked in, most of
+which only move the bounding box. The ingester keeps just the messages that
+change the object's state: its first and last message, zone entries and
+exits, stationary flips, label/sub label changes and score jumps of at least
+LIZI_TRACKED_SCORE_JUMP. The before_data of a stored row is the after_data
+of the previous stored row, so consecutive rows still describe a transition.
+
+Kept rows are buffered and written with one multi-row insert once
+LIZI_TRACKED_BATCH_SIZE rows are waiting or LIZI_TRACKED_FLUSH_INTERVAL
+seconds have passed. While Supabase is unavailable the buffer keeps growing
+up to LIZI_TRACKED_MAX_BUFFER rows (oldest dropped first) and flushes are
+retried with exponential backoff.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from lizi_db import get_client, is_transient_error, dashboard_time
+from lizi_metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger('lizi')
+
+TOPICS = [topic.strip() for topic in os.getenv('LIZI_TRACKED_TOPICS', 'frigate/events').split(',') if topic.strip()]
+BATCH_SIZE = int(os.getenv('LIZI_TRACKED_BATCH_SIZE', '500'))
+FLUSH_INTERVAL = float(os.getenv('LIZI_TRACKED_FLUSH_INTERVAL', '1'))
+MAX_BUFFER = int(os.getenv('LIZI_TRACKED_MAX_BUFFER', '50000'))
+MAX_DELAY = float(os.getenv('LIZI_TRACKED_MAX_DELAY', '60'))
+SCORE_JUMP = float(os.getenv('LIZI_TRACKED_SCORE_JUMP', '0.1'))
+# Objects whose state is remembered; objects that never sent 'end' are forgotten oldest first
+MAX_TRACKED = int(os.getenv('LIZI_TRACKED_MAX_OBJECTS', '10000'))
+
+TRACKED_MESSAGES_TOTAL = Counter('lizi_tracked_messages_total', 'Tracked object messages received, by result', ['result'])
+TRACKED_BATCH_SIZE = Histogram('lizi_tracked_batch_size', 'Rows per tracked_objects insert', buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000))
+TRACKED_FLUSH_SECONDS = Histogram('lizi_tracked_flush_seconds', 'tracked_objects insert duration')
+Gauge(
+    'lizi_tracked_buffered_rows',
+    'tracked_objects rows waiting to be inserted',
+    callback=lambda: _running.pending() if _running is not None else 0
+)
+
+_running = None
+
+
+def object_state(after):
+    """The parts of a tracked object that count as a state change."""
+    return {
+        "label": after.get('label'),
+        "sub_label": after.get('sub_label'),
+        "zones": sorted(after.get('current_zones') or []),
+        "stationary": bool(after.get('stationary')),
+        "score": after.get('top_score') if after.get('score') is None else after.get('score')
+    }
+
+
+def changed(previous, current, score_jump=SCORE_JUMP):
+    """True if `current` differs from `previous` in a way worth storing."""
+    for key in ('label', 'sub_label', 'zones', 'stationary'):
+        if previous[key] != current[key]:
+            return True
+    if previous['score'] is None or current['score'] is None:
+        return previous['score'] != current['score']
+    return abs(current['score'] - previous['score']) >= score_jump
+
+
+class StateChangeFilter:
+    """
+    Decides which tracked object messages are stored.
+
+    Remembers the last stored state and after_data of each live object; only
+    called from the MQTT network thread, so it needs no locking.
+
+    Args:
+        score_jump (float): Score change that is stored on its own
+        max_objects (int): Objects remembered at once
+    """
+
+    def __init__(self, score_jump=SCORE_JUMP, max_objects=MAX_TRACKED):
+        self.score_jump = score_jump
+        self.max_objects = max_objects
+        self._objects = OrderedDict()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def row(self, payload, received_at=None):
+        """
+        Turn a message into a tracked_objects row, or None if it changes nothing.
+
+        Args:
+            payload (dict): Decoded Frigate message ({'type', 'before', 'after'})
+            received_at (str): Timestamp in the dashboard's convention, defaults
+                to now (see lizi_db.dashboard_time())
+
+        Returns:
+            dict: Row to insert, None for redundant frames
+        """
+        before = payload.get('before') or {}
+        after = payload.get('after') or {}
+        object_id = after.get('id') or before.get('id')
+        camera = after.get('camera') or before.get('camera')
+        if not object_id or not camera:
+            raise ValueError("tracked object message without id or camera")
+
+        message_type = payload.get('type')
+        state = object_state(after or before)
+        last = self._objects.get(object_id)
+        if message_type == 'end':
+            self._objects.pop(object_id, None)
+        else:
+            if last is not None and message_type != 'new' and not changed(last[0], state, self.score_jump):
+                return None
+            self._objects[object_id] = (state, after)
+            self._objects.move_to_end(object_id)
+            while len(self._objects) > self.max_objects:
+                self._objects.popitem(last=False)
+
+        return {
+            "tracked_object_type": message_type,
+            "tracked_object_id": object_id,
+            "camera": camera,
+            "before_data": last[1] if last is not None else (payload.get('before') or None),
+            "after_data": payload.get('after') or None,
+            "received_at": received_at or dashboard_time()
+        }
+
+
+class TrackedObjectIngester:
+    """
+    Buffers state-change rows and bulk inserts them into tracked_objects.
+
+    Args:
+        client (Client): Supabase client, defaults to the shared pooled client
+        batch_size (int): Rows per insert; a full batch is flushed at once
+        flush_interval (float): Longest time a row waits in the buffer
+        max_buffer (int): Rows kept while Supabase is unavailable
+        max_delay (float): Upper bound on the retry backoff
+        score_jump (float): Score change that is stored on its own
+        owns (callable): owns(camera) -> False for cameras another instance
+            ingests (sharding); every camera is ingested when None
+    """
+
+    def __init__(self, client=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_buffer=MAX_BUFFER, max_delay=MAX_DELAY, score_jump=SCORE_JUMP, owns=None):
+        self.client = client or get_client()
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.max_delay = max_delay
+        self.owns = owns
+        self.filter = StateChangeFilter(score_jump)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._mqtt = None
+        self._failures = 0
+        self.dropped = 0
+
+    def pending(self):
+        """Rows waiting to be inserted."""
+        return len(self._buffer)
+
+    def handle_message(self, topic, payload):
+        """MQTT callback: filter a message and buffer it if it changes the object's state."""
+        try:
+            message = json.loads(payload)
+            camera = (message.get('after') or message.get('before') or {}).get('camera')
+            if self.owns is not None and not self.owns(camera):
+                return
+            row = self.filter.row(message)
+        except (ValueError, AttributeError, TypeError) as e:  # Not JSON, or JSON of the wrong shape
+            TRACKED_MESSAGES_TOTAL.inc(result='invalid')
+            logger.warning(f"Ignoring tracked object message on {topic}: {e}")
+            return
+        if row is None:
+            TRACKED_MESSAGES_TOTAL.inc(result='dropped')
+            return
+        TRACKED_MESSAGES_TOTAL.inc(result='kept')
+        self.add([row])
+
+    def add(self, rows):
+        """Buffer rows, waking the writer once a batch is full."""
+        with self._lock:
+            self._buffer.extend(rows)
+            overflow = len(self._buffer) - self.max_buffer
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self.dropped += overflow
+                logger.warning(f"tracked_objects buffer full, dropped {overflow} oldest rows")
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Insert buffered rows batch by batch until the buffer is empty.
+
+        Rows of a failed batch go back to the front of the buffer and the
+        error is raised.
+
+        Returns:
+            int: Rows inserted
+        """
+        inserted = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._buffer[:self.batch_size]
+                    del self._buffer[:self.batch_size]
+                if not batch:
+                    return inserted
+                started = time.perf_counter()
+                try:
+                    self.client.table('tracked_objects').insert(batch, returning='minimal').execute()
+                except Exception:
+                    with self._lock:
+                        self._buffer[:0] = batch
+                    raise
+                TRACKED_FLUSH_SECONDS.observe(time.perf_counter() - started)
+                TRACKED_BATCH_SIZE.observe(len(batch))
+                inserted += len(batch)
+
+    def start(self, mqtt=True):
+        """Start the writer thread and (unless mqtt is False) subscribe to the tracked object topics."""
+        global _running
+        _running = self
+        self._thread = threading.Thread(target=self._run, name='lizi-tracked', daemon=True)
+        self._thread.start()
+        if mqtt:
+            from lizi_mqtt import create_mqtt_client
+            self._mqtt = create_mqtt_client(
+                os.getenv('LIZI_TRACKED_MQTT_CLIENT_ID', 'lizi-tracked'),
+                TOPICS,
+                self.handle_message
+            )
+            self._mqtt.loop_start()
+        logger.info(f"🛰️ Ingesting tracked objects from {', '.join(TOPICS)} in batches of {self.batch_size}")
+
+    def _run(self):
+        retry_at = 0.0
+        while not self._stopping.is_set():
+            self._wake.wait(max(self.flush_interval, retry_at - time.monotonic()) if self._failures else self.flush_interval)
+            self._wake.clear()
+            if not self._buffer or time.monotonic() < retry_at:
+                continue
+            try:
+                self.flush()
+                if self._failures:
+                    logger.info("📡 Supabase reachable again, tracked_objects buffer flushed")
+                self._failures = 0
+            except Exception as e:
+                if not is_transient_error(e):
+                    with self._lock:
+                        dropped = self._buffer[:self.batch_size]
+                        del self._buffer[:self.batch_size]
+                    self.dropped += len(dropped)
+                    logger.error(f"❌ Dropped {len(dropped)} tracked_objects rows after a non-retryable error: {e}")
+                    continue
+                self._failures += 1
+                delay = min(self.max_delay, self.flush_interval * 2 ** self._failures)
+                retry_at = time.monotonic() + delay
+                logger.warning(f"tracked_objects insert failed ({len(self._buffer)} buffered), retrying in {delay:.0f}s: {e}")
+
+    def stop(self, timeout=10.0):
+        """Unsubscribe, then write whatever is still buffered."""
+        if self._mqtt is not None:
+            self._mqtt.loop_stop()
+            self._mqtt.disconnect()
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"{len(self._buffer)} tracked_objects rows not written at shutdown: {e}")
+
+
+if __name__ == "__main__":
+    from lizi_logging import configure_logging
+    configure_logging()
+    ingester = TrackedObjectIngester()
+    logger.info("Starting Lizi tracked object ingester...")
+    ingester.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingester.stop()
@@ -1,7 +1,7 @@
 #!/bin/bash
 
-# Start Lizi in the background
-python3 /app/src/lib/lizi.py &
+# Start Lizi in the background (its shared modules live in src/)
+PYTHONPATH=/app/src python3 /app/src/lib/lizi.py &
 
 # Start the Node.js app
 npm start 
\ No newline at end of file